@@ -0,0 +1,207 @@
+"""Admission control for the expensive write endpoints (quiz submission, login,
+signup) and, at low priority, for the catalog, quiz and report reads.
+
+Each request takes one token from every bucket that applies to it: one per
+user, one per client IP, optionally one for the whole endpoint, and one global
+bucket shared by all limited endpoints. Rates and bursts come from
+``ADMISSION_POLICIES`` in the config, where each one can be overridden from the
+environment.
+All buckets are checked and debited atomically in one Lua call, so a request
+is either admitted by all of them or charged nothing. The script reads the
+Redis clock, so every web process refills from the same time source.
+
+Priority is a floor on the global bucket: low-priority policies (login, signup,
+browse) may only take global tokens while more than ``ADMISSION_LOW_PRIORITY_RESERVE`` of
+the burst is left, which keeps that share for submissions during a rush.
+
+A policy either sheds at once with ``429`` and ``Retry-After`` or queues: the
+request sleeps until its buckets refill, for at most ``max_wait`` seconds and
+only while one of the process's ``ADMISSION_MAX_QUEUED`` queue slots is free.
+When Redis is unavailable requests are admitted, since the limiter must not be
+the thing that takes the site down.
+"""
+import json
+import logging
+import math
+import threading
+import time
+from functools import wraps
+
+from flask import jsonify, make_response, request
+from flask_jwt_extended import get_jwt_identity
+
+from applications.extensions import redis_store
+from applications.metrics import metrics
+
+KEY_PREFIX = "admission:"
+WAIT_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0)
+
+# KEYS: bucket hashes. ARGV: cost, then rate, burst, floor for each key.
+# Returns {1, 0} when admitted, {0, wait_ms, index of the bucket that needs the longest wait}.
+_TAKE = """
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) * 1000 + math.floor(tonumber(clock[2]) / 1000)
+local cost = tonumber(ARGV[1])
+local levels = {}
+local wait, blocking = 0, 0
+for i, key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[i * 3 - 1])
+    local burst = tonumber(ARGV[i * 3])
+    local floor = tonumber(ARGV[i * 3 + 1])
+    local state = redis.call('HMGET', key, 'tokens', 'ts')
+    local tokens = tonumber(state[1]) or burst
+    local ts = tonumber(state[2]) or now
+    tokens = math.min(burst, tokens + math.max(0, now - ts) * rate / 1000)
+    levels[i] = tokens
+    local missing = floor + cost - tokens
+    if missing > 0 then
+        local need = math.ceil(missing * 1000 / rate)
+        if need > wait then wait, blocking = need, i end
+    end
+end
+if wait > 0 then return {0, wait, blocking} end
+for i, key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[i * 3 - 1])
+    local burst = tonumber(ARGV[i * 3])
+    redis.call('HSET', key, 'tokens', tostring(levels[i] - cost), 'ts', now)
+    redis.call('PEXPIRE', key, math.ceil(burst * 1000 / rate) + 1000)
+end
+return {1, 0, 0}
+"""
+
+
+def _jwt_user():
+    try:
+        identity = json.loads(get_jwt_identity() or "{}")
+    except (TypeError, json.JSONDecodeError):
+        return None
+    return identity.get("id") if isinstance(identity, dict) else None
+
+
+def _login_email():
+    data = request.get_json(silent=True) or {}
+    email = data.get("email")
+    return email.strip().lower() if isinstance(email, str) and email.strip() else None
+
+
+# how each policy names the "user" bucket
+SUBJECTS = {"jwt": _jwt_user, "email": _login_email}
+
+
+class AdmissionControl:
+    def __init__(self):
+        self.enabled = True
+        self.policies = {}
+        self.global_bucket = (100.0, 200.0)
+        self.low_priority_reserve = 0.25
+        self._take_script = None
+        self._queue_slots = threading.BoundedSemaphore(32)
+
+    def init_app(self, app):
+        self.enabled = app.config.get("ADMISSION_ENABLED", True)
+        self.policies = app.config.get("ADMISSION_POLICIES", {})
+        self.global_bucket = app.config.get("ADMISSION_GLOBAL_BUCKET", self.global_bucket)
+        self.low_priority_reserve = app.config.get("ADMISSION_LOW_PRIORITY_RESERVE", 0.25)
+        self._queue_slots = threading.BoundedSemaphore(app.config.get("ADMISSION_MAX_QUEUED", 32))
+        app.extensions["admission"] = self
+
+    def _buckets(self, name, policy):
+        """``[(label, key, rate, burst, floor)]`` for the current request."""
+        buckets = []
+        subject = SUBJECTS[policy.get("subject", "jwt")]()
+        if subject is not None and "user" in policy:
+            rate, burst = policy["user"]
+            buckets.append(("user", f"{KEY_PREFIX}{name}:user:{subject}", rate, burst, 0))
+        if "ip" in policy:
+            rate, burst = policy["ip"]
+            buckets.append(("ip", f"{KEY_PREFIX}{name}:ip:{request.remote_addr}", rate, burst, 0))
+        if "endpoint" in policy:
+            rate, burst = policy["endpoint"]
+            buckets.append(("endpoint", f"{KEY_PREFIX}{name}:all", rate, burst, 0))
+        rate, burst = self.global_bucket
+        floor = 0 if policy.get("priority") == "high" else burst * self.low_priority_reserve
+        buckets.append(("global", f"{KEY_PREFIX}global", rate, burst, floor))
+        return buckets
+
+    def take(self, buckets):
+        """``(admitted, wait_seconds, blocking bucket label)`` for one attempt."""
+        if self._take_script is None:
+            self._take_script = redis_store.register_script(_TAKE)
+        args = [1]
+        for _, _, rate, burst, floor in buckets:
+            args.extend((rate, burst, floor))
+        admitted, wait_ms, blocking = self._take_script(keys=[b[1] for b in buckets], args=args)
+        label = buckets[blocking - 1][0] if blocking else None
+        return bool(admitted), wait_ms / 1000, label
+
+    def admit(self, name):
+        """``None`` when the request may run, otherwise the 429 response to return."""
+        policy = self.policies.get(name)
+        if not self.enabled or policy is None:
+            return None
+        buckets = self._buckets(name, policy)
+        try:
+            admitted, wait, blocking = self.take(buckets)
+            if admitted:
+                self._count(name, "admitted")
+                return None
+            if policy.get("mode") == "queue":
+                return self._queue(name, policy, buckets, wait, blocking)
+        except Exception as e:
+            logging.warning(f"Admission control unavailable, admitting {name} request: {e}")
+            self._count(name, "bypassed")
+            return None
+        return self._shed(name, wait, blocking)
+
+    def _queue(self, name, policy, buckets, wait, blocking):
+        max_wait = policy.get("max_wait", 2.0)
+        if wait > max_wait or not self._queue_slots.acquire(blocking=False):
+            return self._shed(name, wait, blocking)
+        started = time.monotonic()
+        try:
+            while True:
+                remaining = max_wait - (time.monotonic() - started)
+                if wait > remaining:
+                    return self._shed(name, wait, blocking)
+                time.sleep(wait)
+                admitted, wait, blocking = self.take(buckets)
+                if admitted:
+                    self._count(name, "queued")
+                    return None
+        finally:
+            self._queue_slots.release()
+            metrics.observe("quiz_admission_queue_wait_seconds", {"endpoint": name},
+                            time.monotonic() - started, WAIT_BUCKETS,
+                            help_text="Time requests spent queued for admission")
+
+    def _shed(self, name, wait, blocking):
+        self._count(name, "shed", blocking)
+        retry_after = max(1, math.ceil(wait))
+        response = make_response(jsonify({
+            "error": "Too many requests, please retry shortly",
+            "retry_after": retry_after,
+        }), 429)
+        response.headers["Retry-After"] = str(retry_after)
+        return response
+
+    @staticmethod
+    def _count(name, outcome, bucket=None):
+        # every sample carries the same label keys; only shed requests have a limiting bucket
+        labels = {"endpoint": name, "outcome": outcome, "bucket": bucket or "none"}
+        metrics.inc("quiz_admission_requests_total", labels,
+                    help_text="Admission decisions by endpoint, outcome and limiting bucket")
+
+    def limit(self, name):
+        """Decorator for a resource method; place it under ``jwt_required`` when the policy uses the JWT user."""
+        def decorator(fn):
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                rejected = self.admit(name)
+                if rejected is not None:
+                    return rejected
+                return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+
+admission = AdmissionControl()
@@ -0,0 +1,148 @@
+"""Packed answer storage for quiz_submissions.
+
+Each question gets a stable per-quiz ``answer_slot``. A submission's answers are
+stored as one byte per slot (0 = not answered, k + 1 = option k selected) plus a
+bitmap of correct slots, next to the legacy JSON ``answers`` column. During the
+dual-read period readers prefer the packed columns and fall back to JSON.
+"""
+import logging
+
+import numpy as np
+from sqlalchemy import inspect, text, func
+
+from applications.model import db, Question, QuizSubmission
+
+N_OPTIONS = 4
+BACKFILL_CHUNK = 5000
+
+
+def quiz_slots(quiz_id):
+    """question_id -> answer_slot for a quiz (questions without a slot are omitted)."""
+    rows = db.session.query(Question.id, Question.answer_slot).filter(
+        Question.quiz_id == quiz_id, Question.answer_slot.isnot(None)
+    ).all()
+    return dict(rows)
+
+
+def next_answer_slot(quiz_id):
+    current = db.session.query(func.max(Question.answer_slot)).filter(Question.quiz_id == quiz_id).scalar()
+    return 0 if current is None else current + 1
+
+
+def encode_answers(answers, slots):
+    """Encode a list of answer dicts to (packed_options, correct_bitmap) bytes.
+
+    Answers for questions without a slot (deleted questions) are dropped, and
+    out-of-range selected_option values are stored as "not answered" (they are
+    graded wrong either way).
+    """
+    if not slots:
+        return None, None
+    n_slots = max(slots.values()) + 1
+    selected = np.zeros(n_slots, dtype=np.uint8)
+    correct = np.zeros(n_slots, dtype=np.uint8)
+    for answer in answers:
+        slot = slots.get(answer.get('question_id'))
+        if slot is None:
+            continue
+        option = answer.get('selected_option')
+        if isinstance(option, int) and 0 <= option < N_OPTIONS:
+            selected[slot] = option + 1
+        correct[slot] = 1 if answer.get('is_correct') else 0
+    return selected.tobytes(), np.packbits(correct).tobytes()
+
+
+def decode_answers(packed, bitmap, slot_questions):
+    """Inverse of encode_answers; slot_questions maps answer_slot -> question_id.
+
+    Every question the quiz had when it was submitted gets an entry, in slot
+    order; skipped ones have ``selected_option`` None.
+    """
+    selected = np.frombuffer(packed, dtype=np.uint8)
+    correct = np.unpackbits(np.frombuffer(bitmap, dtype=np.uint8))[:len(selected)]
+    answers = []
+    for slot in sorted(slot_questions):
+        # questions added after the submission have no byte in it
+        if slot >= len(selected):
+            continue
+        question_id = slot_questions[slot]
+        option = int(selected[slot])
+        answers.append({
+            'question_id': question_id,
+            'selected_option': option - 1 if option else None,
+            'is_correct': bool(correct[slot]),
+        })
+    return answers
+
+
+def decode_matrix(packed_rows, bitmap_rows, n_slots):
+    """Bulk-decode packed rows into (selected, correct) submissions x slots uint8 arrays.
+
+    Rows written before later questions were added are shorter; they are zero-padded.
+    """
+    n = len(packed_rows)
+    n_bytes = (n_slots + 7) // 8
+    selected = np.frombuffer(
+        b"".join(row.ljust(n_slots, b"\0")[:n_slots] for row in packed_rows), dtype=np.uint8
+    ).reshape(n, n_slots)
+    bits = np.frombuffer(
+        b"".join(row.ljust(n_bytes, b"\0")[:n_bytes] for row in bitmap_rows), dtype=np.uint8
+    ).reshape(n, n_bytes)
+    correct = np.unpackbits(bits, axis=1)[:, :n_slots]
+    return selected, correct
+
+
+def submission_answers(submission, slot_questions=None):
+    """Dual read: decode the packed columns, falling back to the JSON answers for rows without them."""
+    if submission.answers_packed is None:
+        return submission.answers or []
+    if slot_questions is None:
+        slot_questions = {slot: qid for qid, slot in quiz_slots(submission.quiz_id).items()}
+    return decode_answers(submission.answers_packed, submission.correct_bitmap, slot_questions)
+
+
+def migrate_packed_answers(chunk=BACKFILL_CHUNK):
+    """Add the packed columns, assign answer slots and backfill existing submissions.
+
+    Safe to re-run: only rows still missing a slot / packed answers are touched,
+    and each chunk commits on its own so the SQLite writer lock is held briefly.
+    """
+    inspector = inspect(db.engine)
+    question_cols = {c['name'] for c in inspector.get_columns('question')}
+    submission_cols = {c['name'] for c in inspector.get_columns('quiz_submissions')}
+    with db.engine.begin() as conn:
+        if 'answer_slot' not in question_cols:
+            conn.execute(text("ALTER TABLE question ADD COLUMN answer_slot INTEGER"))
+        if 'answers_packed' not in submission_cols:
+            conn.execute(text("ALTER TABLE quiz_submissions ADD COLUMN answers_packed BLOB"))
+        if 'correct_bitmap' not in submission_cols:
+            conn.execute(text("ALTER TABLE quiz_submissions ADD COLUMN correct_bitmap BLOB"))
+
+    pending = db.session.query(Question.quiz_id).filter(Question.answer_slot.is_(None)).distinct().all()
+    for (quiz_id,) in pending:
+        slot = next_answer_slot(quiz_id)
+        for question in Question.query.filter_by(quiz_id=quiz_id, answer_slot=None).order_by(Question.q_no, Question.id):
+            question.answer_slot = slot
+            slot += 1
+    db.session.commit()
+
+    migrated, last_id, slot_cache = 0, 0, {}
+    while True:
+        batch = (
+            QuizSubmission.query
+            .filter(QuizSubmission.id > last_id, QuizSubmission.answers_packed.is_(None))
+            .order_by(QuizSubmission.id)
+            .limit(chunk)
+            .all()
+        )
+        if not batch:
+            break
+        for sub in batch:
+            if sub.quiz_id not in slot_cache:
+                slot_cache[sub.quiz_id] = quiz_slots(sub.quiz_id)
+            sub.answers_packed, sub.correct_bitmap = encode_answers(sub.answers or [], slot_cache[sub.quiz_id])
+            migrated += sub.answers_packed is not None
+        last_id = batch[-1].id
+        db.session.commit()
+        logging.info(f"Packed answers backfilled up to submission {last_id}")
+    return migrated
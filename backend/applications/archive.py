@@ -0,0 +1,147 @@
+"""Hot/cold split of quiz_submissions.
+
+``archive_submissions`` moves every submission older than the archive cutoff
+(the first day of the month ``ARCHIVE_AFTER_DAYS`` ago, so whole months move
+together) into ``quiz_submissions_archive`` with JSON answers zlib-compressed,
+and folds it into ``submission_archive_summaries``: one row per month, user and
+quiz. Each chunk is inserted, summarized and deleted from the hot table in one
+transaction, so a row is always in exactly one of the two tables.
+
+Readers stay on the hot table unless their date range reaches back past
+``archived_until()``; then they add the summaries (lists, averages) or the
+archived rows (leaderboard and rollup rebuilds, item analytics, answer review).
+"""
+import json
+import zlib
+from datetime import date, datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import func, literal, union_all
+from sqlalchemy.dialects.sqlite import insert
+
+from applications.model import db, QuizSubmission, ArchivedSubmission, SubmissionSummary
+from applications.user_report_cache import bump_user_version
+from applications.worker import db_batch
+
+ARCHIVE_CHUNK = 1000
+
+
+def month_start(ts):
+    return date(ts.year, ts.month, 1)
+
+
+def archive_cutoff(now=None):
+    """Submissions before this instant belong in the archive."""
+    now = now or datetime.now()
+    start = month_start(now - timedelta(days=current_app.config["ARCHIVE_AFTER_DAYS"]))
+    return datetime(start.year, start.month, 1)
+
+
+def archived_until():
+    """Latest archived ``submitted_at``, or None while nothing has been archived."""
+    return db.session.query(func.max(ArchivedSubmission.submitted_at)).scalar()
+
+
+def reaches_archive(start):
+    """Whether a report starting at ``start`` (None = all time) needs archived data."""
+    until = archived_until()
+    return until is not None and (start is None or start <= until)
+
+
+def _archived_row(submission):
+    return {
+        "id": submission.id,
+        "quiz_id": submission.quiz_id,
+        "user_id": submission.user_id,
+        "score": submission.score,
+        "total_questions": submission.total_questions,
+        "submitted_at": submission.submitted_at,
+        "answers_z": zlib.compress(json.dumps(submission.answers).encode()) if submission.answers else None,
+        "answers_packed": submission.answers_packed,
+        "correct_bitmap": submission.correct_bitmap,
+    }
+
+
+def _summarize(submissions):
+    summaries = {}
+    for sub in submissions:
+        key = (month_start(sub.submitted_at), sub.user_id, sub.quiz_id)
+        row = summaries.get(key)
+        if row is None:
+            row = summaries[key] = {
+                "period_start": key[0], "user_id": sub.user_id, "quiz_id": sub.quiz_id, "count": 0,
+                "score_sum": 0, "best_score": sub.score, "total_questions": 0,
+                "last_submitted_at": sub.submitted_at,
+            }
+        row["count"] += 1
+        row["score_sum"] += sub.score
+        row["best_score"] = max(row["best_score"], sub.score)
+        row["total_questions"] = max(row["total_questions"], sub.total_questions)
+        row["last_submitted_at"] = max(row["last_submitted_at"], sub.submitted_at)
+    return list(summaries.values())
+
+
+def _upsert_summaries(rows):
+    stmt = insert(SubmissionSummary).values(rows)
+    excluded = stmt.excluded
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["period_start", "user_id", "quiz_id"],
+        set_={
+            "count": SubmissionSummary.count + excluded.count,
+            "score_sum": SubmissionSummary.score_sum + excluded.score_sum,
+            # two-argument max() is SQLite's scalar max
+            "best_score": func.max(SubmissionSummary.best_score, excluded.best_score),
+            "total_questions": func.max(SubmissionSummary.total_questions, excluded.total_questions),
+            "last_submitted_at": func.max(SubmissionSummary.last_submitted_at, excluded.last_submitted_at),
+        },
+    )
+    db.session.execute(stmt)
+
+
+def archive_submissions(cutoff=None, chunk=ARCHIVE_CHUNK):
+    """Move submissions older than ``cutoff`` to the archive; returns how many moved."""
+    cutoff = cutoff or archive_cutoff()
+    moved = 0
+    users = set()
+    old = QuizSubmission.query.filter(QuizSubmission.submitted_at < cutoff)
+    for submissions in db_batch(old, size=chunk):
+        db.session.execute(ArchivedSubmission.__table__.insert(), [_archived_row(s) for s in submissions])
+        _upsert_summaries(_summarize(submissions))
+        db.session.execute(
+            QuizSubmission.__table__.delete().where(QuizSubmission.id.in_([s.id for s in submissions]))
+        )
+        moved += len(submissions)
+        users.update(s.user_id for s in submissions)
+    # their reports now show monthly summaries instead of these rows
+    bump_user_version(*users)
+    return moved
+
+
+def summaries(user_id=None, quiz_id=None, start=None, end=None):
+    """Archive summaries for the months overlapping ``[start, end)``."""
+    query = SubmissionSummary.query
+    if user_id is not None:
+        query = query.filter(SubmissionSummary.user_id == user_id)
+    if quiz_id is not None:
+        query = query.filter(SubmissionSummary.quiz_id == quiz_id)
+    if start is not None:
+        query = query.filter(SubmissionSummary.period_start >= month_start(start))
+    if end is not None:
+        query = query.filter(SubmissionSummary.period_start < end)
+    return query.order_by(SubmissionSummary.period_start, SubmissionSummary.quiz_id).all()
+
+
+def totals():
+    """``(count, score_sum)`` over every archived submission."""
+    count, score_sum = db.session.query(
+        func.coalesce(func.sum(SubmissionSummary.count), 0),
+        func.coalesce(func.sum(SubmissionSummary.score_sum), 0),
+    ).one()
+    return count, score_sum
+
+
+def all_submissions(*columns):
+    """``UNION ALL`` of the named columns from the hot and archive tables, as a subquery."""
+    hot = db.session.query(*(getattr(QuizSubmission, c) for c in columns), literal(False).label("archived"))
+    cold = db.session.query(*(getattr(ArchivedSubmission, c) for c in columns), literal(True).label("archived"))
+    return union_all(hot.statement, cold.statement).subquery()
@@ -0,0 +1,151 @@
+from flask import request, jsonify, make_response, current_app
+from flask_restful import Resource
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from applications.model import Quiz
+from applications.attempts import attempts, is_timed, valid_option, SAVE_ERRORS
+import json
+import time
+from datetime import datetime
+from redis.exceptions import RedisError
+
+MAX_ANSWERS_PER_SAVE = 500
+
+
+def _current_user_id():
+    try:
+        current_user = json.loads(get_jwt_identity() or "{}")
+    except json.JSONDecodeError:
+        return None
+    return current_user.get('id')
+
+
+def _parse_answers(data):
+    """``{"<question_id>": option or null}`` -> ``{int: int or None}``; None if malformed."""
+    answers = data.get('answers', {})
+    if not isinstance(answers, dict) or len(answers) > MAX_ANSWERS_PER_SAVE:
+        return None
+    parsed = {}
+    for question_id, option in answers.items():
+        try:
+            question_id = int(question_id)
+        except (TypeError, ValueError):
+            return None
+        if not valid_option(option):
+            return None
+        parsed[question_id] = option
+    return parsed
+
+
+def _store_unavailable(e):
+    current_app.logger.error(f'Attempt store unavailable: {str(e)}')
+    return make_response(jsonify({"error": "Timed quizzes are temporarily unavailable, please retry"}), 503)
+
+
+def _attempt_json(quiz_id, state):
+    return {
+        "quiz_id": quiz_id,
+        "started_at": datetime.fromtimestamp(state["started_at"]).isoformat(),
+        "deadline": datetime.fromtimestamp(state["deadline"]).isoformat(),
+        "remaining_seconds": max(int(state["deadline"] - time.time()), 0),
+        "seq": state["seq"],
+        "answers": {str(qid): option for qid, option in state["answers"].items()}
+    }
+
+
+class QuizAttemptAPI(Resource):
+    @jwt_required()
+    def get(self, quiz_id):
+        """Resume: the attempt in progress for this quiz, e.g. after a page refresh."""
+        user_id = _current_user_id()
+        if user_id is None:
+            return make_response(jsonify({"error": "Invalid user identity in token"}), 401)
+        try:
+            state = attempts.get(quiz_id, user_id)
+        except RedisError as e:
+            return _store_unavailable(e)
+        if state is None:
+            return make_response(jsonify({"error": "No attempt in progress"}), 404)
+        return make_response(jsonify(_attempt_json(quiz_id, state)), 200)
+
+    @jwt_required()
+    def post(self, quiz_id):
+        """Start an attempt (or resume the running one); the deadline is set here."""
+        user_id = _current_user_id()
+        if user_id is None:
+            return make_response(jsonify({"error": "Invalid user identity in token"}), 401)
+        quiz = Quiz.query.get(quiz_id)
+        if not quiz:
+            return make_response(jsonify({"error": "Quiz not found"}), 404)
+        if not is_timed(quiz):
+            return make_response(jsonify({"error": "This quiz has no time limit; submit it directly"}), 400)
+
+        try:
+            state = attempts.start(quiz, user_id)
+            if attempts.expired(state):
+                # an earlier attempt ran out of time without being finished: submit it first
+                attempts.finish(quiz_id, user_id)
+                state = attempts.start(quiz, user_id)
+        except RedisError as e:
+            return _store_unavailable(e)
+        except Exception as e:
+            current_app.logger.error(f'Attempt start error: {str(e)}')
+            return make_response(jsonify({"error": "Failed to start attempt"}), 500)
+        return make_response(jsonify(_attempt_json(quiz_id, state)), 200)
+
+    @jwt_required()
+    def patch(self, quiz_id):
+        """Autosave changed answers; only Redis is written, never the database."""
+        user_id = _current_user_id()
+        if user_id is None:
+            return make_response(jsonify({"error": "Invalid user identity in token"}), 401)
+        data = request.get_json(silent=True) or {}
+        answers = _parse_answers(data)
+        if answers is None:
+            return make_response(jsonify({"error": "answers must map question ids to an option 0-3 or null"}), 400)
+        seq = data.get('seq')
+        if seq is not None and type(seq) is not int:
+            return make_response(jsonify({"error": "seq must be an integer"}), 400)
+
+        try:
+            result = attempts.save(quiz_id, user_id, answers, seq)
+        except RedisError as e:
+            return _store_unavailable(e)
+        if result < 0:
+            return make_response(jsonify({"error": SAVE_ERRORS[result]}), 404 if result == -1 else 409)
+        # seq 0 means a newer save already landed; the client can drop this one
+        return make_response(jsonify({"seq": result, "stale": result == 0}), 200)
+
+
+class FinishAttemptAPI(Resource):
+    @jwt_required()
+    def post(self, quiz_id):
+        """Grade the attempt and write the submission; answers sent here count as a last autosave."""
+        user_id = _current_user_id()
+        if user_id is None:
+            return make_response(jsonify({"error": "Invalid user identity in token"}), 401)
+        data = request.get_json(silent=True) or {}
+        answers = _parse_answers(data)
+        if answers is None:
+            return make_response(jsonify({"error": "answers must map question ids to an option 0-3 or null"}), 400)
+
+        seq = data.get('seq') if type(data.get('seq')) is int else None
+        try:
+            if answers:
+                # a late final save is dropped (-2); whatever was saved in time is graded
+                attempts.save(quiz_id, user_id, answers, seq)
+            result = attempts.finish(quiz_id, user_id)
+        except RedisError as e:
+            return _store_unavailable(e)
+        except Exception as e:
+            current_app.logger.error(f'Attempt finish error: {str(e)}')
+            return make_response(jsonify({"error": "Submission failed"}), 500)
+        if result is None:
+            return make_response(jsonify({"error": "No attempt in progress"}), 404)
+
+        submission, score, total = result
+        return make_response(jsonify({
+            "message": "Quiz submitted successfully",
+            "submission_id": submission.id,
+            "score": score,
+            "total": total
+        }), 200)
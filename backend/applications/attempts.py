@@ -0,0 +1,204 @@
+"""Server-side quiz attempts, kept in Redis until they are graded.
+
+An attempt is one hash per (quiz, user) at ``attempt:quiz:<quiz_id>:<user_id>``
+holding ``started_at``, ``deadline``, ``seq`` and one ``q:<question_id>`` field
+per answered question. The deadline is ``started_at + Quiz.time_duration``;
+autosaves are accepted until ``deadline + ATTEMPT_GRACE_SECONDS`` and checked
+atomically in Lua, so the server, not the browser, decides when time is up.
+Autosaves never touch SQLite: only the graded result of a finished attempt is
+written, through ``store_submission``. Attempts nobody finished are submitted
+by the ``finalize_expired_attempts`` task from the ``attempts:deadlines`` set.
+"""
+import logging
+import time
+from datetime import datetime
+
+from applications.extensions import redis_store
+from applications.model import db, Quiz
+
+KEY_PREFIX = "attempt:quiz:"
+DEADLINES_KEY = "attempts:deadlines"
+SWEEP_BATCH = 200
+OPTION_COUNT = 4
+
+# KEYS: attempt hash, deadline set. ARGV: now, deadline, expire_at, deadline member
+_START = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    redis.call('HSET', KEYS[1], 'started_at', ARGV[1], 'deadline', ARGV[2], 'seq', 0)
+    redis.call('EXPIREAT', KEYS[1], ARGV[3])
+    redis.call('ZADD', KEYS[2], ARGV[2], ARGV[4])
+end
+return redis.call('HGETALL', KEYS[1])
+"""
+
+# KEYS: attempt hash. ARGV: now, grace, seq ('' = next), field, value, field, value, ...
+# Returns the stored seq, 0 for a stale (already superseded) save, -1 no attempt,
+# -2 past the deadline, -3 attempt is being submitted.
+_SAVE = """
+local deadline = redis.call('HGET', KEYS[1], 'deadline')
+if not deadline then return -1 end
+if redis.call('HEXISTS', KEYS[1], 'finishing') == 1 then return -3 end
+if tonumber(ARGV[1]) > tonumber(deadline) + tonumber(ARGV[2]) then return -2 end
+local current = tonumber(redis.call('HGET', KEYS[1], 'seq'))
+local seq = current + 1
+if ARGV[3] ~= '' then seq = tonumber(ARGV[3]) end
+if seq <= current then return 0 end
+for i = 4, #ARGV, 2 do
+    redis.call('HSET', KEYS[1], ARGV[i], ARGV[i + 1])
+end
+redis.call('HSET', KEYS[1], 'seq', seq)
+return seq
+"""
+
+SAVE_ERRORS = {-1: "No attempt in progress", -2: "Time is up for this attempt",
+               -3: "Attempt is already being submitted"}
+
+
+def _key(quiz_id, user_id):
+    return f"{KEY_PREFIX}{quiz_id}:{user_id}"
+
+
+def duration_seconds(time_duration):
+    hours, minutes = map(int, time_duration.split(':'))
+    return hours * 3600 + minutes * 60
+
+
+def is_timed(quiz):
+    """Quizzes with a "00:00" duration have no deadline and need no attempt."""
+    return duration_seconds(quiz.time_duration) > 0
+
+
+def valid_option(option):
+    """An answer is an option index 0-3, or None for a skipped question."""
+    return option is None or (type(option) is int and 0 <= option < OPTION_COUNT)
+
+
+class AttemptStore:
+    def __init__(self):
+        self.grace = 30
+        self.retention = 3600
+        self._start_script = None
+        self._save_script = None
+
+    def init_app(self, app):
+        self.grace = app.config.get("ATTEMPT_GRACE_SECONDS", 30)
+        self.retention = app.config.get("ATTEMPT_RETENTION_SECONDS", 3600)
+        app.extensions["attempts"] = self
+
+    def _scripts(self):
+        if self._save_script is None:
+            self._start_script = redis_store.register_script(_START)
+            self._save_script = redis_store.register_script(_SAVE)
+        return self._start_script, self._save_script
+
+    @staticmethod
+    def _state(raw):
+        fields = {k.decode(): v.decode() for k, v in raw.items()}
+        answers = {}
+        for field, value in fields.items():
+            if field.startswith("q:"):
+                answers[int(field[2:])] = int(value) if value != "" else None
+        return {
+            "started_at": float(fields["started_at"]),
+            "deadline": float(fields["deadline"]),
+            "seq": int(fields.get("seq", 0)),
+            "answers": answers,
+        }
+
+    def start(self, quiz, user_id, now=None):
+        """Start an attempt, or return the one already running for this user."""
+        if not is_timed(quiz):
+            # no deadline to enforce; the sweeper would later submit an empty copy
+            raise ValueError(f"Quiz {quiz.id} has no time limit")
+        now = time.time() if now is None else now
+        deadline = now + duration_seconds(quiz.time_duration)
+        expire_at = int(deadline + self.grace + self.retention)
+        start, _ = self._scripts()
+        raw = start(keys=[_key(quiz.id, user_id), DEADLINES_KEY],
+                    args=[now, deadline, expire_at, f"{quiz.id}:{user_id}"])
+        return self._state(dict(zip(raw[::2], raw[1::2])))
+
+    def get(self, quiz_id, user_id):
+        raw = redis_store.hgetall(_key(quiz_id, user_id))
+        if not raw or b"deadline" not in raw:
+            return None
+        return self._state(raw)
+
+    def save(self, quiz_id, user_id, answers, seq=None, now=None):
+        """Write changed answers ``{question_id: option or None}``; see ``_SAVE`` for the result."""
+        now = time.time() if now is None else now
+        args = [now, self.grace, "" if seq is None else int(seq)]
+        for question_id, option in answers.items():
+            if type(question_id) is not int or not valid_option(option):
+                raise ValueError(f"Invalid answer {question_id!r}: {option!r}")
+            args += [f"q:{question_id}", "" if option is None else option]
+        _, save = self._scripts()
+        return save(keys=[_key(quiz_id, user_id)], args=args)
+
+    def expired(self, state, now=None):
+        now = time.time() if now is None else now
+        return now > state["deadline"] + self.grace
+
+    def finish(self, quiz_id, user_id):
+        """Grade and store the attempt; returns ``(submission, score, total)`` or None.
+
+        ``finishing`` is claimed with HSETNX so concurrent finishes (a double click,
+        the sweeper) store exactly one submission. If the write fails the claim is
+        released and the attempt stays in Redis to be finished again.
+        """
+        from applications.submissions import store_submission
+        key = _key(quiz_id, user_id)
+        if not redis_store.exists(key) or not redis_store.hsetnx(key, "finishing", 1):
+            return None
+        state = self.get(quiz_id, user_id)
+        quiz = Quiz.query.get(quiz_id)
+        # a quiz whose time limit was removed is submitted directly, never from an attempt
+        if state is None or quiz is None or not is_timed(quiz):
+            self.discard(quiz_id, user_id)
+            return None
+        answers = [{"question_id": qid, "selected_option": option} for qid, option in state["answers"].items()]
+        submitted_at = datetime.fromtimestamp(min(time.time(), state["deadline"] + self.grace))
+        try:
+            result = store_submission(quiz, user_id, answers, submitted_at=submitted_at)
+        except Exception:
+            db.session.rollback()
+            redis_store.hdel(key, "finishing")
+            raise
+        self.discard(quiz_id, user_id)
+        return result
+
+    def discard(self, quiz_id, user_id):
+        """Drop an attempt and its deadline entry without grading it."""
+        pipe = redis_store.pipeline()
+        pipe.delete(_key(quiz_id, user_id))
+        pipe.zrem(DEADLINES_KEY, f"{quiz_id}:{user_id}")
+        pipe.execute()
+
+    def finalize_expired(self, now=None):
+        """Submit every attempt whose deadline and grace period have passed."""
+        now = time.time() if now is None else now
+        finalized = kept = 0
+        while True:
+            # members that failed or are being finished elsewhere stay in the set (for the
+            # next run) ahead of the unseen ones
+            members = redis_store.zrangebyscore(DEADLINES_KEY, "-inf", now - self.grace,
+                                                start=kept, num=SWEEP_BATCH)
+            if not members:
+                return finalized
+            for member in members:
+                quiz_id, user_id = map(int, member.decode().split(":"))
+                try:
+                    if self.finish(quiz_id, user_id):
+                        finalized += 1
+                    elif redis_store.exists(_key(quiz_id, user_id)):
+                        # another finisher holds the claim: its store removes the entry, and if
+                        # it fails the claim is released and this entry retries it next run
+                        kept += 1
+                    else:
+                        # already finished, or expired out of Redis
+                        redis_store.zrem(DEADLINES_KEY, member)
+                except Exception as e:
+                    logging.error(f"Could not submit expired attempt {member.decode()}: {e}")
+                    kept += 1
+
+attempts = AttemptStore()
@@ -0,0 +1,104 @@
+"""Cache warm-up for the catalog and the quizzes students are about to take.
+
+``warm_caches`` precomputes ``subjects``, ``chapters``, ``chapters_<subject_id>``
+and, for every quiz whose ``date_of_quiz..last_date`` window is open or opens
+within ``CACHE_WARM_DAYS_AHEAD`` days, ``questions_<quiz_id>`` and the quiz
+bundle. Each key is written with the timeout its endpoint uses on a miss
+(one ``set_many`` per timeout), so a warmed entry goes stale no later than one
+the endpoint cached itself. It runs when a
+worker boots, every ``CACHE_WARM_INTERVAL`` seconds from beat (which also
+repairs a flushed Redis), and after admin writes via ``schedule_cache_warm``.
+"""
+import logging
+import time
+from datetime import date, timedelta
+
+from flask import current_app
+
+from applications.catalog import (chapters_payload, subjects_payload, question_json, questions_by_quiz,
+                                  SUBJECTS_TIMEOUT, CHAPTERS_TIMEOUT, QUESTIONS_TIMEOUT)
+from applications.extensions import cache, redis_store
+from applications.metrics import shared_metrics
+from applications.model import Quiz
+from applications.quiz_bundle import bundle_for, bundle_key, BUNDLE_TIMEOUT
+
+PENDING_KEY = "cache_warm:pending"
+DURATION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def quizzes_to_warm(today=None):
+    """Quizzes that are open today or open within the look-ahead window."""
+    today = today or date.today()
+    horizon = today + timedelta(days=current_app.config["CACHE_WARM_DAYS_AHEAD"])
+    return Quiz.query.filter(Quiz.date_of_quiz <= horizon, Quiz.last_date >= today).order_by(Quiz.id).all()
+
+
+def build_entries(today=None):
+    """``{timeout: {cache_key: value}}`` for everything the warmer keeps hot, plus the number of quizzes."""
+    batches = {}
+
+    def put(timeout, key, value):
+        batches.setdefault(timeout, {})[key] = value
+
+    chapters = chapters_payload()
+    put(SUBJECTS_TIMEOUT, "subjects", subjects_payload())
+    put(CHAPTERS_TIMEOUT, "chapters", chapters)
+    per_subject = {}
+    for chapter in chapters:
+        per_subject.setdefault(chapter["subject_id"], []).append(chapter)
+    for subject_id, subject_chapters in per_subject.items():
+        put(CHAPTERS_TIMEOUT, f"chapters_{subject_id}", subject_chapters)
+
+    quizzes = quizzes_to_warm(today)
+    questions = questions_by_quiz([quiz.id for quiz in quizzes])
+    for quiz in quizzes:
+        put(QUESTIONS_TIMEOUT, f"questions_{quiz.id}", [question_json(question) for question in questions[quiz.id]])
+        put(BUNDLE_TIMEOUT, bundle_key(quiz.id), bundle_for(quiz, questions[quiz.id]))
+    return batches, len(quizzes)
+
+
+def warm_caches(today=None):
+    """Fill every warm-up key and return a report of what was cold before and how long it took."""
+    start = time.perf_counter()
+    batches, n_quizzes = build_entries(today)
+    keys = [key for entries in batches.values() for key in entries]
+    already_cached = cache.count_existing(*keys)
+    for timeout, entries in batches.items():
+        cache.set_many(entries, timeout=timeout)
+    duration = time.perf_counter() - start
+
+    report = {
+        "keys": len(keys),
+        "already_cached": already_cached,
+        "warmed": len(keys) - already_cached,
+        "coverage_before": round(already_cached / len(keys), 3) if keys else 1.0,
+        "quizzes": n_quizzes,
+        "duration_ms": round(duration * 1000, 1),
+    }
+    shared_metrics.inc("quiz_cache_warm_keys_total", {"state": "cold"}, len(keys) - already_cached,
+                       help_text="Keys written by the cache warmer, by whether they were missing beforehand")
+    shared_metrics.inc("quiz_cache_warm_keys_total", {"state": "cached"}, already_cached)
+    shared_metrics.observe("quiz_cache_warm_duration_seconds", {}, duration, DURATION_BUCKETS,
+                           help_text="Cache warm-up run time")
+    logging.info(f"Cache warm-up: {report['warmed']}/{report['keys']} keys were cold, "
+                 f"{n_quizzes} quiz(zes), {report['duration_ms']} ms")
+    return report
+
+
+def schedule_cache_warm():
+    """Enqueue one warm-up shortly after an admin write; writes in the same burst share it."""
+    debounce = current_app.config["CACHE_WARM_DEBOUNCE"]
+    try:
+        # the task clears the flag when it starts, so writes after that enqueue a fresh run
+        if not redis_store.set(PENDING_KEY, 1, nx=True, ex=debounce + 300):
+            return
+    except Exception as e:
+        logging.warning(f"Cache warm-up not scheduled: {e}")
+        return
+    try:
+        from applications.task import warm_caches as warm_caches_task
+        warm_caches_task.apply_async(countdown=debounce)
+    except Exception as e:
+        # the write is committed and its keys invalidated; readers just refill them on a miss
+        redis_store.delete(PENDING_KEY)
+        logging.warning(f"Cache warm-up not scheduled: {e}")
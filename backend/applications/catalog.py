@@ -0,0 +1,75 @@
+"""Payloads of the cached catalog endpoints: ``subjects``, ``chapters[_<subject_id>]`` and ``questions_<quiz_id>``.
+
+The GET handlers and the cache warmer build them with these functions, so a
+warmed entry is byte-for-byte what the endpoint would have cached on a miss.
+"""
+from sqlalchemy.orm import selectinload
+
+from applications.model import Subject, Chapter, Question
+
+IN_CHUNK = 500
+
+# how long each endpoint caches its payload; None means CACHE_DEFAULT_TIMEOUT
+SUBJECTS_TIMEOUT = 120
+CHAPTERS_TIMEOUT = None
+QUESTIONS_TIMEOUT = 120
+
+
+def chapter_json(chapter, with_subject=True):
+    data = {
+        "id": chapter.id,
+        "name": chapter.name,
+        "description": chapter.description,
+        "n_questions": chapter.n_questions,
+        "n_quizzes": chapter.n_quizzes,
+    }
+    if with_subject:
+        data["subject_id"] = chapter.subject_id
+    return data
+
+
+def subjects_payload():
+    subjects = Subject.query.options(selectinload(Subject.chapters)).all()
+    return [
+        {
+            "id": subject.id,
+            "name": subject.name,
+            "description": subject.description,
+            "chapters": [chapter_json(chapter, with_subject=False) for chapter in subject.chapters],
+        }
+        for subject in subjects
+    ]
+
+
+def chapters_payload(subject_id=None):
+    query = Chapter.query
+    if subject_id is not None:
+        query = query.filter_by(subject_id=subject_id)
+    return [chapter_json(chapter) for chapter in query.all()]
+
+
+def question_json(question):
+    return {
+        "id": question.id,
+        "quiz_id": question.quiz_id,
+        "q_no": question.q_no,
+        "title": question.title,
+        "question_statement": question.question_statement,
+        "options": [question.option1, question.option2, question.option3, question.option4],
+        "correct_option": question.correct_option,
+    }
+
+
+def questions_payload(quiz_id):
+    return [question_json(question) for question in Question.query.filter_by(quiz_id=quiz_id).all()]
+
+
+def questions_by_quiz(quiz_ids):
+    """``{quiz_id: [Question, ...]}`` in id order, loaded with one query per IN_CHUNK quizzes."""
+    grouped = {quiz_id: [] for quiz_id in quiz_ids}
+    ids = list(grouped)
+    for start in range(0, len(ids), IN_CHUNK):
+        chunk = ids[start:start + IN_CHUNK]
+        for question in Question.query.filter(Question.quiz_id.in_(chunk)).order_by(Question.id):
+            grouped[question.quiz_id].append(question)
+    return grouped
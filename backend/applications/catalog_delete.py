@@ -0,0 +1,342 @@
+"""Deleting subjects, chapters and quizzes together with everything under them.
+
+The foreign keys below ``subject`` are ``ON DELETE CASCADE`` (enforced through
+``PRAGMA foreign_keys``, see ``model.py``), so removing a catalog row is one
+set-based DELETE: chapters, quizzes, questions, hot and archived submissions,
+rollups and archive summaries go with it, and the search triggers fire for
+every cascaded row. ``delete_target`` adds, in the same transaction, what the
+database can't derive: the deleted attempts come off the users' mastery totals
+(``user_progress`` rows of a removed subject or chapter are dropped) and the
+chapter counters are recounted. After the commit it clears the catalog, question
+and bundle caches, the quizzes' leaderboards, the report caches of every user
+who lost submissions and the recommendations, and schedules a snapshot refresh.
+
+Targets with more than ``CATALOG_DELETE_SYNC_ROWS`` questions and submissions
+are deleted by a background job (``start_delete_job``) instead: it removes them
+``CATALOG_DELETE_CHUNK`` rows per transaction, pausing in between so the SQLite
+write lock is only ever held briefly, then runs ``delete_target`` on what is left.
+Jobs are JSON documents in Redis (``delete_job:<id>``), like report jobs.
+"""
+import json
+import logging
+import time
+import uuid
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import and_, delete, func, or_, select
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+from applications.cache_warmer import schedule_cache_warm
+from applications.dashboard import CACHE_KEY as DASHBOARD_KEY
+from applications.extensions import cache, redis_store
+from applications.leaderboard import leaderboard
+from applications.model import db, Subject, Chapter, Quiz, Question, QuizSubmission, SubmissionRollup, \
+    ArchivedSubmission, SubmissionSummary, UserProgress
+from applications.progress import discard_progress, invalidate_all_recommendations
+from applications.quiz_bundle import invalidate_quiz_content
+from applications.user_report_cache import bump_user_version
+
+TARGETS = {"subject": Subject, "chapter": Chapter, "quiz": Quiz}
+SUBMISSION_MODELS = (QuizSubmission, ArchivedSubmission)
+JOB_PREFIX = "delete_job:"
+RUNNING_PREFIX = "delete_running:"
+# parents first, so children of rows dropped as orphans are dropped too
+CASCADE_MODELS = (Chapter, Quiz, Question, QuizSubmission, SubmissionRollup, ArchivedSubmission, SubmissionSummary)
+
+
+def _quizzes(kind, target_id):
+    """Select of the ids of every quiz under the target."""
+    if kind == "quiz":
+        return select(Quiz.id).where(Quiz.id == target_id)
+    if kind == "chapter":
+        return select(Quiz.id).where(Quiz.chapter_id == target_id)
+    return select(Quiz.id).join(Chapter, Quiz.chapter_id == Chapter.id).where(Chapter.subject_id == target_id)
+
+
+def _subject_id(kind, target):
+    if kind == "subject":
+        return target.id
+    return target.subject_id if kind == "chapter" else target.chapter.subject_id
+
+
+def _surviving_scopes(kind, target):
+    """Progress scopes that outlive the target but lose its attempts."""
+    if kind == "quiz":
+        return [("chapter", target.chapter_id), ("subject", _subject_id(kind, target))]
+    if kind == "chapter":
+        return [("subject", target.subject_id)]
+    return []
+
+
+def _removed_scopes(kind, target_id):
+    """Filter on ``user_progress`` rows that describe the target itself."""
+    if kind == "chapter":
+        return and_(UserProgress.scope == "chapter", UserProgress.scope_id == target_id)
+    return or_(
+        and_(UserProgress.scope == "subject", UserProgress.scope_id == target_id),
+        and_(UserProgress.scope == "chapter",
+             UserProgress.scope_id.in_(select(Chapter.id).where(Chapter.subject_id == target_id))),
+    )
+
+
+def deletion_size(kind, target_id):
+    """Questions plus hot and archived submissions that deleting the target removes."""
+    quizzes = _quizzes(kind, target_id)
+    return sum(
+        db.session.query(func.count(model.id)).filter(model.quiz_id.in_(quizzes)).scalar()
+        for model in (Question,) + SUBMISSION_MODELS
+    )
+
+
+def _purge_submissions(model, quizzes, scopes, limit=None):
+    """Delete submissions of ``quizzes`` (the ``limit`` oldest) and take them off the ``scopes`` totals.
+
+    Returns ``(rows deleted, user ids that lost submissions)``; runs inside the caller's transaction.
+    """
+    doomed = select(model.id).where(model.quiz_id.in_(quizzes))
+    if limit:
+        doomed = doomed.order_by(model.id).limit(limit)
+    # RETURNING reads exactly the rows removed, whatever was submitted meanwhile
+    rows = db.session.execute(
+        delete(model).where(model.id.in_(doomed)).returning(model.user_id, model.score, model.total_questions)
+    ).all()
+    discard_progress(rows, scopes)
+    return len(rows), {user_id for user_id, _, _ in rows}
+
+
+def _purge_questions(quizzes, limit):
+    """Delete the ``limit`` oldest questions of ``quizzes`` and recount their quizzes and chapters."""
+    doomed = select(Question.id).where(Question.quiz_id.in_(quizzes)).order_by(Question.id).limit(limit)
+    rows = db.session.execute(delete(Question).where(Question.id.in_(doomed)).returning(Question.quiz_id)).all()
+    quiz_ids = {quiz_id for (quiz_id,) in rows}
+    if quiz_ids:
+        Quiz.query.filter(Quiz.id.in_(quiz_ids)).update(
+            {Quiz.num_questions: select(func.count(Question.id)).where(Question.quiz_id == Quiz.id).scalar_subquery()},
+            synchronize_session=False,
+        )
+        _recount_chapters(select(Quiz.chapter_id).where(Quiz.id.in_(quiz_ids)))
+    return len(rows)
+
+
+def _recount_chapters(chapter_ids):
+    Chapter.query.filter(Chapter.id.in_(chapter_ids)).update(
+        {
+            Chapter.n_quizzes: select(func.count(Quiz.id)).where(Quiz.chapter_id == Chapter.id).scalar_subquery(),
+            Chapter.n_questions: select(func.count(Question.id)).join(Quiz, Question.quiz_id == Quiz.id)
+            .where(Quiz.chapter_id == Chapter.id).scalar_subquery(),
+        },
+        synchronize_session=False,
+    )
+
+
+def _clear_caches(subject_id, quiz_ids, user_ids):
+    """Drop everything cached about the deleted rows; the delete itself is already committed."""
+    cache.delete_keys("subjects", "chapters", f"chapters_{subject_id}", DASHBOARD_KEY)
+    invalidate_quiz_content(*quiz_ids)
+    for quiz_id in quiz_ids:
+        try:
+            leaderboard.clear(quiz_id)
+        except Exception as e:
+            logging.error(f"Leaderboard not cleared for deleted quiz {quiz_id}: {e}")
+    bump_user_version(*user_ids)
+    if quiz_ids:
+        # any user's recommendations may list one of them
+        invalidate_all_recommendations()
+        try:
+            from applications.task import refresh_submission_snapshot
+            refresh_submission_snapshot.delay()
+        except Exception as e:
+            # beat refreshes it within SNAPSHOT_INTERVAL anyway
+            logging.warning(f"Snapshot refresh not scheduled: {e}")
+    schedule_cache_warm()
+
+
+def delete_target(kind, target_id):
+    """Delete one subject, chapter or quiz and everything under it in one transaction.
+
+    Returns False when it does not exist.
+    """
+    target = db.session.get(TARGETS[kind], target_id)
+    if target is None:
+        return False
+    subject_id = _subject_id(kind, target)
+    chapter_id = target.chapter_id if kind == "quiz" else None
+    scopes = _surviving_scopes(kind, target)
+    quizzes = _quizzes(kind, target_id)
+    quiz_ids = [quiz_id for (quiz_id,) in db.session.execute(quizzes)]
+    db.session.expunge(target)
+
+    try:
+        user_ids = set()
+        # the cascade would remove these too, but their attempts have to come off the totals first
+        for model in SUBMISSION_MODELS:
+            user_ids |= _purge_submissions(model, quizzes, scopes)[1]
+        if kind != "quiz":
+            UserProgress.query.filter(_removed_scopes(kind, target_id)).delete(synchronize_session=False)
+        TARGETS[kind].query.filter_by(id=target_id).delete(synchronize_session=False)
+        if chapter_id is not None:
+            _recount_chapters([chapter_id])
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    _clear_caches(subject_id, quiz_ids, user_ids)
+    return True
+
+
+def get_job(job_id):
+    raw = redis_store.get(JOB_PREFIX + job_id)
+    return json.loads(raw) if raw else None
+
+
+def _save(job):
+    redis_store.set(JOB_PREFIX + job["id"], json.dumps(job), ex=current_app.config["CATALOG_DELETE_JOB_TTL"])
+
+
+def start_delete_job(kind, target_id, requested_by=None):
+    """Queue a chunked delete of the target, or return the job already deleting it."""
+    running_key = f"{RUNNING_PREFIX}{kind}:{target_id}"
+    job = {
+        "id": uuid.uuid4().hex,
+        "kind": kind,
+        "target_id": target_id,
+        "status": "queued",
+        "requested_by": requested_by,
+        "created_at": datetime.now().isoformat(),
+        "finished_at": None,
+        "deleted": {"submissions": 0, "questions": 0},
+        "error": None,
+    }
+    ttl = current_app.config["CATALOG_DELETE_JOB_TTL"]
+    if not redis_store.set(running_key, job["id"], nx=True, ex=ttl):
+        running = redis_store.get(running_key)
+        existing = get_job(running.decode()) if running else None
+        if existing and existing["status"] in ("queued", "running"):
+            return existing
+        redis_store.set(running_key, job["id"], ex=ttl)
+
+    _save(job)
+    try:
+        from applications.task import delete_catalog_target
+        delete_catalog_target.delay(job["id"])
+    except Exception:
+        redis_store.delete(running_key)
+        raise
+    return job
+
+
+def delete_or_schedule(kind, target_id, requested_by=None):
+    """Delete a small target right away (returns None) or hand a large one to a background job (returns it)."""
+    if deletion_size(kind, target_id) <= current_app.config["CATALOG_DELETE_SYNC_ROWS"]:
+        delete_target(kind, target_id)
+        return None
+    return start_delete_job(kind, target_id, requested_by)
+
+
+def run_delete_job(job_id):
+    """Delete the job's target chunk by chunk; called by the ``delete_catalog_target`` task."""
+    job = get_job(job_id)
+    if job is None:
+        logging.warning(f"Delete job {job_id} expired before it ran")
+        return
+    config = current_app.config
+    chunk, pause = config["CATALOG_DELETE_CHUNK"], config["CATALOG_DELETE_PAUSE"]
+    kind, target_id = job["kind"], job["target_id"]
+    job["status"] = "running"
+    _save(job)
+    try:
+        target = db.session.get(TARGETS[kind], target_id)
+        if target is not None:
+            scopes = _surviving_scopes(kind, target)
+            quizzes = _quizzes(kind, target_id)
+            db.session.expunge(target)
+            for model in SUBMISSION_MODELS:
+                while True:
+                    deleted, user_ids = _purge_submissions(model, quizzes, scopes, limit=chunk)
+                    db.session.commit()
+                    bump_user_version(*user_ids)
+                    job["deleted"]["submissions"] += deleted
+                    _save(job)
+                    if deleted < chunk:
+                        break
+                    time.sleep(pause)
+            while True:
+                deleted = _purge_questions(quizzes, chunk)
+                db.session.commit()
+                job["deleted"]["questions"] += deleted
+                _save(job)
+                if deleted < chunk:
+                    break
+                time.sleep(pause)
+            delete_target(kind, target_id)
+        job["status"] = "done"
+    except Exception as e:
+        db.session.rollback()
+        logging.error(f"Delete job {job_id} ({kind} {target_id}) failed: {e}")
+        job.update(status="failed", error=str(e))
+    finally:
+        job["finished_at"] = datetime.now().isoformat()
+        _save(job)
+        running_key = f"{RUNNING_PREFIX}{kind}:{target_id}"
+        if redis_store.get(running_key) == job_id.encode():
+            redis_store.delete(running_key)
+
+
+def migrate_foreign_keys():
+    """Rebuild the catalog and submission tables of an existing database with the cascading foreign keys.
+
+    SQLite can't alter a constraint, so each table is recreated from the model, copied and
+    swapped in, all in one transaction with enforcement off. Rows whose parent is already
+    gone (left behind by earlier deletes) are not copied. Returns ``{table: rows dropped}``.
+    """
+    from applications.search import create_search_index
+    dialect = db.engine.dialect
+    preparer = dialect.identifier_preparer
+    dropped = {}
+    raw = db.engine.raw_connection()
+    connection = raw.driver_connection
+    isolation_level = connection.isolation_level
+    # explicit BEGIN/COMMIT: pysqlite would otherwise run the DDL outside the transaction
+    connection.isolation_level = None
+    try:
+        connection.execute("PRAGMA foreign_keys=OFF")
+        connection.execute("BEGIN")
+        for model in CASCADE_MODELS:
+            table = model.__table__
+            name = preparer.format_table(table)
+            new_name = preparer.quote(f"{table.name}_rebuild")
+            existing = {row[1] for row in connection.execute(f"PRAGMA table_info({name})")}
+            columns = ", ".join(preparer.quote(c.name) for c in table.columns if c.name in existing)
+            parents = " AND ".join(
+                f"{preparer.quote(fk.parent.name)} IN "
+                f"(SELECT {preparer.quote(fk.column.name)} FROM {preparer.format_table(fk.column.table)})"
+                for fk in table.foreign_keys
+            )
+            ddl = str(CreateTable(table).compile(dialect=dialect)).strip()
+            connection.execute(ddl.replace(f"CREATE TABLE {name} (", f"CREATE TABLE {new_name} (", 1))
+            connection.execute(f"INSERT INTO {new_name} ({columns}) SELECT {columns} FROM {name} WHERE {parents}")
+            before = connection.execute(f"SELECT count(*) FROM {name}").fetchone()[0]
+            after = connection.execute(f"SELECT count(*) FROM {new_name}").fetchone()[0]
+            dropped[table.name] = before - after
+            connection.execute(f"DROP TABLE {name}")
+            connection.execute(f"ALTER TABLE {new_name} RENAME TO {name}")
+            for index in table.indexes:
+                connection.execute(str(CreateIndex(index).compile(dialect=dialect)))
+        problems = connection.execute("PRAGMA foreign_key_check").fetchall()
+        if problems:
+            raise RuntimeError(f"Foreign key violations after rebuilding: {problems[:10]}")
+        connection.execute("COMMIT")
+    except Exception:
+        if connection.in_transaction:
+            connection.execute("ROLLBACK")
+        raise
+    finally:
+        connection.execute("PRAGMA foreign_keys=ON")
+        connection.isolation_level = isolation_level
+        raw.close()
+
+    # dropping a table drops its search triggers, and dropped orphans are still indexed
+    with db.engine.begin() as conn:
+        create_search_index(conn, rebuild=True)
+    return dropped
@@ -0,0 +1,21 @@
+from flask import jsonify, make_response
+from flask_restful import Resource
+from flask_jwt_extended import jwt_required, get_jwt_identity
+import json
+from applications.catalog_delete import get_job
+
+
+class DeleteJobAPI(Resource):
+    @jwt_required()
+    def get(self, job_id):
+        """Status of a background subject/chapter/quiz delete started by a DELETE that answered 202."""
+        try:
+            current_user = json.loads(get_jwt_identity() or "{}")
+        except json.JSONDecodeError:
+            return make_response(jsonify({"error": "Invalid JWT token"}), 401)
+        if current_user.get("role") != "admin":
+            return make_response(jsonify({"error": "Unauthorized"}), 403)
+        job = get_job(job_id)
+        if job is None:
+            return make_response(jsonify({"error": "Delete job not found"}), 404)
+        return make_response(jsonify(job), 200)
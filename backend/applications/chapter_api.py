@@ -4,10 +4,15 @@ from flask_restful import Resource
 from flask_jwt_extended import get_jwt_identity, jwt_required
 from applications.model import db, Subject, Chapter
 from applications.extensions import cache
+from applications.catalog import chapters_payload, CHAPTERS_TIMEOUT
+from applications.cache_warmer import schedule_cache_warm
+from applications.catalog_delete import delete_or_schedule
+from applications.admission import admission
 import json
 
 class ChapterAPI(Resource):
     @jwt_required(optional=True)
+    @admission.limit("browse")
     def get(self):
         token_identity = get_jwt_identity()
         current_user = None
@@ -33,29 +38,13 @@ class ChapterAPI(Resource):
         
 
         try:
-            if subject_id_raw:
-                subject_id = int(subject_id_raw)
-                chapters = Chapter.query.filter_by(subject_id=subject_id).all()
-            else:
-                chapters = Chapter.query.all()
+            chapter_json = chapters_payload(int(subject_id_raw) if subject_id_raw else None)
         except ValueError:
             return make_response(jsonify({"message": "Invalid subject_id parameter"}), 400)
         
-        chapter_json = [
-            {
-                "id": chapter.id,
-                "name": chapter.name,
-                "description": chapter.description,
-                "n_questions": chapter.n_questions,
-                "n_quizzes": chapter.n_quizzes,
-                "subject_id": chapter.subject_id
-            }
-            for chapter in chapters
-        ]
-        
 
         if not is_admin:
-            cache.set(cache_key, chapter_json)
+            cache.set(cache_key, chapter_json, timeout=CHAPTERS_TIMEOUT)
         return make_response(jsonify(chapter_json), 200)
     
     @jwt_required()
@@ -90,6 +79,7 @@ class ChapterAPI(Resource):
             db.session.commit()
             cache.delete('chapters')
             cache.delete(f'chapters_{subject_id}')
+            schedule_cache_warm()
             return make_response(jsonify({
                 "message": "Chapter Created Successfully",
                 "chapter": {
@@ -136,6 +126,7 @@ class ChapterAPI(Resource):
             cache_key = f'chapters_{chapter.subject_id}'
             cache.delete('chapters')
             cache.delete(cache_key)
+            schedule_cache_warm()
             print(f"Cache deleted: chapters, {cache_key}")  
 
             return make_response(jsonify({
@@ -161,9 +152,7 @@ class ChapterAPI(Resource):
             return make_response(jsonify({"error": "Access Denied"}), 403)
         
         chapter = Chapter.query.get_or_404(chapter_id)
-        subject_id = chapter.subject_id
-        db.session.delete(chapter)
-        db.session.commit()
-        cache.delete('chapters')
-        cache.delete(f'chapters_{subject_id}')
+        job = delete_or_schedule("chapter", chapter.id, current_user.get('id'))
+        if job:
+            return make_response(jsonify({"message": "Chapter deletion started", "job": job}), 202)
         return make_response(jsonify({"message": "Chapter Deleted Successfully"}), 200)
\ No newline at end of file
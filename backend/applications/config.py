@@ -0,0 +1,167 @@
+"""Configuration profiles for ``create_app``.
+
+``WebConfig`` serves the HTTP API; ``WorkerConfig`` is what Celery workers and beat
+run with (no request hooks, no API modules). Everything is read from the
+environment when this module is first imported.
+"""
+import os
+from datetime import timedelta
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+REDIS_IP = os.getenv("REDIS_IP", "172.25.203.197")
+REDIS_PORT = int(os.getenv("REDIS_PORT", 6379))
+
+
+def admission_bucket(name, rate, burst):
+    """``(rate, burst)`` from ADMISSION_<NAME>_RATE / ADMISSION_<NAME>_BURST, else the defaults given."""
+    return (float(os.getenv(f"ADMISSION_{name}_RATE", rate)),
+            float(os.getenv(f"ADMISSION_{name}_BURST", burst)))
+
+
+class Config:
+    PROFILE = None
+
+    # Database Configuration
+    SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URL", "sqlite:///" + os.path.join(BACKEND_DIR, "quiz_master.sqlite3"))
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Packed answers are always written; the JSON copy stays until every reader uses the packed form
+    ANSWERS_STORE_JSON = os.getenv("ANSWERS_STORE_JSON", "1") == "1"
+
+    # Security & JWT Config
+    SECRET_KEY = os.getenv("FLASK_SECRET_KEY", "afsal_quiz_secret_key")
+    JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "afsal_quiz_token_key")
+    JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=10)
+
+    # Redis Cache Configuration
+    CACHE_TYPE = "redis"
+    CACHE_REDIS_PORT = REDIS_PORT
+    CACHE_REDIS_DB = 0
+    CACHE_REDIS_HOST = REDIS_IP
+    CACHE_REDIS_URL = f"redis://{REDIS_IP}:{REDIS_PORT}/0"
+    CACHE_DEFAULT_TIMEOUT = 300
+    REDIS_URL = f"redis://{REDIS_IP}:{REDIS_PORT}/0"
+    # 'memory' keeps leaderboards in-process (tests / single worker), 'redis' shares them across workers
+    LEADERBOARD_BACKEND = os.getenv("LEADERBOARD_BACKEND", "redis")
+
+    # Timed attempts: autosaves are accepted this long past the deadline (network latency),
+    # and unfinished attempts stay in Redis this long for the sweeper to submit them
+    ATTEMPT_GRACE_SECONDS = int(os.getenv("ATTEMPT_GRACE_SECONDS", 30))
+    ATTEMPT_RETENTION_SECONDS = int(os.getenv("ATTEMPT_RETENTION_SECONDS", 3600))
+
+    # Submissions older than this many days (rounded down to whole months) move to the archive tables
+    ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", 365))
+
+    # Background report jobs: finished reports are kept (gzip JSON in Redis) for REPORT_ARTIFACT_TTL
+    # seconds and reused while the submissions are unchanged; job status lives REPORT_JOB_TTL seconds
+    REPORT_ARTIFACT_TTL = int(os.getenv("REPORT_ARTIFACT_TTL", 6 * 3600))
+    REPORT_JOB_TTL = int(os.getenv("REPORT_JOB_TTL", 24 * 3600))
+
+    # Per-user report cache (one Redis hash per user): entries over USER_REPORT_CACHE_MAX_BYTES compressed
+    # aren't cached, a user keeps at most USER_REPORT_CACHE_MAX_VARIANTS, and users idle for
+    # USER_REPORT_CACHE_TTL seconds are evicted
+    USER_REPORT_CACHE_TTL = int(os.getenv("USER_REPORT_CACHE_TTL", 24 * 3600))
+    USER_REPORT_CACHE_MAX_BYTES = int(os.getenv("USER_REPORT_CACHE_MAX_BYTES", 256 * 1024))
+    USER_REPORT_CACHE_MAX_VARIANTS = int(os.getenv("USER_REPORT_CACHE_MAX_VARIANTS", 16))
+
+    # Deleting a subject, chapter or quiz with more than CATALOG_DELETE_SYNC_ROWS questions and submissions
+    # runs as a background job that deletes CATALOG_DELETE_CHUNK rows per transaction and sleeps
+    # CATALOG_DELETE_PAUSE seconds in between, so other writers get the SQLite lock; job status lives
+    # CATALOG_DELETE_JOB_TTL seconds
+    CATALOG_DELETE_SYNC_ROWS = int(os.getenv("CATALOG_DELETE_SYNC_ROWS", 5000))
+    CATALOG_DELETE_CHUNK = int(os.getenv("CATALOG_DELETE_CHUNK", 1000))
+    CATALOG_DELETE_PAUSE = float(os.getenv("CATALOG_DELETE_PAUSE", 0.05))
+    CATALOG_DELETE_JOB_TTL = int(os.getenv("CATALOG_DELETE_JOB_TTL", 24 * 3600))
+
+    # Cache warm-up: quizzes opening within CACHE_WARM_DAYS_AHEAD days are warmed; warmed keys keep
+    # their endpoint's own timeout (catalog.*_TIMEOUT, quiz_bundle.BUNDLE_TIMEOUT), so the 120 s
+    # subject/question keys expire between beat runs every CACHE_WARM_INTERVAL and refill on the next
+    # miss; admin writes are coalesced into one run CACHE_WARM_DEBOUNCE seconds later
+    CACHE_WARM_DAYS_AHEAD = int(os.getenv("CACHE_WARM_DAYS_AHEAD", 1))
+    CACHE_WARM_INTERVAL = int(os.getenv("CACHE_WARM_INTERVAL", 900))
+    CACHE_WARM_DEBOUNCE = int(os.getenv("CACHE_WARM_DEBOUNCE", 5))
+
+    # Columnar submission snapshot for analytics: memory-mapped by the web workers, so it must live on
+    # their host; beat appends new submissions every SNAPSHOT_INTERVAL seconds
+    SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", os.path.join(BACKEND_DIR, "snapshots", "submissions"))
+    SNAPSHOT_INTERVAL = int(os.getenv("SNAPSHOT_INTERVAL", 300))
+
+    # Celery Configuration
+    # the broker has always been the local Redis, independent of REDIS_IP (cache and data structures)
+    CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL", "redis://localhost:6379/0")
+    CELERY_RESULT_BACKEND = os.getenv("CELERY_RESULT_BACKEND", "redis://localhost:6379/1")
+    # per worker; Gmail throttles accounts that send in bursts
+    MAIL_RATE_LIMIT = os.getenv("MAIL_RATE_LIMIT", "30/m")
+
+    # Mail Configuration (Use Environment Variables for Security)
+    MAIL_SERVER = "smtp.gmail.com"
+    MAIL_PORT = 587
+    MAIL_USE_TLS = True
+    MAIL_DEFAULT_SENDER = "quizapp.mad2@gmail.com"
+    MAIL_USERNAME = os.getenv("MAIL_USERNAME", "quizapp.mad2@gmail.com")
+    MAIL_PASSWORD = os.getenv("MAIL_PASSWORD", "afxs vpki ypet jsyx")
+
+
+class WebConfig(Config):
+    PROFILE = "web"
+
+    # Metrics: /api/metrics answers a matching X-Metrics-Token (when METRICS_TOKEN is set) or an admin
+    # JWT; with neither it is 403, so an unset token leaves the endpoint closed to scrapers
+    METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+    N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", 10))
+    # Seconds between pushes of a worker's staged metrics to the shared Redis hashes
+    METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", 1.0))
+
+    # Request profiling: admins send "X-Profile: 1"; PROFILE_SAMPLE_RATE profiles a random fraction
+    PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", 0))
+    PROFILE_INTERVAL_MS = 5
+    PROFILE_RING_SIZE = 50
+
+    # Admission control (token buckets in Redis): rates are tokens per second, bursts are bucket sizes.
+    # "queue" holds a request up to max_wait seconds for tokens, "reject" answers 429 right away.
+    # Every bucket below is overridable as ADMISSION_<POLICY>_<BUCKET>_RATE / _BURST, e.g.
+    # ADMISSION_BROWSE_IP_BURST. The per-IP defaults are sized for a classroom of about 60
+    # students behind one NAT address; raise them for larger shared networks.
+    ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "1") == "1"
+    ADMISSION_GLOBAL_BUCKET = admission_bucket("GLOBAL", 100, 200)
+    # share of the global bucket that only high-priority (submission) requests may use
+    ADMISSION_LOW_PRIORITY_RESERVE = float(os.getenv("ADMISSION_LOW_PRIORITY_RESERVE", 0.25))
+    ADMISSION_MAX_QUEUED = int(os.getenv("ADMISSION_MAX_QUEUED", 32))
+    ADMISSION_POLICIES = {
+        # a whole class submitting at the deadline fits in the IP burst
+        "submit": {"subject": "jwt", "user": admission_bucket("SUBMIT_USER", 0.5, 5),
+                   "ip": admission_bucket("SUBMIT_IP", 20, 120), "priority": "high",
+                   "mode": os.getenv("ADMISSION_SUBMIT_MODE", "queue"), "max_wait": 2.0},
+        # bcrypt makes every login attempt cost tens of milliseconds of CPU; the endpoint
+        # bucket caps that CPU, the IP bucket only stops one address from hogging it
+        "login": {"subject": "email", "user": admission_bucket("LOGIN_USER", 0.1, 5),
+                  "ip": admission_bucket("LOGIN_IP", 2, 60), "endpoint": admission_bucket("LOGIN_ENDPOINT", 20, 40),
+                  "priority": "low", "mode": os.getenv("ADMISSION_LOGIN_MODE", "reject"), "max_wait": 1.0},
+        # signup hashes a password too, but there is no account to key a user bucket on yet
+        "signup": {"subject": "email", "ip": admission_bucket("SIGNUP_IP", 0.5, 60),
+                   "endpoint": admission_bucket("SIGNUP_ENDPOINT", 5, 20), "priority": "low", "mode": "reject"},
+        # catalog, quiz and report reads: shed first in a rush so submissions keep their share
+        "browse": {"subject": "jwt", "user": admission_bucket("BROWSE_USER", 5, 30),
+                   "ip": admission_bucket("BROWSE_IP", 50, 400), "priority": "low",
+                   "mode": os.getenv("ADMISSION_BROWSE_MODE", "reject"), "max_wait": 0.5},
+    }
+
+    # /api/admin-dashboard is recomputed at most once per DASHBOARD_TTL seconds across all workers;
+    # concurrent requests wait up to DASHBOARD_WAIT_SECONDS for that single recomputation
+    DASHBOARD_TTL = int(os.getenv("DASHBOARD_TTL", 15))
+    DASHBOARD_WAIT_SECONDS = float(os.getenv("DASHBOARD_WAIT_SECONDS", 2))
+
+    CORS_ORIGINS = [
+        "http://localhost:5173",
+        "https://mad2-project-1.onrender.com",  # 👈 your deployed Vue app URL
+    ]
+
+
+class WorkerConfig(Config):
+    PROFILE = "worker"
+
+    # which queues this worker consumes, and its concurrency/prefetch (applications.worker.WORKER_PROFILES)
+    CELERY_WORKER_PROFILE = os.getenv("CELERY_WORKER_PROFILE", "all")
+
+
+PROFILES = {"web": WebConfig, "worker": WorkerConfig}
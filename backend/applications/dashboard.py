@@ -0,0 +1,104 @@
+"""Admin dashboard figures from one consistent read, behind a short-TTL single-flight cache.
+
+``compute_dashboard`` answers everything ``/api/admin-stats``, ``/api/submission-counts``
+and ``/api/quiz-completion`` report with a single statement: one pass over ``quiz``
+joined to the daily rollups (which already include archived submissions), with the user
+count as a scalar subquery. One statement reads one snapshot, so the figures always add
+up (pysqlite does not open a transaction for plain SELECTs, so separate queries could
+straddle a commit).
+
+``admin_dashboard`` caches the result for ``DASHBOARD_TTL`` seconds. When it expires,
+one process recomputes it under a Redis lock while the others wait briefly for the new
+value instead of running the same query.
+"""
+import logging
+import time
+import uuid
+from datetime import date, datetime
+
+from flask import current_app
+from sqlalchemy import and_, func
+
+from applications.extensions import cache, redis_store
+from applications.model import db, User, Quiz, SubmissionRollup
+
+CACHE_KEY = "admin_dashboard"
+LOCK_KEY = "admin_dashboard:lock"
+LOCK_TIMEOUT_MS = 10000
+WAIT_POLL = 0.05
+# unlock only if we still hold the lock (it may have expired and been taken over)
+_RELEASE = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then return redis.call('DEL', KEYS[1]) end
+return 0
+"""
+
+
+def compute_dashboard(today=None):
+    today = today or date.today()
+    total_users = db.session.query(func.count(User.id)).scalar_subquery()
+    rows = (
+        db.session.query(
+            Quiz.title,
+            Quiz.date_of_quiz,
+            func.coalesce(func.sum(SubmissionRollup.count), 0),
+            func.coalesce(func.sum(SubmissionRollup.score_sum), 0),
+            total_users,
+        )
+        .outerjoin(SubmissionRollup, and_(SubmissionRollup.quiz_id == Quiz.id, SubmissionRollup.granularity == "day"))
+        .group_by(Quiz.id)
+        .order_by(Quiz.id)
+        .all()
+    )
+    users = rows[0][4] if rows else User.query.count()
+
+    submissions = sum(count for _, _, count, _, _ in rows)
+    score_sum = sum(score for _, _, _, score, _ in rows)
+    started = [count for _, opens, count, _, _ in rows if opens <= today]
+    completed = sum(1 for count in started if count)
+    return {
+        "stats": {
+            "totalUsers": users,
+            "totalQuizzes": len(rows),
+            "totalSubmissions": submissions,
+            "averageScore": round(score_sum / submissions, 2) if submissions else 0,
+        },
+        "submissionCounts": [{"quiz_title": title, "count": count} for title, _, count, _, _ in rows if count],
+        "quizCompletion": {
+            "labels": ["Completed", "Not Completed"],
+            "datasets": [{
+                "data": [completed, len(started) - completed],
+                "backgroundColor": ["#2ecc71", "#e74c3c"]
+            }]
+        },
+        "generatedAt": datetime.now().isoformat(),
+    }
+
+
+def admin_dashboard():
+    dashboard = cache.get(CACHE_KEY)
+    if dashboard is not None:
+        return dashboard
+    ttl = current_app.config["DASHBOARD_TTL"]
+    token = uuid.uuid4().hex
+    try:
+        leader = redis_store.set(LOCK_KEY, token, nx=True, px=LOCK_TIMEOUT_MS)
+    except Exception as e:
+        logging.warning(f"Dashboard lock unavailable, computing directly: {e}")
+        return compute_dashboard()
+
+    if leader:
+        try:
+            dashboard = compute_dashboard()
+            cache.set(CACHE_KEY, dashboard, timeout=ttl)
+            return dashboard
+        finally:
+            redis_store.eval(_RELEASE, 1, LOCK_KEY, token)
+
+    deadline = time.monotonic() + current_app.config["DASHBOARD_WAIT_SECONDS"]
+    while time.monotonic() < deadline:
+        time.sleep(WAIT_POLL)
+        dashboard = cache.get(CACHE_KEY)
+        if dashboard is not None:
+            return dashboard
+    # the leader is slow or died; don't leave the admin waiting
+    return compute_dashboard()
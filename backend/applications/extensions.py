@@ -1,3 +1,63 @@
 from flask_caching import Cache
+from flask_mail import Mail
+import redis
 
-cache = Cache()
+from applications.metrics import metrics
+
+
+class InstrumentedCache(Cache):
+    """Cache that reports every get() as a hit or miss to the metrics registry."""
+
+    def get(self, key):
+        value = super().get(key)
+        metrics.cache_lookup(key, value is not None)
+        return value
+
+    def delete_keys(self, *keys):
+        """Delete every key in one round trip when the backend allows it.
+
+        Flask-Caching's delete_many issues one DELETE per key and stops at the
+        first key that is already gone, so it can't be used for invalidation.
+        """
+        if not keys:
+            return
+        unlink = getattr(self.cache, "unlink", None)
+        if unlink is not None:
+            unlink(*keys)
+            return
+        for key in keys:
+            self.delete(key)
+
+    def count_existing(self, *keys):
+        """How many of ``keys`` are cached, in one EXISTS round trip on Redis."""
+        if not keys:
+            return 0
+        client = getattr(self.cache, "_read_client", None)
+        if client is not None:
+            prefix = getattr(self.cache, "key_prefix", "") or ""
+            return client.exists(*(prefix + key for key in keys))
+        return sum(1 for key in keys if self.cache.has(key))
+
+
+cache = InstrumentedCache()
+mail = Mail()
+
+
+class RedisStore:
+    """Raw redis client for data structures the cache API can't express (sorted sets, hashes)."""
+
+    def __init__(self):
+        self.client = None
+
+    def init_app(self, app):
+        url = app.config.get('REDIS_URL') or app.config.get('CACHE_REDIS_URL')
+        self.client = redis.Redis.from_url(url)
+        app.extensions['redis_store'] = self
+
+    def __getattr__(self, name):
+        if self.client is None:
+            raise RuntimeError("RedisStore used before init_app()")
+        return getattr(self.client, name)
+
+
+redis_store = RedisStore()
@@ -0,0 +1,218 @@
+"""Application factory.
+
+``create_app(profile="web")`` builds the HTTP API; ``create_app(profile="worker")``
+builds the slimmer app Celery workers and beat run under, which skips request
+hooks, JWT/CORS/login and the API modules entirely. Neither touches the
+database: the schema is created by ``flask init-db`` (or ``init_db(app)``).
+"""
+import click
+from flask import Flask, jsonify, request
+
+from applications.config import BACKEND_DIR, PROFILES
+from applications.extensions import cache, mail, redis_store
+from applications.model import db
+from applications.worker import init_celery
+
+
+def create_app(config=None, profile="web"):
+    """Build an app for ``profile`` ("web" or "worker"); ``config`` overrides any setting."""
+    from applications.attempts import attempts
+    from applications.leaderboard import leaderboard
+
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown app profile {profile!r}, expected one of {sorted(PROFILES)}")
+    app = Flask("main", root_path=BACKEND_DIR)
+    app.config.from_object(PROFILES[profile])
+    if isinstance(config, dict):
+        app.config.from_mapping(config)
+    elif config is not None:
+        app.config.from_object(config)
+
+    db.init_app(app)
+    cache.init_app(app)
+    redis_store.init_app(app)
+    leaderboard.init_app(app)
+    attempts.init_app(app)
+    mail.init_app(app)
+    init_celery(app)
+    register_commands(app)
+
+    if profile == "web":
+        init_web(app)
+        register_api(app)
+    return app
+
+
+def init_web(app):
+    from flask_cors import CORS
+    from flask_jwt_extended import JWTManager
+    from flask_login import LoginManager
+    from applications.admission import admission
+    from applications.metrics import metrics
+    from applications.model import User, Admin
+    from applications.profiler import profiler
+
+    metrics.init_app(app)
+    profiler.init_app(app)
+    admission.init_app(app)
+
+    login_manager = LoginManager(app)
+    login_manager.login_view = "login"
+    JWTManager(app)
+
+    CORS(app, resources={r"/*": {
+        "origins": app.config["CORS_ORIGINS"],
+        "methods": ["GET", "POST", "PATCH", "PUT", "DELETE", "OPTIONS"],
+        "allow_headers": ["Authorization", "Content-Type"],
+        "supports_credentials": True
+    }})
+
+    # Flask-Login User Loader
+    @login_manager.user_loader
+    def load_user(user_id):
+        return User.query.get(int(user_id)) or Admin.query.get(int(user_id))
+
+    @app.before_request
+    def handle_preflight():
+        """Handle CORS preflight requests globally."""
+        if request.method == "OPTIONS":
+            return jsonify({"message": "CORS Preflight OK"}), 204
+
+
+def register_api(app):
+    from flask_restful import Api
+    from applications.login_api import LoginAPI, SignupAPI, BulkUpdateAPI
+    from applications.subject_api import SubjectAPI
+    from applications.chapter_api import ChapterAPI
+    from applications.quiz_api import QuizAPI, SubmitQuizAPI, QuizLeaderboardAPI, QuizBundleAPI
+    from applications.attempt_api import QuizAttemptAPI, FinishAttemptAPI
+    from applications.question_api import QuestionAPI, QuestionImportAPI
+    from applications.search_api import SearchAPI
+    from applications.catalog_delete_api import DeleteJobAPI
+    from applications.progress_api import MyProgressAPI, RecommendationsAPI
+    from applications.metrics_api import MetricsAPI, AdminProfilesAPI
+    from applications.report_api import MyReportsAPI, AdminStatsAPI, SubmissionCountsAPI, QuizCompletionAPI, \
+        AdminUserDetailsAPI, AdminQuizDataAPI, AdminItemAnalyticsAPI, SubmissionTimeSeriesAPI, \
+        SubmissionAggregatesAPI, ReportJobsAPI, ReportJobDownloadAPI, AdminDashboardAPI
+
+    api = Api(app)
+    api.add_resource(LoginAPI, '/api/login', '/api/users', '/api/users/<int:user_id>')
+    api.add_resource(SignupAPI, '/api/signup')
+    api.add_resource(SubjectAPI, '/api/subject', '/api/subject/<int:subject_id>')
+    api.add_resource(ChapterAPI, '/api/chapter', '/api/chapter/<int:chapter_id>')
+    api.add_resource(QuizAPI, '/api/quiz', '/api/quiz/<int:quiz_id>')
+    api.add_resource(QuestionAPI, '/api/question', '/api/question/<int:question_id>', '/api/quiz-questions')
+    api.add_resource(QuestionImportAPI, '/api/question/import')
+    api.add_resource(BulkUpdateAPI, '/api/users/bulk-update')
+    api.add_resource(SubmitQuizAPI, '/api/submit-quiz')
+    api.add_resource(QuizLeaderboardAPI, '/api/quiz/<int:quiz_id>/leaderboard')
+    api.add_resource(QuizBundleAPI, '/api/quiz/<int:quiz_id>/bundle')
+    api.add_resource(QuizAttemptAPI, '/api/quiz/<int:quiz_id>/attempt')
+    api.add_resource(FinishAttemptAPI, '/api/quiz/<int:quiz_id>/attempt/finish')
+    api.add_resource(SearchAPI, '/api/search')
+    api.add_resource(DeleteJobAPI, '/api/delete-jobs/<string:job_id>')
+    api.add_resource(MyProgressAPI, '/api/my-progress')
+    api.add_resource(RecommendationsAPI, '/api/recommendations')
+
+    api.add_resource(MyReportsAPI, "/api/my-reports")
+    api.add_resource(AdminStatsAPI, "/api/admin-stats")
+    api.add_resource(AdminDashboardAPI, "/api/admin-dashboard")
+    api.add_resource(SubmissionCountsAPI, "/api/submission-counts")
+    api.add_resource(QuizCompletionAPI, "/api/quiz-completion")
+    api.add_resource(SubmissionTimeSeriesAPI, "/api/submission-timeseries")
+    api.add_resource(AdminUserDetailsAPI, '/api/admin-user-details')
+    api.add_resource(AdminQuizDataAPI, '/api/admin-quiz-data')
+    api.add_resource(MetricsAPI, '/api/metrics')
+    api.add_resource(AdminProfilesAPI, '/api/admin-profiles', '/api/admin-profiles/<string:profile_id>')
+    api.add_resource(AdminItemAnalyticsAPI, '/api/admin-item-analytics')
+    api.add_resource(SubmissionAggregatesAPI, '/api/submission-aggregates')
+    api.add_resource(ReportJobsAPI, '/api/reports/jobs', '/api/reports/jobs/<string:job_id>')
+    api.add_resource(ReportJobDownloadAPI, '/api/reports/jobs/<string:job_id>/download')
+    app.extensions['restful_api'] = api
+
+
+# Initialize Admin User (if not exists)
+def add_admin(app):
+    from flask_bcrypt import generate_password_hash
+    from applications.model import Admin
+    with app.app_context():
+        admin = Admin.query.first()
+        if not admin:
+            hashed_password = generate_password_hash("admin")
+            admin = Admin(name="admin", password=hashed_password, email="quizapp.mad2@gmail.com")
+            db.session.add(admin)
+            db.session.commit()
+            print("Administrator Initialized")
+
+
+def init_db(app):
+    """Create missing tables, search indexes and the default admin; run on deploy, not on every import."""
+    from applications.search import create_search_index
+    with app.app_context():
+        db.create_all()
+        with db.engine.begin() as connection:
+            create_search_index(connection)
+    add_admin(app)
+
+
+def register_commands(app):
+    @app.cli.command("init-db")
+    def init_db_command():
+        """Create missing tables and the default admin user."""
+        init_db(app)
+        print("Database initialized")
+
+    @app.cli.command("migrate-answers")
+    def migrate_answers():
+        """Add packed answer columns and backfill them from the JSON answers."""
+        from applications.answer_storage import migrate_packed_answers
+        migrated = migrate_packed_answers()
+        print(f"Packed answers written for {migrated} submissions")
+
+    @app.cli.command("migrate-foreign-keys")
+    def migrate_foreign_keys_command():
+        """Rebuild the catalog and submission tables with ON DELETE CASCADE foreign keys."""
+        from applications.catalog_delete import migrate_foreign_keys
+        dropped = migrate_foreign_keys()
+        print("Foreign keys migrated; orphaned rows dropped: "
+              + ", ".join(f"{table} {count}" for table, count in dropped.items()))
+
+    @app.cli.command("rebuild-rollups")
+    def rebuild_rollups_command():
+        """Recompute submission rollups from quiz_submissions (run once after upgrading)."""
+        from applications.rollups import rebuild_rollups
+        rebuild_rollups()
+        print("Submission rollups rebuilt")
+
+    @app.cli.command("rebuild-progress")
+    def rebuild_progress_command():
+        """Recompute every user's mastery profile from all submissions (run once after upgrading)."""
+        from applications.progress import rebuild_progress
+        rebuild_progress()
+        print("User progress rebuilt")
+
+    @app.cli.command("rebuild-search")
+    def rebuild_search_command():
+        """Create the full-text search tables and re-index every row."""
+        from applications.search import create_search_index
+        with db.engine.begin() as connection:
+            create_search_index(connection, rebuild=True)
+        print("Search indexes rebuilt")
+
+    @app.cli.command("archive-submissions")
+    @click.option("--before", default=None, help="Archive submissions before this ISO date instead of the horizon.")
+    def archive_submissions_command(before):
+        """Move old submissions into the archive tables and their monthly summaries."""
+        from datetime import datetime
+        from applications.archive import archive_submissions
+        moved = archive_submissions(datetime.fromisoformat(before) if before else None)
+        print(f"Archived {moved} submissions")
+
+    @app.cli.command("snapshot-submissions")
+    @click.option("--rebuild", is_flag=True, help="Rewrite the snapshot from scratch instead of appending.")
+    def snapshot_submissions_command(rebuild):
+        """Export new submissions to the columnar analytics snapshot."""
+        from applications.snapshot import refresh_snapshot
+        result = refresh_snapshot(rebuild=rebuild)
+        print(f"Snapshot has {result['rows']} submissions ({result['added']} added"
+              f"{', rebuilt' if result['rebuilt'] else ''})")
@@ -0,0 +1,221 @@
+import logging
+
+import numpy as np
+
+from applications.extensions import cache
+from applications.model import db, Question, QuizSubmission, ArchivedSubmission
+from applications.answer_storage import quiz_slots, decode_matrix
+
+N_OPTIONS = 4
+STATS_TIMEOUT = 24 * 3600
+
+
+def _stats_key(quiz_id):
+    return f"item_stats_{quiz_id}"
+
+
+def _quiz_questions(quiz_id):
+    return (
+        db.session.query(Question.id, Question.q_no, Question.title)
+        .filter(Question.quiz_id == quiz_id)
+        .order_by(Question.q_no, Question.id)
+        .all()
+    )
+
+
+def _submission_count(quiz_id):
+    """Hot plus archived submissions; archiving moves rows without changing the total."""
+    hot = QuizSubmission.query.filter_by(quiz_id=quiz_id).count()
+    return hot + ArchivedSubmission.query.filter_by(quiz_id=quiz_id).count()
+
+
+def _option_index(selected):
+    """Map a stored 0-based selected_option to a column: 0 = skipped, 1..4 = options."""
+    if isinstance(selected, int) and 0 <= selected < N_OPTIONS:
+        return selected + 1
+    return 0
+
+
+def decode_answers(quiz_id, question_ids):
+    """Decode every submission of a quiz into (correct, selected) submissions x questions arrays.
+
+    Hot and archived submissions are both included. Packed rows are decoded in
+    one vectorized pass per table; only rows that predate the packed columns go
+    through the per-answer JSON loop.
+    """
+    slots = quiz_slots(quiz_id)
+    use_packed = bool(slots) and len(slots) == len(question_ids)
+    correct_parts, selected_parts = [], []
+    for model in (QuizSubmission, ArchivedSubmission):
+        base = model.query.filter(model.quiz_id == quiz_id)
+        if use_packed:
+            packed = (
+                base.filter(model.answers_packed.isnot(None))
+                .with_entities(model.answers_packed, model.correct_bitmap)
+                .all()
+            )
+            if packed:
+                n_slots = max(slots.values()) + 1
+                selected, correct = decode_matrix([r[0] for r in packed], [r[1] for r in packed], n_slots)
+                columns = np.array([slots[qid] for qid in question_ids], dtype=np.intp)
+                selected_parts.append(selected[:, columns].astype(np.int8))
+                correct_parts.append(correct[:, columns].astype(np.int8))
+            legacy = base.filter(model.answers_packed.is_(None))
+        else:
+            legacy = base
+        if model is QuizSubmission:
+            answer_lists = [answers for answers, in legacy.with_entities(QuizSubmission.answers)]
+        else:
+            answer_lists = [row.answers for row in legacy]
+        correct, selected = _decode_json(answer_lists, question_ids)
+        correct_parts.append(correct)
+        selected_parts.append(selected)
+    return np.concatenate(correct_parts), np.concatenate(selected_parts)
+
+
+def _decode_json(answer_lists, question_ids):
+    column = {qid: j for j, qid in enumerate(question_ids)}
+    correct = np.zeros((len(answer_lists), len(question_ids)), dtype=np.int8)
+    selected = np.zeros((len(answer_lists), len(question_ids)), dtype=np.int8)
+    for i, answers in enumerate(answer_lists):
+        for answer in answers or []:
+            j = column.get(answer.get('question_id'))
+            if j is None:
+                continue
+            selected[i, j] = _option_index(answer.get('selected_option'))
+            correct[i, j] = bool(answer.get('is_correct'))
+    return correct, selected
+
+
+def _empty_stats(question_ids):
+    q = len(question_ids)
+    return {
+        "question_ids": list(question_ids),
+        "n": 0,
+        "correct": np.zeros(q, dtype=np.int64),
+        "score_sum": 0,
+        "score_sq_sum": 0,
+        "correct_score_sum": np.zeros(q, dtype=np.int64),
+        "option_counts": np.zeros((q, N_OPTIONS + 1), dtype=np.int64),
+        "histogram": np.zeros(q + 1, dtype=np.int64),
+    }
+
+
+def compute_stats(quiz_id, question_ids):
+    """Full recompute of the sufficient statistics from the submissions table."""
+    correct, selected = decode_answers(quiz_id, question_ids)
+    stats = _empty_stats(question_ids)
+    n, q = correct.shape
+    if n == 0:
+        return stats
+    scores = correct.sum(axis=1, dtype=np.int64)
+    stats["n"] = n
+    stats["correct"] = correct.sum(axis=0, dtype=np.int64)
+    stats["score_sum"] = int(scores.sum())
+    stats["score_sq_sum"] = int((scores * scores).sum())
+    stats["correct_score_sum"] = correct.T.astype(np.int64) @ scores
+    # one bincount over (question, option) cells instead of a loop per option
+    cells = selected.astype(np.int64) + (N_OPTIONS + 1) * np.arange(q)
+    stats["option_counts"] = np.bincount(
+        cells.ravel(), minlength=q * (N_OPTIONS + 1)
+    ).reshape(q, N_OPTIONS + 1)
+    stats["histogram"] = np.bincount(scores, minlength=q + 1)
+    return stats
+
+
+def _metrics(stats, questions):
+    n = stats["n"]
+    c = stats["correct"].astype(np.float64)
+    S, S2 = float(stats["score_sum"]), float(stats["score_sq_sum"])
+    sxy = stats["correct_score_sum"].astype(np.float64)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        p_value = c / n if n else np.zeros_like(c)
+        # item-rest point-biserial: correlate each item with the score on the *other* items
+        rest_sum = S - c
+        rest_sq_sum = S2 - 2 * sxy + c
+        cross = sxy - c
+        numerator = n * cross - c * rest_sum
+        denominator = np.sqrt((n * c - c * c) * (n * rest_sq_sum - rest_sum * rest_sum))
+        discrimination = np.where(denominator > 0, numerator / denominator, np.nan)
+
+    counts = stats["option_counts"]
+    items = []
+    for j, (qid, q_no, title) in enumerate(questions):
+        items.append({
+            "question_id": qid,
+            "q_no": q_no,
+            "title": title,
+            "p_value": round(float(p_value[j]), 4),
+            "discrimination": None if np.isnan(discrimination[j]) else round(float(discrimination[j]), 4),
+            "option_counts": {
+                "skipped": int(counts[j, 0]),
+                **{str(k): int(counts[j, k]) for k in range(1, N_OPTIONS + 1)}
+            },
+            "option_frequencies": {
+                "skipped": round(float(counts[j, 0]) / n, 4) if n else 0.0,
+                **{str(k): round(float(counts[j, k]) / n, 4) if n else 0.0 for k in range(1, N_OPTIONS + 1)}
+            },
+        })
+
+    mean = S / n if n else 0.0
+    variance = max(S2 / n - mean * mean, 0.0) if n else 0.0
+    return {
+        "submissions": n,
+        "mean_score": round(mean, 4),
+        "std_score": round(float(np.sqrt(variance)), 4),
+        "score_histogram": [int(v) for v in stats["histogram"]],
+        "items": items,
+    }
+
+
+def quiz_item_analytics(quiz_id):
+    """Return item metrics, reusing cached statistics while the submission count still matches."""
+    questions = _quiz_questions(quiz_id)
+    question_ids = [q[0] for q in questions]
+    submission_count = _submission_count(quiz_id)
+
+    stats = cache.get(_stats_key(quiz_id))
+    if not stats or stats["n"] != submission_count or stats["question_ids"] != question_ids:
+        stats = compute_stats(quiz_id, question_ids)
+        cache.set(_stats_key(quiz_id), stats, timeout=STATS_TIMEOUT)
+    return _metrics(stats, questions)
+
+
+def observe_submission(quiz_id, answers):
+    """Fold one new submission into the cached statistics instead of invalidating them.
+
+    Only applied when the cached stats were current right before this submission;
+    anything else (missed update, concurrent writer) is left for the next read to
+    detect via the submission-count check and recompute.
+    """
+    try:
+        stats = cache.get(_stats_key(quiz_id))
+        if not stats:
+            return
+        submission_count = _submission_count(quiz_id)
+        if stats["n"] != submission_count - 1:
+            cache.delete(_stats_key(quiz_id))
+            return
+
+        column = {qid: j for j, qid in enumerate(stats["question_ids"])}
+        x = np.zeros(len(column), dtype=np.int64)
+        sel = np.zeros(len(column), dtype=np.int64)
+        for answer in answers:
+            j = column.get(answer.get('question_id'))
+            if j is None:
+                continue
+            x[j] = bool(answer.get('is_correct'))
+            sel[j] = _option_index(answer.get('selected_option'))
+        t = int(x.sum())
+
+        stats["n"] += 1
+        stats["correct"] += x
+        stats["score_sum"] += t
+        stats["score_sq_sum"] += t * t
+        stats["correct_score_sum"] += x * t
+        stats["option_counts"][np.arange(len(column)), sel] += 1
+        stats["histogram"][t] += 1
+        cache.set(_stats_key(quiz_id), stats, timeout=STATS_TIMEOUT)
+    except Exception as e:
+        logging.error(f"Item analytics update failed for quiz {quiz_id}: {e}")
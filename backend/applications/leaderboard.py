@@ -0,0 +1,294 @@
+import logging
+from bisect import insort, bisect_left
+from itertools import groupby
+from operator import itemgetter
+from threading import Lock
+
+from applications.extensions import redis_store
+from applications.model import db, QuizSubmission, SubmissionSummary
+
+KEY_PREFIX = "leaderboard:ranked:"
+REBUILD_CHUNK = 5000
+# ties are broken inside the sorted-set score: score * TIE + (TIE - 1 - user_id)
+TIE = 2 ** 32
+
+
+def _key(quiz_id):
+    return f"{KEY_PREFIX}{quiz_id}"
+
+
+def _ranked(score, user_id):
+    return score * TIE + (TIE - 1 - user_id)
+
+
+class RedisLeaderboard:
+    """One sorted set per quiz, member = user id, score = best score with the user id as tiebreak.
+
+    Equal scores rank by ascending user id, the same order as ``MemoryLeaderboard``;
+    Redis alone would order equal scores by member string.
+    """
+
+    def record(self, quiz_id, user_id, score):
+        # GT keeps the best attempt: a lower re-submission never lowers the rank
+        redis_store.zadd(_key(quiz_id), {str(user_id): _ranked(score, user_id)}, gt=True)
+
+    def size(self, quiz_id):
+        return redis_store.zcard(_key(quiz_id))
+
+    def score_of(self, quiz_id, user_id):
+        ranked = redis_store.zscore(_key(quiz_id), str(user_id))
+        return None if ranked is None else int(ranked) // TIE
+
+    def count_above(self, quiz_id, score):
+        return redis_store.zcount(_key(quiz_id), (score + 1) * TIE, "+inf")
+
+    def position_of(self, quiz_id, user_id):
+        return redis_store.zrevrank(_key(quiz_id), str(user_id))
+
+    def range_by_rank(self, quiz_id, start, stop):
+        rows = redis_store.zrevrange(_key(quiz_id), start, stop - 1, withscores=True)
+        return [(int(member), int(ranked) // TIE) for member, ranked in rows]
+
+    def clear(self, quiz_id):
+        redis_store.delete(_key(quiz_id))
+
+    def quiz_ids(self):
+        return {int(key.decode()[len(KEY_PREFIX):]) for key in redis_store.scan_iter(match=f"{KEY_PREFIX}*")
+                if key.decode()[len(KEY_PREFIX):].isdigit()}
+
+    def load(self, quiz_id, rows):
+        """Replace a quiz board from an iterable of (user_id, score) without a visible gap."""
+        tmp_key = f"{_key(quiz_id)}:rebuild"
+        redis_store.delete(tmp_key)
+        pipe = redis_store.pipeline(transaction=False)
+        pending = 0
+        for user_id, score in rows:
+            pipe.zadd(tmp_key, {str(user_id): _ranked(score, user_id)}, gt=True)
+            pending += 1
+            if pending >= REBUILD_CHUNK:
+                pipe.execute()
+                pending = 0
+        pipe.execute()
+        if redis_store.exists(tmp_key):
+            redis_store.rename(tmp_key, _key(quiz_id))
+        else:
+            redis_store.delete(_key(quiz_id))
+
+
+class _ScoreBoard:
+    """Order-statistic structure for one quiz.
+
+    Scores are small non-negative integers (bounded by the question count), so a
+    Fenwick tree indexed by score gives O(log S) "how many scored above x" queries,
+    and each score keeps a sorted bucket of user ids for deterministic tie order.
+    """
+
+    def __init__(self):
+        self.tree = [0] * 17
+        self.buckets = {}
+        self.best = {}
+
+    def _grow(self, score):
+        size = len(self.tree) - 1
+        if score < size:
+            return
+        while size <= score:
+            size *= 2
+        self.tree = [0] * (size + 1)
+        for s, bucket in self.buckets.items():
+            self._add(s, len(bucket))
+
+    def _add(self, score, delta):
+        i = score + 1
+        while i < len(self.tree):
+            self.tree[i] += delta
+            i += i & -i
+
+    def _count_upto(self, score):
+        i = min(score + 1, len(self.tree) - 1)
+        total = 0
+        while i > 0:
+            total += self.tree[i]
+            i -= i & -i
+        return total
+
+    def record(self, user_id, score):
+        current = self.best.get(user_id)
+        if current is not None and current >= score:
+            return
+        self._grow(score)
+        if current is not None:
+            bucket = self.buckets[current]
+            bucket.pop(bisect_left(bucket, user_id))
+            if not bucket:
+                del self.buckets[current]
+            self._add(current, -1)
+        insort(self.buckets.setdefault(score, []), user_id)
+        self._add(score, 1)
+        self.best[user_id] = score
+
+    def count_above(self, score):
+        return len(self.best) - self._count_upto(score)
+
+    def position_of(self, user_id):
+        score = self.best.get(user_id)
+        if score is None:
+            return None
+        return self.count_above(score) + bisect_left(self.buckets[score], user_id)
+
+    def range_by_rank(self, start, stop):
+        out = []
+        skipped = 0
+        for score in sorted(self.buckets, reverse=True):
+            bucket = self.buckets[score]
+            if skipped + len(bucket) <= start:
+                skipped += len(bucket)
+                continue
+            for user_id in bucket[max(start - skipped, 0):]:
+                out.append((user_id, score))
+                if len(out) >= stop - start:
+                    return out
+            skipped += len(bucket)
+        return out
+
+
+class MemoryLeaderboard:
+    """In-process backend for tests and single-process runs (LEADERBOARD_BACKEND='memory')."""
+
+    def __init__(self):
+        self.boards = {}
+        self.lock = Lock()
+
+    def record(self, quiz_id, user_id, score):
+        with self.lock:
+            self.boards.setdefault(quiz_id, _ScoreBoard()).record(user_id, score)
+
+    # readers take the lock too: record() rewrites the Fenwick tree and buckets in place
+
+    def size(self, quiz_id):
+        with self.lock:
+            board = self.boards.get(quiz_id)
+            return len(board.best) if board else 0
+
+    def score_of(self, quiz_id, user_id):
+        with self.lock:
+            board = self.boards.get(quiz_id)
+            return board.best.get(user_id) if board else None
+
+    def count_above(self, quiz_id, score):
+        with self.lock:
+            board = self.boards.get(quiz_id)
+            return board.count_above(score) if board else 0
+
+    def position_of(self, quiz_id, user_id):
+        with self.lock:
+            board = self.boards.get(quiz_id)
+            return board.position_of(user_id) if board else None
+
+    def range_by_rank(self, quiz_id, start, stop):
+        with self.lock:
+            board = self.boards.get(quiz_id)
+            if not board or stop <= start:
+                return []
+            return board.range_by_rank(start, stop)
+
+    def clear(self, quiz_id):
+        with self.lock:
+            self.boards.pop(quiz_id, None)
+
+    def quiz_ids(self):
+        with self.lock:
+            return set(self.boards)
+
+    def load(self, quiz_id, rows):
+        board = _ScoreBoard()
+        for user_id, score in rows:
+            board.record(user_id, score)
+        with self.lock:
+            self.boards[quiz_id] = board
+
+
+class Leaderboard:
+    def __init__(self):
+        self.backend = None
+
+    def init_app(self, app):
+        if app.config.get('LEADERBOARD_BACKEND', 'redis') == 'memory':
+            self.backend = MemoryLeaderboard()
+        else:
+            self.backend = RedisLeaderboard()
+        app.extensions['leaderboard'] = self
+
+    def record(self, quiz_id, user_id, score):
+        """Best-effort update called after a submission commits; never fails the request."""
+        try:
+            self.backend.record(quiz_id, user_id, score)
+        except Exception as e:
+            logging.error(f"Leaderboard update failed for quiz {quiz_id}: {e}")
+
+    def clear(self, quiz_id):
+        self.backend.clear(quiz_id)
+
+    def standing(self, quiz_id, user_id):
+        score = self.backend.score_of(quiz_id, user_id)
+        if score is None:
+            return None
+        total = self.backend.size(quiz_id)
+        above = self.backend.count_above(quiz_id, score)
+        return {
+            "rank": above + 1,
+            "score": score,
+            "percentile": round(100.0 * (total - above) / total, 2) if total else 0.0,
+        }
+
+    def top(self, quiz_id, k):
+        return self._ranked(quiz_id, 0, k)
+
+    def around(self, quiz_id, user_id, window):
+        position = self.backend.position_of(quiz_id, user_id)
+        if position is None:
+            return []
+        start = max(position - window, 0)
+        return self._ranked(quiz_id, start, position + window + 1)
+
+    def _ranked(self, quiz_id, start, stop):
+        rows = self.backend.range_by_rank(quiz_id, start, stop)
+        ranked = []
+        rank, previous = None, None
+        for offset, (user_id, score) in enumerate(rows):
+            # competition ranking: ties share a rank, the next distinct score skips ahead
+            if rank is None:
+                rank = self.backend.count_above(quiz_id, score) + 1
+            elif score != previous:
+                rank = start + offset + 1
+            previous = score
+            ranked.append({"rank": rank, "user_id": user_id, "score": score})
+        return ranked
+
+    def rebuild(self, quiz_id=None):
+        """Rebuild one or all boards in a single ordered pass over hot submissions and archive summaries.
+
+        A user can appear many times per quiz: once per hot submission and once per
+        archived month (``best_score``). Both backends keep only the highest score per
+        member (``ZADD GT`` / ``_ScoreBoard.record``), so the board ends up with each
+        user's best over both sources regardless of row order.
+        """
+        hot = db.session.query(QuizSubmission.quiz_id, QuizSubmission.user_id, QuizSubmission.score)
+        archived = db.session.query(SubmissionSummary.quiz_id, SubmissionSummary.user_id, SubmissionSummary.best_score)
+        if quiz_id is not None:
+            hot = hot.filter(QuizSubmission.quiz_id == quiz_id)
+            archived = archived.filter(SubmissionSummary.quiz_id == quiz_id)
+        query = hot.union_all(archived).order_by(QuizSubmission.quiz_id)
+
+        rebuilt = set()
+        for row_quiz, group in groupby(query.yield_per(REBUILD_CHUNK), key=itemgetter(0)):
+            self.backend.load(row_quiz, ((user_id, score) for _, user_id, score in group))
+            rebuilt.add(row_quiz)
+        # boards of quizzes left without submissions would otherwise keep their old standings
+        stale = {quiz_id} if quiz_id is not None else self.backend.quiz_ids()
+        for stale_quiz in stale - rebuilt:
+            self.backend.clear(stale_quiz)
+        return len(rebuilt)
+
+
+leaderboard = Leaderboard()
@@ -7,6 +7,7 @@ import json
 import re
 from applications.model import db, User, Admin
 from applications.extensions import cache
+from applications.admission import admission
 from flask_bcrypt import check_password_hash
 from sqlalchemy.exc import IntegrityError
 
@@ -59,6 +60,7 @@ class LoginAPI(Resource):
         return jsonify(response_data)
 
 
+    @admission.limit("login")
     def post(self):
         data = request.json
         email = data.get('email')
@@ -205,6 +207,7 @@ class LoginAPI(Resource):
 
 
 class SignupAPI(Resource):
+    @admission.limit("signup")
     def post(self):
         data = request.json
         email = data.get('email')
@@ -0,0 +1,315 @@
+"""Request/SQL/cache metrics rendered in the Prometheus text format.
+
+Every series lives in ``SharedMetrics``: Redis hashes that all processes add to, so
+/api/metrics reports the sum over every gunicorn worker no matter which one answers
+the scrape. Web requests only touch a per-process staging registry (``Metrics``)
+that is flushed to Redis in one pipeline every METRICS_FLUSH_INTERVAL seconds and
+before each scrape. Celery workers write to ``shared_metrics`` directly.
+"""
+import atexit
+import json
+import logging
+import re
+import time
+import uuid
+from collections import Counter, defaultdict
+from threading import Lock
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+_IN_LIST = re.compile(r"\((?:\s*\?\s*,)+\s*\?\s*\)")
+_LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def statement_shape(statement):
+    """Collapse literals and expanded IN (...) lists so repeated queries compare equal."""
+    shape = _IN_LIST.sub("(?)", statement)
+    shape = _LITERAL.sub("?", shape)
+    return _WHITESPACE.sub(" ", shape).strip()
+
+
+class _Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+    def merge(self, other):
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.sum += other.sum
+        self.count += other.count
+
+
+def _key(name, labels):
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value):
+    # exposition format: backslash, double quote and newline must be escaped in label values
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels):
+    return ",".join(f'{k}="{_escape(v)}"' for k, v in labels)
+
+
+def _number(value):
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+class Metrics:
+    """Per-process staging registry plus the Flask / SQLAlchemy hooks that feed it.
+
+    Recording only touches local dicts; ``flush`` moves the accumulated deltas into
+    ``shared_metrics``, so nothing here is ever rendered from process memory alone.
+    """
+
+    def __init__(self):
+        self.lock = Lock()
+        self.counters = {}
+        self.histograms = {}
+        self.help = {}
+        self.n_plus_one_threshold = 10
+        self.flush_interval = 1.0
+        self.last_flush = time.monotonic()
+
+    def init_app(self, app):
+        self.n_plus_one_threshold = app.config.get("N_PLUS_ONE_THRESHOLD", 10)
+        self.flush_interval = app.config.get("METRICS_FLUSH_INTERVAL", 1.0)
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        if not getattr(Metrics, "_engine_hooked", False):
+            event.listen(Engine, "before_cursor_execute", self._before_cursor_execute)
+            event.listen(Engine, "after_cursor_execute", self._after_cursor_execute)
+            Metrics._engine_hooked = True
+        app.extensions["metrics"] = self
+
+    # -- recording -------------------------------------------------------
+
+    def inc(self, name, labels, amount=1, help_text=None):
+        key = _key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+            if help_text:
+                self.help.setdefault(name, ("counter", help_text))
+
+    def observe(self, name, labels, value, buckets, help_text=None):
+        key = _key(name, labels)
+        with self.lock:
+            hist = self.histograms.get(key)
+            if hist is None:
+                hist = self.histograms[key] = _Histogram(buckets)
+            hist.observe(value)
+            if help_text:
+                self.help.setdefault(name, ("histogram", help_text))
+
+    def flush(self):
+        """Push everything recorded since the last flush to Redis; on failure keep it for the next one."""
+        with self.lock:
+            counters, histograms, help_text = self.counters, self.histograms, self.help
+            self.counters, self.histograms, self.help = {}, {}, {}
+            self.last_flush = time.monotonic()
+        if not (counters or histograms or help_text):
+            return
+        if shared_metrics.push(counters, histograms, help_text):
+            return
+        with self.lock:
+            for key, amount in counters.items():
+                self.counters[key] = self.counters.get(key, 0) + amount
+            for key, hist in histograms.items():
+                if key in self.histograms:
+                    hist.merge(self.histograms[key])
+                self.histograms[key] = hist
+            for name, text in help_text.items():
+                self.help.setdefault(name, text)
+
+    def flush_if_due(self):
+        if time.monotonic() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def cache_lookup(self, key, hit):
+        """Called by the instrumented cache for every get()."""
+        family = re.sub(r"_\d+$", "", str(key))
+        labels = {"key": family, "result": "hit" if hit else "miss"}
+        if has_request_context():
+            labels.update(self._route_labels())
+        self.inc("quiz_cache_requests_total", labels, help_text="Cache lookups by key family and result")
+
+    # -- flask hooks -----------------------------------------------------
+
+    @staticmethod
+    def _route_labels():
+        rule = request.url_rule.rule if request.url_rule else "unmatched"
+        return {"method": request.method, "route": rule}
+
+    def _start_request(self):
+        g.trace_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex
+        g.metrics_start = time.perf_counter()
+        g.sql_count = 0
+        g.sql_time = 0.0
+        g.sql_shapes = Counter()
+
+    def _finish_request(self, response):
+        if "trace_id" in g:
+            response.headers["X-Request-ID"] = g.trace_id
+        start = g.get("metrics_start")
+        if start is None:
+            return response
+        labels = self._route_labels()
+        elapsed = time.perf_counter() - start
+        self.inc("quiz_http_requests_total", {**labels, "status": response.status_code},
+                 help_text="HTTP requests by route and status")
+        self.observe("quiz_http_request_duration_seconds", labels, elapsed, LATENCY_BUCKETS,
+                     help_text="HTTP request latency")
+        self.inc("quiz_sql_statements_total", labels, g.sql_count, help_text="SQL statements executed")
+        self.inc("quiz_sql_duration_seconds_total", labels, g.sql_time, help_text="Time spent in SQL")
+        self.observe("quiz_sql_statements_per_request", labels, g.sql_count, STATEMENT_BUCKETS,
+                     help_text="SQL statements issued per request")
+        self._check_n_plus_one(labels)
+        # after the body is sent, so the Redis round trip never delays the response
+        response.call_on_close(self.flush_if_due)
+        return response
+
+    def _check_n_plus_one(self, labels):
+        for shape, count in g.sql_shapes.items():
+            if count > self.n_plus_one_threshold:
+                self.inc("quiz_n_plus_one_total", labels,
+                         help_text="Requests that repeated one statement shape past the threshold")
+                logging.warning(
+                    f"Possible N+1 in {labels['method']} {labels['route']}: "
+                    f"{count} executions of: {shape[:200]}"
+                )
+
+    # -- sqlalchemy hooks ------------------------------------------------
+
+    @staticmethod
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @staticmethod
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("query_start")
+        if not starts:
+            return
+        elapsed = time.perf_counter() - starts.pop()
+        if not has_request_context() or "sql_shapes" not in g:
+            return
+        g.sql_count += 1
+        g.sql_time += elapsed
+        g.sql_shapes[statement_shape(statement)] += 1
+
+    # -- exposition ------------------------------------------------------
+
+    def render(self):
+        self.flush()
+        return "\n".join(shared_metrics.render_lines()) + "\n"
+
+
+class SharedMetrics:
+    """Counters and histograms kept in Redis hashes so every process adds to the same series.
+
+    Hash fields are JSON ``[name, labels, part]`` triples, so label values may contain
+    any character; ``part`` is ``le=<bound>``, ``sum`` or ``count`` for histograms.
+    """
+
+    COUNTERS = "metrics:counters"
+    HISTOGRAMS = "metrics:histograms"
+    HELP = "metrics:help"
+
+    @staticmethod
+    def _field(key, part=None):
+        name, labels = key
+        return json.dumps([name, labels, part])
+
+    def push(self, counters, histograms, help_text=None):
+        """Add counter deltas and ``_Histogram`` deltas in one round trip; False if Redis failed."""
+        from applications.extensions import redis_store
+        try:
+            pipe = redis_store.pipeline(transaction=False)
+            for key, amount in counters.items():
+                pipe.hincrbyfloat(self.COUNTERS, self._field(key), amount)
+            for key, hist in histograms.items():
+                for bound, count in zip(hist.buckets, hist.counts):
+                    pipe.hincrby(self.HISTOGRAMS, self._field(key, f"le={bound}"), count)
+                pipe.hincrbyfloat(self.HISTOGRAMS, self._field(key, "sum"), hist.sum)
+                pipe.hincrby(self.HISTOGRAMS, self._field(key, "count"), hist.count)
+            for name, (kind, text) in (help_text or {}).items():
+                pipe.hsetnx(self.HELP, name, f"{kind}|{text}")
+            pipe.execute()
+            return True
+        except Exception as e:
+            logging.warning(f"Shared metrics not recorded: {e}")
+            return False
+
+    def inc(self, name, labels, amount=1, help_text=None):
+        self.push({_key(name, labels): amount}, {}, {name: ("counter", help_text)} if help_text else None)
+
+    def observe(self, name, labels, value, buckets, help_text=None):
+        hist = _Histogram(buckets)
+        hist.observe(value)
+        self.push({}, {_key(name, labels): hist}, {name: ("histogram", help_text)} if help_text else None)
+
+    def render_lines(self):
+        from applications.extensions import redis_store
+        try:
+            counters = redis_store.hgetall(self.COUNTERS)
+            histograms = redis_store.hgetall(self.HISTOGRAMS)
+            help_text = {k.decode(): v.decode() for k, v in redis_store.hgetall(self.HELP).items()}
+        except Exception as e:
+            logging.warning(f"Shared metrics unavailable: {e}")
+            return []
+
+        def header(name, kind):
+            lines.append(f"# HELP {name} {help_text.get(name, '|' + name).split('|', 1)[1]}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        lines = []
+        by_name = defaultdict(list)
+        for field, value in counters.items():
+            name, labels, _ = json.loads(field)
+            by_name[name].append((labels, value))
+        for name in sorted(by_name):
+            header(name, "counter")
+            for labels, value in sorted(by_name[name]):
+                lines.append(f"{name}{{{_labels(labels)}}} {_number(value)}")
+
+        series = defaultdict(dict)
+        for field, value in histograms.items():
+            name, labels, part = json.loads(field)
+            series[(name, tuple(map(tuple, labels)))][part] = float(value)
+        by_name = defaultdict(list)
+        for (name, labels), parts in sorted(series.items()):
+            bounds = sorted((float(p[3:]), p[3:]) for p in parts if p.startswith("le="))
+            cumulative = 0
+            for _, raw in bounds:
+                cumulative += parts[f"le={raw}"]
+                by_name[name].append(f"{name}_bucket{{{_labels(labels + (('le', raw),))}}} {_number(cumulative)}")
+            count = parts.get("count", 0)
+            by_name[name].append(f"{name}_bucket{{{_labels(labels + (('le', '+Inf'),))}}} {_number(count)}")
+            by_name[name].append(f"{name}_sum{{{_labels(labels)}}} {_number(parts.get('sum', 0))}")
+            by_name[name].append(f"{name}_count{{{_labels(labels)}}} {_number(count)}")
+        for name in sorted(by_name):
+            header(name, "histogram")
+            lines.extend(by_name[name])
+        return lines
+
+
+metrics = Metrics()
+shared_metrics = SharedMetrics()
+atexit.register(metrics.flush)
@@ -0,0 +1,52 @@
+from flask import make_response, request, current_app, jsonify
+from flask_restful import Resource
+from flask_jwt_extended import jwt_required, get_jwt_identity, verify_jwt_in_request
+import json
+from applications.metrics import metrics
+from applications.profiler import profiler
+
+
+def _scrape_allowed():
+    """A matching X-Metrics-Token (only when METRICS_TOKEN is set) or an admin JWT; nothing else."""
+    token = current_app.config.get("METRICS_TOKEN")
+    if token and request.headers.get("X-Metrics-Token") == token:
+        return True
+    try:
+        verify_jwt_in_request(optional=True)
+        identity = json.loads(get_jwt_identity() or "{}")
+    except Exception:
+        return False
+    return identity.get("role") == "admin"
+
+
+class MetricsAPI(Resource):
+    def get(self):
+        if not _scrape_allowed():
+            return make_response("forbidden\n", 403)
+        response = make_response(metrics.render(), 200)
+        response.headers["Content-Type"] = "text/plain; version=0.0.4; charset=utf-8"
+        return response
+
+
+class AdminProfilesAPI(Resource):
+    @jwt_required()
+    def get(self, profile_id=None):
+        try:
+            current_user = json.loads(get_jwt_identity() or "{}")
+        except json.JSONDecodeError:
+            return make_response(jsonify({"error": "Invalid JWT token"}), 401)
+        if current_user.get("role") != "admin":
+            return make_response(jsonify({"error": "Unauthorized"}), 403)
+
+        if profile_id is None:
+            route = request.args.get("route")
+            profiles = [p for p in profiler.recent() if not route or p["route"] == route]
+            return make_response(jsonify(profiles), 200)
+
+        collapsed = profiler.collapsed(profile_id)
+        if collapsed is None:
+            return make_response(jsonify({"error": "Profile not found"}), 404)
+        response = make_response(collapsed + "\n", 200)
+        response.headers["Content-Type"] = "text/plain; charset=utf-8"
+        response.headers["Content-Disposition"] = f'attachment; filename="{profile_id}.collapsed"'
+        return response
@@ -1,10 +1,25 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
 from flask_login import UserMixin
 from datetime import datetime, time
+import json
+import sqlite3
+import zlib
 from flask_bcrypt import generate_password_hash, check_password_hash
 
 db = SQLAlchemy()
 
+
+@event.listens_for(Engine, "connect")
+def _enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+    # SQLite ignores foreign keys, ON DELETE CASCADE included, unless every connection turns them on
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
+
 class User(db.Model, UserMixin):
     id = db.Column(db.Integer, primary_key=True)
     email = db.Column(db.String(50), unique=True, nullable=False)
@@ -40,28 +55,28 @@ class Subject(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(50), unique=True, nullable=False)
     description = db.Column(db.Text)
-    chapters = db.relationship('Chapter', backref='subject', cascade="all, delete-orphan", lazy=True)
+    chapters = db.relationship('Chapter', backref='subject', cascade="all, delete-orphan", passive_deletes=True, lazy=True)
 
 class Chapter(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(50), nullable=False)
     description = db.Column(db.Text)
-    subject_id = db.Column(db.Integer, db.ForeignKey('subject.id'), nullable=False)
+    subject_id = db.Column(db.Integer, db.ForeignKey('subject.id', ondelete='CASCADE'), nullable=False, index=True)
     n_questions = db.Column(db.Integer, default=0, nullable=False)
     n_quizzes = db.Column(db.Integer, default=0, nullable=False) 
-    quizzes = db.relationship('Quiz', backref='chapter', cascade="all, delete-orphan", lazy=True)
+    quizzes = db.relationship('Quiz', backref='chapter', cascade="all, delete-orphan", passive_deletes=True, lazy=True)
 
 class Quiz(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title= db.Column(db.String(50), nullable=False)
-    chapter_id = db.Column(db.Integer, db.ForeignKey('chapter.id'), nullable=False)
+    chapter_id = db.Column(db.Integer, db.ForeignKey('chapter.id', ondelete='CASCADE'), nullable=False, index=True)
     date_of_quiz = db.Column(db.Date, default=datetime.now, nullable=False)
     last_date = db.Column(db.Date, nullable=False)
     time_duration = db.Column(db.String(10), default='01:00', nullable=False)
     remarks = db.Column(db.Text)
     num_questions = db.Column(db.Integer, default=0, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.now)
-    questions = db.relationship('Question', backref='quiz', cascade="all, delete-orphan", lazy=True)
+    questions = db.relationship('Question', backref='quiz', cascade="all, delete-orphan", passive_deletes=True, lazy=True)
     def __init__(self, time_duration='01:00', **kwargs):
         if not self.validate_time_format(time_duration):
             raise ValueError("Time duration must be in 'hh:mm' format")
@@ -90,7 +105,7 @@ class Quiz(db.Model):
 
 class Question(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id'), nullable=False)
+    quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id', ondelete='CASCADE'), nullable=False, index=True)
     q_no = db.Column(db.Integer, nullable=False)
     title = db.Column(db.String(50), nullable=False)
     question_statement = db.Column(db.Text, nullable=False)
@@ -99,16 +114,87 @@ class Question(db.Model):
     option3 = db.Column(db.String(50))
     option4 = db.Column(db.String(50))
     correct_option = db.Column(db.Integer, nullable=False)
+    answer_slot = db.Column(db.Integer)
 
 
 class QuizSubmission(db.Model):
     __tablename__ = 'quiz_submissions'
     id = db.Column(db.Integer, primary_key=True)
-    quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id'), nullable=False)
+    quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id', ondelete='CASCADE'), nullable=False, index=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     score = db.Column(db.Integer, nullable=False)
     total_questions = db.Column(db.Integer, nullable=False)
     submitted_at = db.Column(db.DateTime, nullable=False)
     answers = db.Column(db.JSON, nullable=False)
+    answers_packed = db.Column(db.LargeBinary)
+    correct_bitmap = db.Column(db.LargeBinary)
+    def __repr__(self):
+        return f'<QuizSubmission {self.id}>'
+
+
+class SubmissionRollup(db.Model):
+    __tablename__ = 'submission_rollups'
+    granularity = db.Column(db.String(5), primary_key=True)  # 'hour' or 'day'
+    bucket_start = db.Column(db.DateTime, primary_key=True)
+    quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id', ondelete='CASCADE'), primary_key=True, index=True)
+    count = db.Column(db.Integer, default=0, nullable=False)
+    score_sum = db.Column(db.Integer, default=0, nullable=False)
+    score_sq_sum = db.Column(db.Integer, default=0, nullable=False)
+    def __repr__(self):
+        return f'<SubmissionRollup {self.granularity} {self.bucket_start} quiz={self.quiz_id}>'
+
+
+class ArchivedSubmission(db.Model):
+    """A quiz_submissions row moved out of the hot table by the archiver (same id).
+
+    JSON answers are kept zlib-compressed in ``answers_z``; the packed columns are
+    already compact and are copied as they are.
+    """
+    __tablename__ = 'quiz_submissions_archive'
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id', ondelete='CASCADE'), nullable=False, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    score = db.Column(db.Integer, nullable=False)
+    total_questions = db.Column(db.Integer, nullable=False)
+    submitted_at = db.Column(db.DateTime, nullable=False, index=True)
+    answers_z = db.Column(db.LargeBinary)
+    answers_packed = db.Column(db.LargeBinary)
+    correct_bitmap = db.Column(db.LargeBinary)
+
+    @property
+    def answers(self):
+        if not self.answers_z:
+            return []
+        return json.loads(zlib.decompress(self.answers_z))
+
+    def __repr__(self):
+        return f'<ArchivedSubmission {self.id}>'
+
+
+class SubmissionSummary(db.Model):
+    """Archived submissions of one user on one quiz in one calendar month."""
+    __tablename__ = 'submission_archive_summaries'
+    period_start = db.Column(db.Date, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id', ondelete='CASCADE'), primary_key=True, index=True)
+    count = db.Column(db.Integer, default=0, nullable=False)
+    score_sum = db.Column(db.Integer, default=0, nullable=False)
+    best_score = db.Column(db.Integer, default=0, nullable=False)
+    total_questions = db.Column(db.Integer, default=0, nullable=False)
+    last_submitted_at = db.Column(db.DateTime, nullable=False)
+    def __repr__(self):
+        return f'<SubmissionSummary {self.period_start} user={self.user_id} quiz={self.quiz_id}>'
+
+
+class UserProgress(db.Model):
+    """A user's running totals in one subject or chapter, updated with every submission."""
+    __tablename__ = 'user_progress'
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    scope = db.Column(db.String(7), primary_key=True)  # 'subject' or 'chapter'
+    scope_id = db.Column(db.Integer, primary_key=True)
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    score_sum = db.Column(db.Integer, default=0, nullable=False)
+    percent_sum = db.Column(db.Float, default=0, nullable=False)
+    last_attempt_at = db.Column(db.DateTime, nullable=False)
     def __repr__(self):
-        return f'<QuizSubmission {self.id}>'
\ No newline at end of file
+        return f'<UserProgress user={self.user_id} {self.scope}={self.scope_id}>'
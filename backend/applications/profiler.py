@@ -0,0 +1,155 @@
+"""Opt-in per-request stack sampling profiler.
+
+A request is profiled when an admin sends ``X-Profile: 1`` or when it falls into
+the ``PROFILE_SAMPLE_RATE`` sample. A daemon thread then samples the request
+thread's stack every ``PROFILE_INTERVAL_MS`` until the request ends, and the
+result is stored in collapsed-stack format (``a;b;c <count>``, readable by
+flamegraph.pl / speedscope) in a bounded ring in Redis shared by all workers.
+"""
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+
+from flask import current_app, g, request
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+
+from applications.extensions import redis_store
+
+RING_KEY = "profiles:ring"
+PROFILE_KEY = "profiles:data:"
+
+
+class StackSampler(threading.Thread):
+    def __init__(self, thread_id, interval, max_seconds):
+        super().__init__(daemon=True, name="request-profiler")
+        self.thread_id = thread_id
+        self.interval = interval
+        self.deadline = time.monotonic() + max_seconds
+        self.samples = Counter()
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval) and time.monotonic() < self.deadline:
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self.stopped.set()
+        self.join(timeout=1)
+
+
+def route_tag():
+    """Resource-level name such as ``AdminUserDetailsAPI.get``, or the URL rule as a fallback."""
+    view = current_app.view_functions.get(request.endpoint)
+    view_class = getattr(view, "view_class", None)
+    if view_class is not None:
+        return f"{view_class.__name__}.{request.method.lower()}"
+    return request.url_rule.rule if request.url_rule else request.path
+
+
+class RequestProfiler:
+    def __init__(self):
+        self.local_ring = deque(maxlen=50)
+
+    def init_app(self, app):
+        self.sample_rate = float(app.config.get("PROFILE_SAMPLE_RATE", 0.0))
+        self.interval = app.config.get("PROFILE_INTERVAL_MS", 5) / 1000.0
+        self.max_seconds = app.config.get("PROFILE_MAX_SECONDS", 30)
+        self.ring_size = app.config.get("PROFILE_RING_SIZE", 50)
+        self.local_ring = deque(maxlen=self.ring_size)
+        app.before_request(self._start)
+        app.after_request(self._tag_response)
+        app.teardown_request(self._finish)
+        app.extensions["profiler"] = self
+
+    def _requested_by_admin(self):
+        if request.headers.get("X-Profile") != "1":
+            return False
+        try:
+            verify_jwt_in_request(optional=True)
+            identity = json.loads(get_jwt_identity() or "{}")
+        except Exception:
+            return False
+        return identity.get("role") == "admin"
+
+    def _start(self):
+        if request.method == "OPTIONS":
+            return
+        sampled = self.sample_rate > 0 and random.random() < self.sample_rate
+        if not (sampled or self._requested_by_admin()):
+            return
+        sampler = StackSampler(threading.get_ident(), self.interval, self.max_seconds)
+        g.profile = {"id": uuid.uuid4().hex[:12], "sampler": sampler, "started": time.time(),
+                     "trigger": "sample" if sampled else "header"}
+        sampler.start()
+
+    def _tag_response(self, response):
+        profile = g.get("profile")
+        if profile:
+            response.headers["X-Profile-Id"] = profile["id"]
+        return response
+
+    def _finish(self, exc=None):
+        profile = g.pop("profile", None)
+        if not profile:
+            return
+        sampler = profile["sampler"]
+        sampler.stop()
+        tag = route_tag()
+        collapsed = "\n".join(
+            f"{tag};{stack} {count}" for stack, count in sampler.samples.most_common()
+        )
+        record = {
+            "id": profile["id"],
+            "route": tag,
+            "path": request.full_path.rstrip("?"),
+            "trigger": profile["trigger"],
+            "started_at": profile["started"],
+            "duration_ms": round((time.time() - profile["started"]) * 1000, 2),
+            "samples": sum(sampler.samples.values()),
+            "interval_ms": self.interval * 1000,
+        }
+        self._store(record, collapsed)
+
+    def _store(self, record, collapsed):
+        try:
+            pipe = redis_store.pipeline()
+            pipe.lpush(RING_KEY, json.dumps(record))
+            pipe.ltrim(RING_KEY, 0, self.ring_size - 1)
+            pipe.set(PROFILE_KEY + record["id"], collapsed, ex=24 * 3600)
+            pipe.execute()
+        except Exception as e:
+            logging.warning(f"Profile {record['id']} kept in-process only: {e}")
+            self.local_ring.appendleft((record, collapsed))
+
+    def recent(self):
+        try:
+            records = [json.loads(r) for r in redis_store.lrange(RING_KEY, 0, self.ring_size - 1)]
+        except Exception:
+            records = []
+        return records + [r for r, _ in self.local_ring]
+
+    def collapsed(self, profile_id):
+        for record, collapsed in self.local_ring:
+            if record["id"] == profile_id:
+                return collapsed
+        try:
+            data = redis_store.get(PROFILE_KEY + profile_id)
+        except Exception:
+            return None
+        return data.decode() if data is not None else None
+
+
+profiler = RequestProfiler()
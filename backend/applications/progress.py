@@ -0,0 +1,277 @@
+"""Per-user mastery profile and next-quiz recommendations.
+
+``record_progress`` adds every submission to the user's running totals for the
+quiz's subject and chapter (``user_progress``), inside the submission's own
+transaction, so a profile is a handful of primary-key rows rather than a scan
+of the user's submissions. Deleting catalog entries takes their submissions
+off again (``discard_progress``).
+
+``recommend`` ranks the open quizzes the user has not attempted yet. Each
+quiz's chapter (falling back to its subject, then to the user's overall mean)
+gives an estimated mastery, shrunk toward the user's mean while attempts are
+few; the score favours weak chapters, chapters never tried and quizzes that
+close soon. Results are cached per user until their next submission or
+``RECOMMENDATION_TIMEOUT`` (quizzes open and close over time).
+"""
+import logging
+from datetime import date
+
+import numpy as np
+from sqlalchemy import bindparam, func
+from sqlalchemy.dialects.sqlite import insert
+
+from applications.extensions import cache
+from applications.model import db, User, Quiz, Chapter, Subject, QuizSubmission, ArchivedSubmission, UserProgress
+
+SCOPES = ("subject", "chapter")
+RECOMMENDATION_TIMEOUT = 15 * 60
+DEFAULT_LIMIT = 5
+# pseudo-attempts at the user's mean added to every chapter/subject estimate
+PRIOR_WEIGHT = 2.0
+PRIOR_MASTERY = 0.5
+WEIGHTS = {"weakness": 1.0, "new_chapter": 0.35, "closing_soon": 0.25}
+CLOSING_SOON_DAYS = 3
+INVALIDATE_CHUNK = 1000
+
+
+def _percent(score, total_questions):
+    return score / total_questions * 100 if total_questions else 0.0
+
+
+def _upsert(user_id, scope, scope_id, attempts, score_sum, percent_sum, last_attempt_at):
+    stmt = insert(UserProgress).values(
+        user_id=user_id,
+        scope=scope,
+        scope_id=scope_id,
+        attempts=attempts,
+        score_sum=score_sum,
+        percent_sum=percent_sum,
+        last_attempt_at=last_attempt_at,
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["user_id", "scope", "scope_id"],
+        set_={
+            "attempts": UserProgress.attempts + stmt.excluded.attempts,
+            "score_sum": UserProgress.score_sum + stmt.excluded.score_sum,
+            "percent_sum": UserProgress.percent_sum + stmt.excluded.percent_sum,
+            # two-argument max() is SQLite's scalar max
+            "last_attempt_at": func.max(UserProgress.last_attempt_at, stmt.excluded.last_attempt_at),
+        },
+    )
+    db.session.execute(stmt)
+
+
+def record_progress(submission, quiz):
+    """Add one submission to the user's subject and chapter totals; runs inside the caller's transaction."""
+    percent = _percent(submission.score, submission.total_questions)
+    scope_ids = {"subject": quiz.chapter.subject_id, "chapter": quiz.chapter_id}
+    for scope in SCOPES:
+        _upsert(submission.user_id, scope, scope_ids[scope], 1, submission.score, percent,
+                submission.submitted_at)
+
+
+def discard_progress(rows, scopes):
+    """Take deleted submissions, ``(user_id, score, total_questions)`` rows, off their users' totals in ``scopes``.
+
+    Runs inside the caller's transaction. ``last_attempt_at`` keeps its value; totals
+    left without attempts are removed.
+    """
+    totals = {}
+    for user_id, score, total_questions in rows:
+        attempts, score_sum, percent_sum = totals.get(user_id, (0, 0, 0.0))
+        totals[user_id] = (attempts + 1, score_sum + score, percent_sum + _percent(score, total_questions))
+    if not totals or not scopes:
+        return
+    table = UserProgress.__table__
+    db.session.execute(
+        table.update()
+        .where(table.c.user_id == bindparam("b_user_id"), table.c.scope == bindparam("b_scope"),
+               table.c.scope_id == bindparam("b_scope_id"))
+        .values(attempts=table.c.attempts - bindparam("b_attempts"),
+                score_sum=table.c.score_sum - bindparam("b_score_sum"),
+                percent_sum=table.c.percent_sum - bindparam("b_percent_sum")),
+        [
+            {"b_user_id": user_id, "b_scope": scope, "b_scope_id": scope_id,
+             "b_attempts": attempts, "b_score_sum": score_sum, "b_percent_sum": percent_sum}
+            for user_id, (attempts, score_sum, percent_sum) in totals.items()
+            for scope, scope_id in scopes
+        ],
+    )
+    UserProgress.query.filter(UserProgress.user_id.in_(list(totals)), UserProgress.attempts <= 0) \
+        .delete(synchronize_session=False)
+
+
+def rebuild_progress():
+    """Recompute every profile from hot and archived submissions (backfill after upgrading)."""
+    from applications.archive import all_submissions
+    source = all_submissions("user_id", "quiz_id", "score", "total_questions", "submitted_at")
+    percent = func.iif(source.c.total_questions > 0, source.c.score * 100.0 / source.c.total_questions, 0.0)
+    UserProgress.query.delete(synchronize_session=False)
+    for scope, column in (("subject", Chapter.subject_id), ("chapter", Chapter.id)):
+        rows = (
+            db.session.query(source.c.user_id, column, func.count(), func.sum(source.c.score),
+                             func.sum(percent), func.max(source.c.submitted_at))
+            .join(Quiz, Quiz.id == source.c.quiz_id)
+            .join(Chapter, Chapter.id == Quiz.chapter_id)
+            .group_by(source.c.user_id, column)
+            .all()
+        )
+        db.session.bulk_insert_mappings(UserProgress, [
+            {
+                "user_id": user_id, "scope": scope, "scope_id": scope_id, "attempts": attempts,
+                "score_sum": score_sum or 0, "percent_sum": percent_sum or 0.0, "last_attempt_at": last,
+            }
+            for user_id, scope_id, attempts, score_sum, percent_sum, last in rows
+        ])
+    db.session.commit()
+
+
+def profile(user_id):
+    """``{"subjects": [...], "chapters": [...]}`` with attempts, average score/percentage and last attempt."""
+    rows = UserProgress.query.filter_by(user_id=user_id).all()
+    names = {
+        "subject": dict(db.session.query(Subject.id, Subject.name)
+                        .filter(Subject.id.in_([r.scope_id for r in rows if r.scope == "subject"]))),
+        "chapter": {cid: (name, sid) for cid, name, sid in db.session.query(Chapter.id, Chapter.name, Chapter.subject_id)
+                    .filter(Chapter.id.in_([r.scope_id for r in rows if r.scope == "chapter"]))},
+    }
+    result = {"subjects": [], "chapters": []}
+    for row in sorted(rows, key=lambda r: (r.scope, r.scope_id)):
+        entry = {
+            "id": row.scope_id,
+            "attempts": row.attempts,
+            "average_score": round(row.score_sum / row.attempts, 2),
+            "average_percent": round(row.percent_sum / row.attempts, 2),
+            "last_attempt_at": row.last_attempt_at.isoformat(),
+        }
+        if row.scope == "subject":
+            entry["name"] = names["subject"].get(row.scope_id, "Unknown")
+            result["subjects"].append(entry)
+        else:
+            name, subject_id = names["chapter"].get(row.scope_id, ("Unknown", None))
+            entry.update(name=name, subject_id=subject_id)
+            result["chapters"].append(entry)
+    return result
+
+
+def _recommendations_key(user_id):
+    return f"recommendations_{user_id}"
+
+
+def _open_unattempted(user_id, today):
+    attempted = db.session.query(QuizSubmission.quiz_id).filter(QuizSubmission.user_id == user_id).union(
+        db.session.query(ArchivedSubmission.quiz_id).filter(ArchivedSubmission.user_id == user_id)
+    )
+    return (
+        db.session.query(Quiz.id, Quiz.title, Quiz.chapter_id, Chapter.subject_id, Chapter.name, Quiz.last_date,
+                         Quiz.num_questions)
+        .join(Chapter, Quiz.chapter_id == Chapter.id)
+        .filter(Quiz.date_of_quiz <= today, Quiz.last_date >= today, Quiz.num_questions > 0,
+                Quiz.id.notin_(attempted))
+        .all()
+    )
+
+
+def _mastery(rows, scope, ids, prior):
+    """Shrunk mastery (0-1) and attempt count per id in ``ids`` for one scope; NaN where never attempted."""
+    stats = [(r.scope_id, r.attempts, r.percent_sum) for r in rows if r.scope == scope]
+    mastery = np.full(len(ids), np.nan)
+    attempts = np.zeros(len(ids))
+    if not stats:
+        return mastery, attempts
+    known = np.array([s[0] for s in stats])
+    order = np.argsort(known)
+    known = known[order]
+    counts = np.array([s[1] for s in stats], dtype=float)[order]
+    sums = np.array([s[2] for s in stats], dtype=float)[order] / 100
+    pos = np.clip(np.searchsorted(known, ids), 0, len(known) - 1)
+    hit = known[pos] == ids
+    attempts[hit] = counts[pos[hit]]
+    mastery[hit] = (sums[pos[hit]] + PRIOR_WEIGHT * prior) / (counts[pos[hit]] + PRIOR_WEIGHT)
+    return mastery, attempts
+
+
+def rank_quizzes(user_id, today=None, limit=DEFAULT_LIMIT):
+    today = today or date.today()
+    candidates = _open_unattempted(user_id, today)
+    if not candidates:
+        return []
+    rows = UserProgress.query.filter_by(user_id=user_id).all()
+    subject_rows = [r for r in rows if r.scope == "subject"]
+    total_attempts = sum(r.attempts for r in subject_rows)
+    prior = sum(r.percent_sum for r in subject_rows) / 100 / total_attempts if total_attempts else PRIOR_MASTERY
+
+    chapter_ids = np.array([c.chapter_id for c in candidates])
+    subject_ids = np.array([c.subject_id for c in candidates])
+    chapter_mastery, chapter_attempts = _mastery(rows, "chapter", chapter_ids, prior)
+    subject_mastery, _ = _mastery(rows, "subject", subject_ids, prior)
+    mastery = np.where(np.isnan(chapter_mastery),
+                       np.where(np.isnan(subject_mastery), prior, subject_mastery), chapter_mastery)
+    days_left = np.array([(c.last_date - today).days for c in candidates], dtype=float)
+
+    weakness = 1 - mastery
+    new_chapter = chapter_attempts == 0
+    closing_soon = days_left <= CLOSING_SOON_DAYS
+    scores = (WEIGHTS["weakness"] * weakness
+              + WEIGHTS["new_chapter"] * new_chapter
+              + WEIGHTS["closing_soon"] / (1 + days_left))
+    # best first; ties go to the quiz closing sooner
+    order = np.lexsort((days_left, -scores))[:limit]
+
+    result = []
+    for i in order:
+        quiz = candidates[i]
+        reasons = []
+        if not new_chapter[i] and weakness[i] >= 0.5:
+            reasons.append("weak_chapter")
+        if new_chapter[i]:
+            reasons.append("new_chapter")
+        if closing_soon[i]:
+            reasons.append("closing_soon")
+        result.append({
+            "quiz_id": quiz.id,
+            "title": quiz.title,
+            "chapter_id": quiz.chapter_id,
+            "chapter_name": quiz.name,
+            "subject_id": quiz.subject_id,
+            "last_date": quiz.last_date.isoformat(),
+            "num_questions": quiz.num_questions,
+            "estimated_mastery": round(float(mastery[i]) * 100, 1),
+            "score": round(float(scores[i]), 4),
+            "reasons": reasons,
+        })
+    return result
+
+
+def recommendations(user_id, limit=DEFAULT_LIMIT):
+    """Cached ``rank_quizzes`` for today; the cache holds enough entries for any allowed ``limit``."""
+    key = _recommendations_key(user_id)
+    cached = cache.get(key)
+    if cached is not None and cached["date"] == date.today().isoformat() and cached["limit"] >= limit:
+        return cached["quizzes"][:limit]
+    quizzes = rank_quizzes(user_id, limit=max(limit, DEFAULT_LIMIT))
+    cache.set(key, {"date": date.today().isoformat(), "limit": max(limit, DEFAULT_LIMIT), "quizzes": quizzes},
+              timeout=RECOMMENDATION_TIMEOUT)
+    return quizzes[:limit]
+
+
+def invalidate_recommendations(user_id):
+    try:
+        cache.delete(_recommendations_key(user_id))
+    except Exception as e:
+        logging.error(f"Recommendation cache not invalidated for user {user_id}: {e}")
+
+
+def invalidate_all_recommendations(chunk=INVALIDATE_CHUNK):
+    """Drop every user's cached recommendations, e.g. after a quiz they may list was deleted."""
+    last_id = 0
+    try:
+        while True:
+            ids = [user_id for (user_id,) in db.session.query(User.id).filter(User.id > last_id)
+                   .order_by(User.id).limit(chunk)]
+            if not ids:
+                return
+            cache.delete_keys(*(_recommendations_key(user_id) for user_id in ids))
+            last_id = ids[-1]
+    except Exception as e:
+        logging.error(f"Recommendation caches not invalidated after user {last_id}: {e}")
@@ -0,0 +1,54 @@
+from flask import request, jsonify, make_response, current_app
+from flask_restful import Resource
+from flask_jwt_extended import jwt_required, get_jwt_identity
+import json
+from applications.progress import profile, recommendations, DEFAULT_LIMIT
+from applications.admission import admission
+
+MAX_LIMIT = 20
+
+
+def _target_user(current_user):
+    """The requesting student, or ``?user_id`` when an admin asks on their behalf."""
+    if current_user.get("role") == "admin":
+        return int(request.args["user_id"])
+    return current_user.get("id")
+
+
+class MyProgressAPI(Resource):
+    @jwt_required()
+    @admission.limit("browse")
+    def get(self):
+        try:
+            current_user = json.loads(get_jwt_identity() or "{}")
+        except json.JSONDecodeError:
+            return make_response(jsonify({"error": "Invalid JWT token"}), 401)
+        try:
+            user_id = _target_user(current_user)
+        except (KeyError, ValueError):
+            return make_response(jsonify({"error": "user_id is required"}), 400)
+        try:
+            return make_response(jsonify(profile(user_id)), 200)
+        except Exception as e:
+            current_app.logger.error(str(e))
+            return make_response(jsonify({"error": "Failed to fetch progress"}), 500)
+
+
+class RecommendationsAPI(Resource):
+    @jwt_required()
+    @admission.limit("browse")
+    def get(self):
+        try:
+            current_user = json.loads(get_jwt_identity() or "{}")
+        except json.JSONDecodeError:
+            return make_response(jsonify({"error": "Invalid JWT token"}), 401)
+        try:
+            user_id = _target_user(current_user)
+            limit = min(max(int(request.args.get("limit", DEFAULT_LIMIT)), 1), MAX_LIMIT)
+        except (KeyError, ValueError):
+            return make_response(jsonify({"error": "user_id and limit must be integers"}), 400)
+        try:
+            return make_response(jsonify(recommendations(user_id, limit)), 200)
+        except Exception as e:
+            current_app.logger.error(str(e))
+            return make_response(jsonify({"error": "Failed to fetch recommendations"}), 500)
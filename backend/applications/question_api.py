@@ -1,12 +1,20 @@
 from flask import request, jsonify, make_response
 from flask_restful import Resource
 from flask_jwt_extended import jwt_required, get_jwt_identity
+import csv
 import json
 from applications.model import db, Question, Quiz, Chapter
 from applications.extensions import cache
+from applications.catalog import questions_payload, QUESTIONS_TIMEOUT
+from applications.answer_storage import next_answer_slot
+from applications.question_import import QuestionImport, iter_rows
+from applications.quiz_bundle import invalidate_quiz_content
+from applications.cache_warmer import schedule_cache_warm
+from applications.admission import admission
 
 class QuestionAPI(Resource):
     @jwt_required()
+    @admission.limit("browse")
     def get(self):
         try:
             try:
@@ -31,30 +39,13 @@ class QuestionAPI(Resource):
                 if cached_data is not None:
                     return make_response(jsonify(cached_data), 200)
 
-            questions = Question.query.filter_by(quiz_id=quiz_id).all()
+            question_data = questions_payload(quiz_id)
 
-            if not questions:
+            if not question_data:
                 return make_response(jsonify([]), 200)
 
-            question_data = [
-                {
-                    "id": question.id,
-                    "quiz_id": question.quiz_id,
-                    "q_no": question.q_no,
-                    "title": question.title,
-                    "question_statement": question.question_statement,
-                    "options": [
-                        question.option1,
-                        question.option2,
-                        question.option3,
-                        question.option4
-                    ],
-                    "correct_option": question.correct_option
-                } for question in questions
-            ]
-
             if current_user.get('role') != 'admin':
-                cache.set(cache_key, question_data, timeout=120)
+                cache.set(cache_key, question_data, timeout=QUESTIONS_TIMEOUT)
 
             return make_response(jsonify(question_data), 200)
 
@@ -103,7 +94,8 @@ class QuestionAPI(Resource):
             option2=options[1],
             option3=options[2],
             option4=options[3],
-            correct_option=correct_option
+            correct_option=correct_option,
+            answer_slot=next_answer_slot(quiz_id)
         )
 
         db.session.add(question)
@@ -117,6 +109,8 @@ class QuestionAPI(Resource):
             chapter.n_questions += 1
         
         db.session.commit()
+        invalidate_quiz_content(quiz_id)
+        schedule_cache_warm()
         return make_response(jsonify({"message": "Question Created Successfully"}), 201)
 
     
@@ -162,6 +156,8 @@ class QuestionAPI(Resource):
         question.correct_option = correct_option
 
         db.session.commit()
+        invalidate_quiz_content(question.quiz_id)
+        schedule_cache_warm()
         return make_response(jsonify({"message": "Question Updated Successfully"}), 200)
 
     @jwt_required()
@@ -184,4 +180,54 @@ class QuestionAPI(Resource):
             chapter.n_questions -= 1
 
         db.session.commit()
+        invalidate_quiz_content(question.quiz_id)
+        schedule_cache_warm()
         return make_response(jsonify({"message": "Question Deleted Successfully"}), 200)
+
+
+class QuestionImportAPI(Resource):
+    @jwt_required()
+    def post(self):
+        """Bulk-create questions from a CSV or NDJSON upload (raw body or multipart ``file``).
+
+        Columns/keys: quiz_id, q_no (optional), title, question_statement,
+        option1..option4, correct_option (1-4). By default any invalid row rejects
+        the whole import; ``?on_error=skip`` imports the valid rows, and
+        ``?dry_run=1`` only validates.
+        """
+        current_user = json.loads(get_jwt_identity())
+        if current_user.get('role') != 'admin':
+            return make_response(jsonify({"error": "Access Denied"}), 403)
+
+        upload = request.files.get('file')
+        stream = upload.stream if upload else request.stream
+        name = (upload.filename or '') if upload else ''
+        content_type = (upload.mimetype if upload else request.mimetype) or ''
+        fmt = request.args.get('format')
+        if not fmt:
+            if name.endswith('.csv') or content_type in ('text/csv', 'application/csv'):
+                fmt = 'csv'
+            elif name.endswith(('.ndjson', '.jsonl')) or content_type in ('application/x-ndjson', 'application/jsonl'):
+                fmt = 'ndjson'
+        if fmt not in ('csv', 'ndjson'):
+            return make_response(jsonify({"error": "Upload CSV or NDJSON (set Content-Type or ?format=csv|ndjson)"}), 400)
+        on_error = request.args.get('on_error', 'abort')
+        if on_error not in ('abort', 'skip'):
+            return make_response(jsonify({"error": "on_error must be 'abort' or 'skip'"}), 400)
+
+        importer = QuestionImport(skip_invalid=on_error == 'skip',
+                                  dry_run=request.args.get('dry_run') in ('1', 'true'))
+        try:
+            summary = importer.run(iter_rows(stream, fmt))
+        except UnicodeDecodeError:
+            db.session.rollback()
+            return make_response(jsonify({"error": "Upload must be UTF-8 encoded"}), 400)
+        except csv.Error as e:
+            db.session.rollback()
+            return make_response(jsonify({"error": f"Malformed CSV: {e}"}), 400)
+
+        if summary["invalid"] and on_error == 'abort':
+            return make_response(jsonify(summary), 422)
+        if summary["imported"]:
+            schedule_cache_warm()
+        return make_response(jsonify(summary), 200 if summary["dry_run"] else 201)
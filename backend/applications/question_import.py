@@ -0,0 +1,174 @@
+"""Bulk question import from CSV or NDJSON, parsed as a stream.
+
+Rows are validated one at a time and inserted with executemany in chunks of
+``IMPORT_CHUNK`` inside a single transaction. Quiz/chapter counters are bumped
+once per affected quiz and chapter, and the question/bundle caches of each
+affected quiz are deleted once, after the commit.
+"""
+import csv
+import io
+import json
+
+from sqlalchemy import bindparam, func
+
+from applications.model import db, Question, Quiz, Chapter
+from applications.quiz_bundle import invalidate_quiz_content
+
+IMPORT_CHUNK = 500
+MAX_REPORTED_ERRORS = 200
+OPTION_FIELDS = ("option1", "option2", "option3", "option4")
+TEXT_LIMITS = {"title": 50, "option1": 50, "option2": 50, "option3": 50, "option4": 50}
+
+
+def iter_rows(stream, fmt):
+    """Yield ``(row_number, dict or error string)`` from a binary stream without reading it whole."""
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    if fmt == "csv":
+        reader = csv.DictReader(text)
+        for row in reader:
+            # row 1 is the header, so data rows are numbered like a spreadsheet
+            yield reader.line_num, row
+        return
+    for number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield number, f"invalid JSON: {e.msg}"
+            continue
+        yield number, row if isinstance(row, dict) else "each line must be a JSON object"
+
+
+def _as_int(value):
+    if isinstance(value, bool):
+        return None
+    try:
+        return int(str(value).strip())
+    except (TypeError, ValueError):
+        return None
+
+
+def validate_row(row):
+    """Return ``(values, errors)`` for one parsed row."""
+    if isinstance(row, str):
+        return None, [row]
+    errors = []
+    quiz_id = _as_int(row.get("quiz_id"))
+    if quiz_id is None:
+        errors.append("quiz_id must be an integer")
+    q_no = row.get("q_no")
+    if q_no not in (None, ""):
+        q_no = _as_int(q_no)
+        if q_no is None or q_no < 1:
+            errors.append("q_no must be a positive integer")
+    else:
+        q_no = None
+    values = {"quiz_id": quiz_id, "q_no": q_no}
+    for field in ("title", "question_statement") + OPTION_FIELDS:
+        value = str(row.get(field) or "").strip()
+        if not value:
+            errors.append(f"{field} is required")
+        elif field in TEXT_LIMITS and len(value) > TEXT_LIMITS[field]:
+            errors.append(f"{field} is longer than {TEXT_LIMITS[field]} characters")
+        values[field] = value
+    correct_option = _as_int(row.get("correct_option"))
+    if correct_option not in (1, 2, 3, 4):
+        errors.append("correct_option must be 1, 2, 3, or 4")
+    values["correct_option"] = correct_option
+    return values, errors
+
+
+class QuestionImport:
+    """One import run; ``run`` consumes the rows and returns the summary."""
+
+    def __init__(self, skip_invalid=False, dry_run=False):
+        self.skip_invalid = skip_invalid
+        self.dry_run = dry_run
+        self.quizzes = {}       # quiz_id -> chapter_id, or None when the quiz does not exist
+        self.next_slot = {}     # quiz_id -> next free answer_slot
+        self.next_q_no = {}     # quiz_id -> next q_no for rows that leave it out
+        self.added = {}         # quiz_id -> questions inserted
+        self.errors = []
+        self.invalid = 0
+        self.total = 0
+
+    def _quiz_chapter(self, quiz_id):
+        if quiz_id not in self.quizzes:
+            quiz = db.session.query(Quiz.id, Quiz.chapter_id).filter(Quiz.id == quiz_id).first()
+            self.quizzes[quiz_id] = quiz.chapter_id if quiz else None
+            if quiz:
+                current = db.session.query(func.max(Question.answer_slot), func.max(Question.q_no)).filter(
+                    Question.quiz_id == quiz_id).one()
+                self.next_slot[quiz_id] = 0 if current[0] is None else current[0] + 1
+                self.next_q_no[quiz_id] = (current[1] or 0) + 1
+        return self.quizzes[quiz_id]
+
+    def _reject(self, number, errors):
+        self.invalid += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": number, "errors": errors})
+
+    def run(self, rows):
+        pending = []
+        for number, row in rows:
+            self.total += 1
+            values, errors = validate_row(row)
+            if not errors and self._quiz_chapter(values["quiz_id"]) is None:
+                errors = [f"quiz {values['quiz_id']} does not exist"]
+            if errors:
+                self._reject(number, errors)
+                continue
+            if self.invalid and not self.skip_invalid:
+                continue  # the import will be rejected; keep validating without inserting
+            quiz_id = values["quiz_id"]
+            values["answer_slot"] = self.next_slot[quiz_id]
+            self.next_slot[quiz_id] += 1
+            if values["q_no"] is None:
+                values["q_no"] = self.next_q_no[quiz_id]
+            self.next_q_no[quiz_id] = max(self.next_q_no[quiz_id], values["q_no"]) + 1
+            self.added[quiz_id] = self.added.get(quiz_id, 0) + 1
+            pending.append(values)
+            if len(pending) >= IMPORT_CHUNK:
+                self._flush(pending)
+                pending = []
+        self._flush(pending)
+
+        rejected = self.invalid and not self.skip_invalid
+        if rejected or self.dry_run:
+            db.session.rollback()
+        elif self.added:
+            self._update_counters()
+            db.session.commit()
+            invalidate_quiz_content(*self.added)
+        imported = 0 if rejected or self.dry_run else sum(self.added.values())
+        return {
+            "rows": self.total,
+            "imported": imported,
+            "invalid": self.invalid,
+            "quizzes": sorted(self.added) if imported else [],
+            "errors": self.errors,
+            "errors_truncated": self.invalid > len(self.errors),
+            "dry_run": self.dry_run,
+        }
+
+    def _flush(self, pending):
+        if pending and not self.dry_run and not (self.invalid and not self.skip_invalid):
+            db.session.execute(Question.__table__.insert(), pending)
+
+    def _update_counters(self):
+        per_chapter = {}
+        for quiz_id, added in self.added.items():
+            chapter_id = self.quizzes[quiz_id]
+            per_chapter[chapter_id] = per_chapter.get(chapter_id, 0) + added
+        quizzes, chapters = Quiz.__table__, Chapter.__table__
+        db.session.execute(
+            quizzes.update().where(quizzes.c.id == bindparam("quiz_id"))
+            .values(num_questions=quizzes.c.num_questions + bindparam("added")),
+            [{"quiz_id": q, "added": n} for q, n in self.added.items()],
+        )
+        db.session.execute(
+            chapters.update().where(chapters.c.id == bindparam("chapter_id"))
+            .values(n_questions=chapters.c.n_questions + bindparam("added")),
+            [{"chapter_id": c, "added": n} for c, n in per_chapter.items()],
+        )
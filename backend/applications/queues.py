@@ -0,0 +1,61 @@
+"""Celery queue topology: which queue each task goes to and how each worker consumes.
+
+Kept free of app imports so tools (benchmarks/celery_queues.py) can start workers
+with exactly the production routing.
+"""
+from kombu import Queue
+
+# Time-sensitive mail must not wait behind a monthly report run, so every kind of work gets
+# its own queue and workers are started per queue (see WORKER_PROFILES and celery_app.py).
+QUEUES = ("reminders", "reports", "ingestion", "maintenance")
+DEFAULT_QUEUE = "maintenance"
+# priority orders messages within a queue (Redis: 0 is served first)
+TASK_ROUTES = {
+    "applications.task.send_daily_reminder": {"queue": "reminders"},
+    "applications.task.send_email_reminder": {"queue": "reminders"},
+    "applications.task.send_monthly_report": {"queue": "reports"},
+    "applications.task.build_report": {"queue": "reports"},
+    "applications.task.finalize_expired_attempts": {"queue": "ingestion", "priority": 0},
+    "applications.task.warm_caches": {"queue": "ingestion", "priority": 3},
+    "applications.task.refresh_submission_snapshot": {"queue": "ingestion", "priority": 6},
+    "applications.task.rebuild_leaderboards": {"queue": "maintenance"},
+    "applications.task.compact_submission_rollups": {"queue": "maintenance"},
+    "applications.task.archive_old_submissions": {"queue": "maintenance"},
+    "applications.task.delete_catalog_target": {"queue": "maintenance"},
+}
+# Selected with CELERY_WORKER_PROFILE. Mail sending is I/O bound and short, so reminders get
+# several processes that may each hold a few messages; long tasks take one message at a time
+# so a busy process doesn't sit on work another one could start.
+WORKER_PROFILES = {
+    "reminders": {"queues": ("reminders",), "concurrency": 4, "prefetch_multiplier": 4},
+    "reports": {"queues": ("reports",), "concurrency": 1, "prefetch_multiplier": 1},
+    "ingestion": {"queues": ("ingestion",), "concurrency": 2, "prefetch_multiplier": 1},
+    "maintenance": {"queues": ("maintenance",), "concurrency": 1, "prefetch_multiplier": 1},
+    # single worker for development: everything, one process per CPU
+    "all": {"queues": QUEUES, "concurrency": None, "prefetch_multiplier": 1},
+}
+# tasks that send one email per execution, so a Celery rate limit paces the messages.
+# send_monthly_report is exempt: it is one execution a month that mails every active
+# user itself, batch by batch over one SMTP session each, so a per-task rate limit
+# would only delay its single start and never throttle the messages inside it.
+MAIL_TASKS = ("applications.task.send_email_reminder",)
+
+
+def celery_settings(profile_name=None, mail_rate_limit=None):
+    """Celery config for a process running ``profile_name`` (``None``: every queue, e.g. the web app)."""
+    profile = WORKER_PROFILES[profile_name or "all"]
+    settings = {
+        # consumed by a worker started without -Q; publishing to the other queues still works
+        "task_queues": [Queue(name) for name in profile["queues"]],
+        "task_default_queue": DEFAULT_QUEUE,
+        "task_routes": TASK_ROUTES,
+        # nothing reads task return values; tasks that need one opt in with ignore_result=False
+        "task_ignore_result": True,
+        "worker_prefetch_multiplier": profile["prefetch_multiplier"],
+    }
+    if mail_rate_limit:
+        # enforced per worker, so run one reminders worker per SMTP account
+        settings["task_annotations"] = {name: {"rate_limit": mail_rate_limit} for name in MAIL_TASKS}
+    if profile["concurrency"]:
+        settings["worker_concurrency"] = profile["concurrency"]
+    return settings
@@ -1,12 +1,41 @@
 from flask import request, jsonify, make_response, current_app
 from flask_restful import Resource
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from applications.model import db, Quiz, Chapter, QuizSubmission, Question
+from applications.model import db, Quiz, Chapter, QuizSubmission, ArchivedSubmission, Question, User
+from applications.leaderboard import leaderboard
+from applications.answer_storage import quiz_slots, submission_answers
+from applications.admission import admission
+from applications.attempts import attempts, is_timed, valid_option
+from applications.submissions import store_submission
+from applications.quiz_bundle import get_bundle, invalidate_quiz_content
+from applications.cache_warmer import schedule_cache_warm
+from applications.catalog_delete import delete_or_schedule
+from applications.user_report_cache import cached_user_report
+import gzip
 import json
 from datetime import datetime
+from redis.exceptions import RedisError
+
+BUNDLE_MAX_AGE = 60
+
+
+def _submitted_answers(answers):
+    """``[{"question_id": int, "selected_option": 0-3 or null}]`` -> ``{int: int or None}``; None if malformed."""
+    if not isinstance(answers, list):
+        return None
+    parsed = {}
+    for answer in answers:
+        if not isinstance(answer, dict) or type(answer.get('question_id')) is not int:
+            return None
+        if not valid_option(answer.get('selected_option')):
+            return None
+        parsed[answer['question_id']] = answer.get('selected_option')
+    return parsed
+
 
 class QuizAPI(Resource):
     @jwt_required()
+    @admission.limit("browse")
     def get(self, quiz_id=None):
         try:
             if quiz_id:
@@ -102,6 +131,7 @@ class QuizAPI(Resource):
             chapter.n_quizzes += 1
 
         db.session.commit()
+        schedule_cache_warm()
         return make_response(jsonify({
             "message": "Quiz Created Successfully",
             "created_at": quiz.created_at.isoformat() if quiz.created_at else None
@@ -149,6 +179,8 @@ class QuizAPI(Resource):
         quiz.remarks = data.get('remarks', quiz.remarks)
 
         db.session.commit()
+        invalidate_quiz_content(quiz_id)
+        schedule_cache_warm()
         return make_response(jsonify({"message": "Quiz Updated Successfully"}), 200)
 
     @jwt_required()
@@ -161,12 +193,9 @@ class QuizAPI(Resource):
         if not quiz:
             return make_response(jsonify({"error": "Quiz not found"}), 404)
 
-        db.session.delete(quiz)
-        chapter = Chapter.query.get(quiz.chapter_id)
-        if chapter and chapter.n_quizzes > 0:
-            chapter.n_quizzes -= 1
-            chapter.n_questions = 0
-        db.session.commit()
+        job = delete_or_schedule("quiz", quiz.id, current_user.get('id'))
+        if job:
+            return make_response(jsonify({"message": "Quiz deletion started", "job": job}), 202)
         return make_response(jsonify({"message": "Quiz Deleted Successfully"}), 200)
 
     @staticmethod
@@ -178,8 +207,36 @@ class QuizAPI(Resource):
             return False
 
 
+def submission_history(quiz_id, user_id=None):
+    """Submissions of a quiz (one user's, or everyone's) with decoded answers, oldest first."""
+    submissions = []
+    # archived rows keep their packed/compressed answers, so they can still be reviewed
+    for model in (ArchivedSubmission, QuizSubmission):
+        query = model.query.filter_by(quiz_id=quiz_id)
+        if user_id is not None:
+            query = query.filter_by(user_id=user_id)
+        submissions.extend(query.order_by(model.id).all())
+    if not submissions:
+        return []
+    slot_questions = {slot: qid for qid, slot in quiz_slots(quiz_id).items()}
+    return [
+        {
+            "id": sub.id,
+            "quiz_id": sub.quiz_id,
+            "user_id": sub.user_id,
+            "score": sub.score,
+            "total_questions": sub.total_questions,
+            "submitted_at": sub.submitted_at.isoformat(),
+            "answers": submission_answers(sub, slot_questions),
+            "archived": isinstance(sub, ArchivedSubmission)
+        }
+        for sub in submissions
+    ]
+
+
 class SubmitQuizAPI(Resource):
     @jwt_required()
+    @admission.limit("browse")
     def get(self):
         try:
             try:
@@ -196,27 +253,12 @@ class SubmitQuizAPI(Resource):
             except ValueError:
                 return make_response(jsonify({"error": "Invalid quiz_id parameter"}), 400)
 
-            query = QuizSubmission.query.filter_by(quiz_id=quiz_id)
-            if current_user.get('role') != 'admin':
-                query = query.filter_by(user_id=current_user.get('id'))
-
-            submissions = query.all()
-
-            if not submissions:
-                submission_data = []  
+            if current_user.get('role') == 'admin':
+                submission_data = submission_history(quiz_id)
             else:
-                submission_data = [
-                    {
-                        "id": sub.id,
-                        "quiz_id": sub.quiz_id,
-                        "user_id": sub.user_id,
-                        "score": sub.score,
-                        "total_questions": sub.total_questions,
-                        "submitted_at": sub.submitted_at.isoformat(),
-                        "answers": sub.answers
-                    }
-                    for sub in submissions
-                ]
+                user_id = current_user.get('id')
+                submission_data = cached_user_report(user_id, "submissions", quiz_id,
+                                                     lambda: submission_history(quiz_id, user_id))
 
             return make_response(jsonify(submission_data), 200)
 
@@ -229,6 +271,7 @@ class SubmitQuizAPI(Resource):
             return make_response(jsonify({"error": error_message}), 500)
 
     @jwt_required()
+    @admission.limit("submit")
     def post(self):
         try:
             data = request.get_json()
@@ -247,39 +290,39 @@ class SubmitQuizAPI(Resource):
             if not quiz:
                 return {'error': 'Quiz not found'}, 404
 
-            questions = {q.id: q for q in quiz.questions}
-
-            score = 0
-            valid_submissions = []
-            for answer in data.get('answers', []):
-                question = questions.get(answer.get('question_id'))
-                if not question:
-                    continue
-                is_correct = answer.get('selected_option') == (question.correct_option - 1)
-                if is_correct:
-                    score += 1
-                
-                valid_submissions.append({
-                    'question_id': question.id,
-                    'selected_option': answer.get('selected_option'),
-                    'is_correct': is_correct
-                })
+            final = _submitted_answers(data.get('answers', []))
+            if final is None:
+                return {'error': 'answers must be a list of question ids with an option 0-3 or null'}, 400
 
-            submission = QuizSubmission(
-                user_id=user_id,
-                quiz_id=quiz.id,
-                score=score,
-                total_questions=len(questions),
-                answers=valid_submissions,
-                submitted_at=datetime.now()
-            )
-            db.session.add(submission)
-            db.session.commit()
+            if not is_timed(quiz):
+                _, score, total = store_submission(quiz, user_id, data.get('answers', []))
+                try:
+                    # an attempt left over from when the quiz had a time limit would be swept
+                    # into a second, empty submission
+                    attempts.discard(quiz.id, user_id)
+                except RedisError as e:
+                    current_app.logger.error(f'Stale attempt not discarded for quiz {quiz.id}: {str(e)}')
+            else:
+                # the deadline only exists in the attempt: without one (or without Redis to read it)
+                # a timed quiz is rejected rather than graded untimed
+                try:
+                    if attempts.get(quiz.id, user_id) is None:
+                        return {'error': 'Start the quiz attempt before submitting'}, 409
+                    # these answers are the attempt's last save, subject to the deadline,
+                    # and the attempt's saved answers are what gets graded
+                    attempts.save(quiz.id, user_id, final)
+                    result = attempts.finish(quiz.id, user_id)
+                except RedisError as e:
+                    current_app.logger.error(f'Attempt store unavailable: {str(e)}')
+                    return {'error': 'Timed quizzes are temporarily unavailable, please retry'}, 503
+                if result is None:
+                    return {'error': 'Attempt is already being submitted'}, 409
+                _, score, total = result
 
             return {
                 'message': 'Quiz submitted successfully',
                 'score': score,
-                'total': len(questions)
+                'total': total
             }, 200
 
         except Exception as e:
@@ -287,8 +330,53 @@ class SubmitQuizAPI(Resource):
             current_app.logger.error(f'Error: {str(e)}')
             return {'error': 'Submission failed'}, 500
 
+class QuizLeaderboardAPI(Resource):
+    @jwt_required()
+    @admission.limit("browse")
+    def get(self, quiz_id):
+        try:
+            current_user = json.loads(get_jwt_identity() or "{}")
+        except json.JSONDecodeError:
+            return make_response(jsonify({"error": "Invalid JWT token"}), 401)
+
+        try:
+            k = min(max(int(request.args.get('k', 10)), 1), 100)
+            window = min(max(int(request.args.get('window', 2)), 0), 25)
+        except ValueError:
+            return make_response(jsonify({"error": "k and window must be integers"}), 400)
+
+        if not Quiz.query.get(quiz_id):
+            return make_response(jsonify({"error": "Quiz not found"}), 404)
+
+        try:
+            top = leaderboard.top(quiz_id, k)
+            me, around_me = None, []
+            if current_user.get('role') != 'admin' and current_user.get('id'):
+                me = leaderboard.standing(quiz_id, current_user['id'])
+                around_me = leaderboard.around(quiz_id, current_user['id'], window)
+
+            user_ids = {row["user_id"] for row in top + around_me}
+            names = dict(
+                db.session.query(User.id, User.full_name).filter(User.id.in_(user_ids)).all()
+            ) if user_ids else {}
+            for row in top + around_me:
+                row["full_name"] = names.get(row["user_id"], "Unknown")
+
+            return make_response(jsonify({
+                "quiz_id": quiz_id,
+                "participants": leaderboard.backend.size(quiz_id),
+                "top": top,
+                "me": me,
+                "around_me": around_me
+            }), 200)
+        except Exception as e:
+            current_app.logger.error(f'Leaderboard error: {str(e)}')
+            return make_response(jsonify({"error": "Failed to fetch leaderboard"}), 500)
+
+
 class QuizQuestionsAPI(Resource):
     @jwt_required()
+    @admission.limit("browse")
     def get(self):
         try:
             quiz_id = request.args.get('quiz_id')
@@ -325,3 +413,38 @@ class QuizQuestionsAPI(Resource):
             print("Error fetching quiz questions:", error_message)
             print(traceback.format_exc())
             return make_response(jsonify({"error": error_message}), 500)
+
+
+class QuizBundleAPI(Resource):
+    @jwt_required()
+    @admission.limit("browse")
+    def get(self, quiz_id):
+        """Quiz metadata and questions without answer keys, in one cacheable response.
+
+        ``?v=<version>`` (the version in the body and ETag) is immutable and cached
+        for a year; the unversioned URL is revalidated after a short max-age.
+        """
+        bundle = get_bundle(quiz_id)
+        if bundle is None:
+            return make_response(jsonify({"error": "Quiz not found"}), 404)
+
+        version = bundle["version"]
+        if request.args.get('v') == version:
+            cache_control = "public, max-age=31536000, immutable"
+        else:
+            cache_control = f"public, max-age={BUNDLE_MAX_AGE}"
+        headers = {
+            "ETag": f'"{version}"',
+            "Cache-Control": cache_control,
+            "Vary": "Accept-Encoding",
+            "Content-Location": f"/api/quiz/{quiz_id}/bundle?v={version}",
+        }
+        if request.if_none_match.contains(version):
+            return current_app.response_class(status=304, headers=headers)
+
+        if "gzip" in request.accept_encodings:
+            body = bundle["gzip"]
+            headers["Content-Encoding"] = "gzip"
+        else:
+            body = gzip.decompress(bundle["gzip"])
+        return current_app.response_class(body, status=200, headers=headers, mimetype="application/json")
@@ -0,0 +1,76 @@
+"""Quiz delivery bundle: quiz metadata plus questions, without answer keys.
+
+The bundle is serialized and gzipped once and cached as bytes under
+``quiz_bundle_<quiz_id>``. Its version is a hash of the serialized content, so
+it changes exactly when the quiz or one of its questions changes, and the
+versioned URL can be cached by browsers and shared caches indefinitely. Every
+write path that edits a quiz or its questions calls ``invalidate_quiz_content``.
+"""
+import gzip
+import hashlib
+import json
+
+from applications.extensions import cache
+from applications.model import Quiz, Question
+
+BUNDLE_TIMEOUT = 24 * 3600
+
+
+def bundle_key(quiz_id):
+    return f"quiz_bundle_{quiz_id}"
+
+
+def build_bundle(quiz_id):
+    quiz = Quiz.query.get(quiz_id)
+    if quiz is None:
+        return None
+    return bundle_for(quiz, Question.query.filter_by(quiz_id=quiz_id).all())
+
+
+def bundle_for(quiz, questions):
+    """Bundle of ``quiz`` from its already loaded questions (in any order)."""
+    questions = sorted(questions, key=lambda question: (question.q_no, question.id))
+    payload = {
+        "quiz": {
+            "id": quiz.id,
+            "title": quiz.title,
+            "chapter_id": quiz.chapter_id,
+            "num_questions": quiz.num_questions,
+            "date_of_quiz": quiz.date_of_quiz.isoformat(),
+            "last_date": quiz.last_date.isoformat(),
+            "time_duration": quiz.time_duration,
+            "remarks": quiz.remarks,
+        },
+        "questions": [
+            {
+                "id": question.id,
+                "q_no": question.q_no,
+                "title": question.title,
+                "question_statement": question.question_statement,
+                "options": [question.option1, question.option2, question.option3, question.option4],
+            }
+            for question in questions
+        ],
+    }
+    body = json.dumps(payload, separators=(",", ":"), sort_keys=True).encode()
+    version = hashlib.sha256(body).hexdigest()[:16]
+    # the version goes into the body after hashing so clients can build the versioned URL
+    body = body[:-1] + b',"version":"' + version.encode() + b'"}'
+    return {"version": version, "gzip": gzip.compress(body, compresslevel=6), "size": len(body)}
+
+
+def get_bundle(quiz_id):
+    """Cached bundle dict ``{version, gzip, size}``, or None when the quiz does not exist."""
+    bundle = cache.get(bundle_key(quiz_id))
+    if bundle is None:
+        bundle = build_bundle(quiz_id)
+        if bundle is not None:
+            cache.set(bundle_key(quiz_id), bundle, timeout=BUNDLE_TIMEOUT)
+    return bundle
+
+
+def invalidate_quiz_content(*quiz_ids):
+    """Drop the question list and bundle caches of the given quizzes in one round trip."""
+    keys = [key for quiz_id in set(quiz_ids) if quiz_id
+            for key in (f"questions_{quiz_id}", bundle_key(quiz_id))]
+    cache.delete_keys(*keys)
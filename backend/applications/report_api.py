@@ -1,13 +1,32 @@
-from flask import jsonify, make_response, current_app
+from flask import jsonify, make_response, current_app, request
+import gzip
 from flask_restful import Resource
 from flask_jwt_extended import jwt_required, get_jwt_identity
 import json
-from datetime import datetime
+from datetime import datetime, timedelta
+from sqlalchemy import func
 from applications.model import db, User, Quiz, QuizSubmission
+from applications.archive import totals as archive_totals
+from applications.item_analytics import quiz_item_analytics
+from applications.rollups import submission_counts, quizzes_with_submissions, time_series, GRANULARITIES
+from applications.snapshot import aggregate, GROUPINGS
+from applications.reports import my_reports, user_details, quiz_data
+from applications.user_report_cache import cached_user_report
+from applications.report_jobs import REPORTS, create_job, get_job, load_artifact
+from applications.dashboard import admin_dashboard
+from applications.admission import admission
+
+
+def _date_range():
+    """Optional ``from``/``to`` ISO dates of a report; raises ValueError when malformed."""
+    start = datetime.fromisoformat(request.args["from"]) if request.args.get("from") else None
+    end = datetime.fromisoformat(request.args["to"]) if request.args.get("to") else None
+    return start, end
 
 
 class MyReportsAPI(Resource):
     @jwt_required()
+    @admission.limit("browse")
     def get(self):
         try:
             try:
@@ -18,24 +37,13 @@ class MyReportsAPI(Resource):
             user_id = current_user.get("id")
             if not user_id:
                 return make_response(jsonify({"error": "Invalid user"}), 401)
-            
+            try:
+                start, end = _date_range()
+            except ValueError:
+                return make_response(jsonify({"error": "from/to must be ISO dates"}), 400)
 
-            submissions = QuizSubmission.query.filter_by(user_id=user_id).all()
-            reports = []
-            for sub in submissions:
-                quiz = Quiz.query.get(sub.quiz_id)
-                chapter = quiz.chapter if quiz and hasattr(quiz, "chapter") else None
-                subject = chapter.subject if chapter and hasattr(chapter, "subject") else None
-                reports.append({
-                    "submission_id": sub.id,
-                    "quiz_id": sub.quiz_id,
-                    "quiz_title": quiz.title if quiz else "Unknown",
-                    "subject_name": subject.name if subject else "Unknown",
-                    "chapter_name": chapter.name if chapter else "Unknown",
-                    "submitted_at": sub.submitted_at.isoformat(),
-                    "score": sub.score,
-                    "total_questions": sub.total_questions
-                })
+            reports = cached_user_report(user_id, "my-reports", [request.args.get("from"), request.args.get("to")],
+                                         lambda: my_reports(user_id, start, end))
             return make_response(jsonify(reports), 200)
         except Exception as e:
             current_app.logger.error(str(e))
@@ -44,6 +52,7 @@ class MyReportsAPI(Resource):
 
 class AdminStatsAPI(Resource):
     @jwt_required()
+    @admission.limit("browse")
     def get(self):
         try:
             try:
@@ -55,10 +64,13 @@ class AdminStatsAPI(Resource):
             
             total_users = User.query.count()
             total_quizzes = Quiz.query.count()
-            total_submissions = QuizSubmission.query.count()
-            submissions = QuizSubmission.query.all()
-            if submissions:
-                average_score = sum(sub.score for sub in submissions) / len(submissions)
+            hot_count, hot_sum = db.session.query(
+                func.count(QuizSubmission.id), func.coalesce(func.sum(QuizSubmission.score), 0)
+            ).one()
+            archived_count, archived_sum = archive_totals()
+            total_submissions = hot_count + archived_count
+            if total_submissions:
+                average_score = (hot_sum + archived_sum) / total_submissions
             else:
                 average_score = 0
             stats = {
@@ -73,8 +85,27 @@ class AdminStatsAPI(Resource):
             return make_response(jsonify({"error": "Failed to fetch admin stats"}), 500)
 
 
+class AdminDashboardAPI(Resource):
+    @jwt_required()
+    @admission.limit("browse")
+    def get(self):
+        """Admin stats, per-quiz submission counts and quiz completion from one consistent read."""
+        try:
+            try:
+                current_user = json.loads(get_jwt_identity() or "{}")
+            except json.JSONDecodeError:
+                return make_response(jsonify({"error": "Invalid JWT token"}), 401)
+            if current_user.get("role") != "admin":
+                return make_response(jsonify({"error": "Unauthorized"}), 403)
+            return make_response(jsonify(admin_dashboard()), 200)
+        except Exception as e:
+            current_app.logger.error(str(e))
+            return make_response(jsonify({"error": "Failed to fetch admin dashboard"}), 500)
+
+
 class SubmissionCountsAPI(Resource):
     @jwt_required()
+    @admission.limit("browse")
     def get(self):
         try:
             try:
@@ -83,12 +114,7 @@ class SubmissionCountsAPI(Resource):
                 return make_response(jsonify({"error": "Invalid JWT token"}), 401)
             if current_user.get("role") != "admin":
                 return make_response(jsonify({"error": "Unauthorized"}), 403)
-            from sqlalchemy import func
-            results = db.session.query(
-                Quiz.title,
-                func.count(QuizSubmission.id).label("count")
-            ).join(QuizSubmission, Quiz.id == QuizSubmission.quiz_id
-            ).group_by(Quiz.id).all()
+            results = submission_counts()
             counts = [{"quiz_title": title, "count": count} for title, count in results]
             return make_response(jsonify(counts), 200)
         except Exception as e:
@@ -97,6 +123,7 @@ class SubmissionCountsAPI(Resource):
 
 class QuizCompletionAPI(Resource):
     @jwt_required()
+    @admission.limit("browse")
     def get(self):
         try:
             try:
@@ -108,13 +135,7 @@ class QuizCompletionAPI(Resource):
             
             now = datetime.now()
             total_quizzes = Quiz.query.filter(Quiz.date_of_quiz <= now).count()
-            quizzes_with_submission = (
-                db.session.query(QuizSubmission.quiz_id)
-                .join(Quiz, QuizSubmission.quiz_id == Quiz.id)
-                .filter(Quiz.date_of_quiz <= now)
-                .distinct()
-                .count()
-            )
+            quizzes_with_submission = quizzes_with_submissions(now)
             quizzes_without_submission = total_quizzes - quizzes_with_submission
 
             data = {
@@ -130,8 +151,47 @@ class QuizCompletionAPI(Resource):
             return make_response(jsonify({"error": "Failed to fetch quiz completion data"}), 500)
 
 
+class SubmissionTimeSeriesAPI(Resource):
+    @jwt_required()
+    @admission.limit("browse")
+    def get(self):
+        try:
+            try:
+                current_user = json.loads(get_jwt_identity() or "{}")
+            except json.JSONDecodeError:
+                return make_response(jsonify({"error": "Invalid JWT token"}), 401)
+            if current_user.get("role") != "admin":
+                return make_response(jsonify({"error": "Unauthorized"}), 403)
+
+            granularity = request.args.get("granularity", "day")
+            if granularity not in GRANULARITIES:
+                return make_response(jsonify({"error": "granularity must be 'hour' or 'day'"}), 400)
+            now = datetime.now()
+            default_span = timedelta(days=2) if granularity == "hour" else timedelta(days=30)
+            try:
+                end = datetime.fromisoformat(request.args["to"]) if request.args.get("to") else now
+                start = datetime.fromisoformat(request.args["from"]) if request.args.get("from") else end - default_span
+                quiz_id = int(request.args["quiz_id"]) if request.args.get("quiz_id") else None
+            except ValueError:
+                return make_response(jsonify({"error": "from/to must be ISO dates and quiz_id an integer"}), 400)
+            if start >= end:
+                return make_response(jsonify({"error": "'from' must be before 'to'"}), 400)
+
+            return make_response(jsonify({
+                "granularity": granularity,
+                "from": start.isoformat(),
+                "to": end.isoformat(),
+                "quiz_id": quiz_id,
+                "series": time_series(start, end, granularity, quiz_id)
+            }), 200)
+        except Exception as e:
+            current_app.logger.error(str(e))
+            return make_response(jsonify({"error": "Failed to fetch submission time series"}), 500)
+
+
 class AdminUserDetailsAPI(Resource):
     @jwt_required()
+    @admission.limit("browse")
     def get(self):
         try:
             try:
@@ -141,77 +201,18 @@ class AdminUserDetailsAPI(Resource):
             if current_user.get("role") != "admin":
                 return make_response(jsonify({"error": "Unauthorized"}), 403)
 
-            submissions = QuizSubmission.query.all()
-            details = []
-            for sub in submissions:
-                quiz = Quiz.query.get(sub.quiz_id)
-                if quiz:
-                    chapter = quiz.chapter
-                    subject = chapter.subject if chapter else None
-                    details.append({
-                        "user_id": sub.user_id,
-                        "quiz_id": sub.quiz_id,
-                        "quiz_title": quiz.title,
-                        "subject_name": subject.name if subject else "Unknown",
-                        "chapter_name": chapter.name if chapter else "Unknown",
-                        "score": sub.score,
-                        "total_questions": sub.total_questions,
-                        "submitted_at": sub.submitted_at.isoformat()
-                    })
-            grouped = {}
-            for d in details:
-                uid = d["user_id"]
-                if uid not in grouped:
-                    user = User.query.get(uid)
-                    if not user:
-                        continue
-                    grouped[uid] = {
-                        "user_name": user.full_name,
-                        "email": user.email,
-                        "details": []
-                    }
-                grouped[uid]["details"].append(d)
-            user_details = []
-            for uid, data in grouped.items():
-                user_name = data["user_name"]
-                email = data["email"]
-                user_rows = []
-                overall_total = 0
-                overall_count = 0
-                subject_groups = {}
-                for detail in data["details"]:
-                    subj = detail["subject_name"]
-                    if subj not in subject_groups:
-                        subject_groups[subj] = []
-                    subject_groups[subj].append(detail)
-                    overall_total += detail["score"]
-                    overall_count += 1
-                overall_avg = round(overall_total / overall_count, 2) if overall_count else 0
-                for detail in data["details"]:
-                    subj = detail["subject_name"]
-                    group = subject_groups[subj]
-                    subj_total = sum(item["score"] for item in group)
-                    subj_avg = round(subj_total / len(group), 2) if group else 0
-                    row = {
-                        "id": uid,
-                        "user_name": user_name,
-                        "email": email,
-                        "quiz_title": detail["quiz_title"],
-                        "subject_name": subj,
-                        "score": detail["score"],
-                        "avg_score_subject": subj_avg,
-                        "avg_score_all": overall_avg,
-                        "submitted_at": detail["submitted_at"]
-                    }
-                    user_rows.append(row)
-                user_details.extend(user_rows)
-            return make_response(jsonify(user_details), 200)
+            try:
+                start, end = _date_range()
+            except ValueError:
+                return make_response(jsonify({"error": "from/to must be ISO dates"}), 400)
+            return make_response(jsonify(user_details(start, end)), 200)
         except Exception as e:
             current_app.logger.error(str(e))
             return make_response(jsonify({"error": "Failed to fetch admin user details"}), 500)
 
 class AdminQuizDataAPI(Resource):
     @jwt_required()
+    @admission.limit("browse")
     def get(self):
         try:
             try:
@@ -221,26 +222,138 @@ class AdminQuizDataAPI(Resource):
             if current_user.get("role") != "admin":
                 return make_response(jsonify({"error": "Unauthorized"}), 403)
 
-            submissions = QuizSubmission.query.all()
-            reports = []
-            for sub in submissions:
-                quiz = Quiz.query.get(sub.quiz_id)
-                if quiz:
-                    chapter = quiz.chapter
-                    subject = chapter.subject if chapter else None
-                    reports.append({
-                        "submission_id": sub.id,
-                        "quiz_id": sub.quiz_id,
-                        "user_id": sub.user_id,
-                        "quiz_title": quiz.title,
-                        "subject_name": subject.name if subject else "Unknown",
-                        "chapter_name": chapter.name if chapter else "Unknown",
-                        "score": sub.score,
-                        "total_questions": sub.total_questions,
-                        "submitted_at": sub.submitted_at.isoformat()
-                    })
-            return make_response(jsonify(reports), 200)
+            try:
+                start, end = _date_range()
+            except ValueError:
+                return make_response(jsonify({"error": "from/to must be ISO dates"}), 400)
+            return make_response(jsonify(quiz_data(start, end)), 200)
         except Exception as e:
             current_app.logger.error(str(e))
             return make_response(jsonify({"error": "Failed to fetch admin quiz data"}), 500)
 
+
+class AdminItemAnalyticsAPI(Resource):
+    @jwt_required()
+    @admission.limit("browse")
+    def get(self):
+        try:
+            try:
+                current_user = json.loads(get_jwt_identity() or "{}")
+            except json.JSONDecodeError:
+                return make_response(jsonify({"error": "Invalid JWT token"}), 401)
+            if current_user.get("role") != "admin":
+                return make_response(jsonify({"error": "Unauthorized"}), 403)
+
+            try:
+                quiz_id = int(request.args.get("quiz_id", ""))
+            except ValueError:
+                return make_response(jsonify({"error": "quiz_id is required"}), 400)
+            quiz = Quiz.query.get(quiz_id)
+            if not quiz:
+                return make_response(jsonify({"error": "Quiz not found"}), 404)
+
+            analytics = quiz_item_analytics(quiz_id)
+            analytics["quiz_id"] = quiz.id
+            analytics["quiz_title"] = quiz.title
+            return make_response(jsonify(analytics), 200)
+        except Exception as e:
+            current_app.logger.error(str(e))
+            return make_response(jsonify({"error": "Failed to fetch item analytics"}), 500)
+
+
+class SubmissionAggregatesAPI(Resource):
+    @jwt_required()
+    @admission.limit("browse")
+    def get(self):
+        """Count and average score/percentage of all submissions (hot and archived) grouped by
+        ``?by=user|quiz|subject|month``, computed from the columnar snapshot."""
+        try:
+            try:
+                current_user = json.loads(get_jwt_identity() or "{}")
+            except json.JSONDecodeError:
+                return make_response(jsonify({"error": "Invalid JWT token"}), 401)
+            if current_user.get("role") != "admin":
+                return make_response(jsonify({"error": "Unauthorized"}), 403)
+
+            by = request.args.get("by", "subject")
+            if by not in GROUPINGS:
+                return make_response(jsonify({"error": f"by must be one of {', '.join(GROUPINGS)}"}), 400)
+            return make_response(jsonify({"by": by, "groups": aggregate(by)}), 200)
+        except Exception as e:
+            current_app.logger.error(str(e))
+            return make_response(jsonify({"error": "Failed to fetch submission aggregates"}), 500)
+
+
+class ReportJobsAPI(Resource):
+    @jwt_required()
+    def post(self):
+        """Start a background report: ``{"report": "user-details"|"quiz-data", "from", "to"}``."""
+        try:
+            current_user = json.loads(get_jwt_identity() or "{}")
+        except json.JSONDecodeError:
+            return make_response(jsonify({"error": "Invalid JWT token"}), 401)
+        if current_user.get("role") != "admin":
+            return make_response(jsonify({"error": "Unauthorized"}), 403)
+
+        data = request.get_json(silent=True) or {}
+        report = data.get("report")
+        if report not in REPORTS:
+            return make_response(jsonify({"error": f"report must be one of {', '.join(REPORTS)}"}), 400)
+        params = {}
+        try:
+            for name in ("from", "to"):
+                params[name] = datetime.fromisoformat(data[name]).isoformat() if data.get(name) else None
+        except (TypeError, ValueError):
+            return make_response(jsonify({"error": "from/to must be ISO dates"}), 400)
+        try:
+            job = create_job(report, params, requested_by=current_user.get("id"))
+        except Exception as e:
+            current_app.logger.error(str(e))
+            return make_response(jsonify({"error": "Failed to start report job"}), 503)
+        return make_response(jsonify(job), 200 if job["status"] == "done" else 202)
+
+    @jwt_required()
+    @admission.limit("browse")
+    def get(self, job_id):
+        try:
+            current_user = json.loads(get_jwt_identity() or "{}")
+        except json.JSONDecodeError:
+            return make_response(jsonify({"error": "Invalid JWT token"}), 401)
+        if current_user.get("role") != "admin":
+            return make_response(jsonify({"error": "Unauthorized"}), 403)
+        job = get_job(job_id)
+        if job is None:
+            return make_response(jsonify({"error": "Report job not found"}), 404)
+        return make_response(jsonify(job), 200)
+
+
+class ReportJobDownloadAPI(Resource):
+    @jwt_required()
+    @admission.limit("browse")
+    def get(self, job_id):
+        try:
+            current_user = json.loads(get_jwt_identity() or "{}")
+        except json.JSONDecodeError:
+            return make_response(jsonify({"error": "Invalid JWT token"}), 401)
+        if current_user.get("role") != "admin":
+            return make_response(jsonify({"error": "Unauthorized"}), 403)
+        job = get_job(job_id)
+        if job is None:
+            return make_response(jsonify({"error": "Report job not found"}), 404)
+        if job["status"] != "done":
+            return make_response(jsonify({"error": f"Report job is {job['status']}", "status": job["status"]}), 409)
+        artifact = load_artifact(job)
+        if artifact is None:
+            return make_response(jsonify({"error": "Report expired, start a new job"}), 410)
+
+        # the artifact is stored gzipped; pass it through to clients that accept that
+        if "gzip" in request.accept_encodings:
+            response = make_response(artifact, 200)
+            response.headers["Content-Encoding"] = "gzip"
+        else:
+            response = make_response(gzip.decompress(artifact), 200)
+        span = "-".join((job["params"].get(name) or "")[:10] for name in ("from", "to") if job["params"].get(name))
+        response.headers["Content-Type"] = "application/json"
+        response.headers["Content-Disposition"] = \
+            f'attachment; filename="{job["report"]}{"-" + span if span else ""}.json"'
+        return response
@@ -0,0 +1,127 @@
+"""Background report jobs with cached, compressed artifacts.
+
+``create_job`` names the artifact after the report parameters and a data
+watermark (row counts and highest ids of the hot and archived submissions), so
+the same report over unchanged data is never computed twice: a cached artifact
+finishes the job at once, and while one job is building an artifact, identical
+requests get that job back instead of a new one. Otherwise the job runs
+``run_job`` on the ``reports`` queue, which stores the gzip-compressed JSON
+result in Redis for ``REPORT_ARTIFACT_TTL`` seconds (catalog and user renames
+don't move the watermark, so the TTL also bounds how stale names can get).
+
+Jobs are JSON documents in Redis (``report_job:<id>``) that expire after
+``REPORT_JOB_TTL`` seconds, so web and worker processes on any host share them.
+"""
+import gzip
+import hashlib
+import json
+import logging
+import uuid
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import func
+
+from applications.extensions import redis_store
+from applications.model import db, QuizSubmission, ArchivedSubmission
+from applications.reports import user_details, quiz_data
+
+REPORTS = {"user-details": user_details, "quiz-data": quiz_data}
+JOB_PREFIX = "report_job:"
+ARTIFACT_PREFIX = "report_artifact:"
+BUILDING_PREFIX = "report_building:"
+
+
+def watermark():
+    """Changes whenever a submission is added, deleted or archived."""
+    parts = []
+    for model in (QuizSubmission, ArchivedSubmission):
+        count, last_id = db.session.query(func.count(model.id), func.max(model.id)).one()
+        parts.append(f"{count}-{last_id or 0}")
+    return ".".join(parts)
+
+
+def artifact_key(report, params, mark):
+    digest = hashlib.sha1(json.dumps([report, params, mark], sort_keys=True).encode()).hexdigest()
+    return f"{ARTIFACT_PREFIX}{report}:{digest}"
+
+
+def get_job(job_id):
+    raw = redis_store.get(JOB_PREFIX + job_id)
+    return json.loads(raw) if raw else None
+
+
+def _save(job):
+    redis_store.set(JOB_PREFIX + job["id"], json.dumps(job), ex=current_app.config["REPORT_JOB_TTL"])
+
+
+def create_job(report, params, requested_by=None):
+    """Start (or reuse) a job for ``report`` with ``params`` ({"from", "to"} ISO strings or None)."""
+    key = artifact_key(report, params, watermark())
+    job = {
+        "id": uuid.uuid4().hex,
+        "report": report,
+        "params": params,
+        "artifact": key,
+        "status": "queued",
+        "reused": False,
+        "requested_by": requested_by,
+        "created_at": datetime.now().isoformat(),
+        "finished_at": None,
+        "rows": None,
+        "bytes": None,
+        "error": None,
+    }
+    if redis_store.exists(key):
+        job.update(status="done", reused=True, finished_at=job["created_at"])
+        _save(job)
+        return job
+
+    ttl = current_app.config["REPORT_JOB_TTL"]
+    if not redis_store.set(BUILDING_PREFIX + key, job["id"], nx=True, ex=ttl):
+        building = redis_store.get(BUILDING_PREFIX + key)
+        existing = get_job(building.decode()) if building else None
+        if existing and existing["status"] in ("queued", "running"):
+            return existing
+        redis_store.set(BUILDING_PREFIX + key, job["id"], ex=ttl)
+
+    _save(job)
+    try:
+        from applications.task import build_report
+        build_report.delay(job["id"])
+    except Exception:
+        redis_store.delete(BUILDING_PREFIX + key)
+        raise
+    return job
+
+
+def run_job(job_id):
+    """Compute the job's report and store its artifact; called by the ``build_report`` task."""
+    job = get_job(job_id)
+    if job is None:
+        logging.warning(f"Report job {job_id} expired before it ran")
+        return
+    job["status"] = "running"
+    _save(job)
+    try:
+        params = job["params"]
+        rows = REPORTS[job["report"]](
+            datetime.fromisoformat(params["from"]) if params.get("from") else None,
+            datetime.fromisoformat(params["to"]) if params.get("to") else None,
+        )
+        artifact = gzip.compress(json.dumps(rows).encode(), compresslevel=6)
+        redis_store.set(job["artifact"], artifact, ex=current_app.config["REPORT_ARTIFACT_TTL"])
+        job.update(status="done", rows=len(rows), bytes=len(artifact))
+    except Exception as e:
+        logging.error(f"Report job {job_id} ({job['report']}) failed: {e}")
+        job.update(status="failed", error=str(e))
+    finally:
+        job["finished_at"] = datetime.now().isoformat()
+        _save(job)
+        if redis_store.get(BUILDING_PREFIX + job["artifact"]) == job_id.encode():
+            redis_store.delete(BUILDING_PREFIX + job["artifact"])
+
+
+def load_artifact(job):
+    """Compressed bytes of a finished job's report, or None once the artifact expired."""
+    return redis_store.get(job["artifact"])
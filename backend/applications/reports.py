@@ -0,0 +1,179 @@
+"""Report computations shared by the report endpoints and the background report jobs."""
+from applications.model import db, User, Quiz, Chapter, Subject, QuizSubmission
+from applications.archive import reaches_archive, summaries
+
+
+def in_range(query, start, end):
+    if start is not None:
+        query = query.filter(QuizSubmission.submitted_at >= start)
+    if end is not None:
+        query = query.filter(QuizSubmission.submitted_at < end)
+    return query
+
+
+def quiz_labels(quiz_ids):
+    """``{quiz_id: (quiz_title, chapter_name, subject_name)}`` in one query."""
+    if not quiz_ids:
+        return {}
+    rows = (
+        db.session.query(Quiz.id, Quiz.title, Chapter.name, Subject.name)
+        .outerjoin(Chapter, Quiz.chapter_id == Chapter.id)
+        .outerjoin(Subject, Chapter.subject_id == Subject.id)
+        .filter(Quiz.id.in_(set(quiz_ids)))
+    )
+    return {quiz_id: (title, chapter or "Unknown", subject or "Unknown") for quiz_id, title, chapter, subject in rows}
+
+
+def summary_row(summary):
+    """Report fields of one archive summary (a user's attempts at a quiz in one month)."""
+    return {
+        "submission_id": None,
+        "quiz_id": summary.quiz_id,
+        "user_id": summary.user_id,
+        "score": round(summary.score_sum / summary.count, 2),
+        "best_score": summary.best_score,
+        "attempts": summary.count,
+        "total_questions": summary.total_questions,
+        "submitted_at": summary.last_submitted_at.isoformat(),
+        "period": summary.period_start.strftime("%Y-%m"),
+        "archived": True,
+    }
+
+
+def my_reports(user_id, start=None, end=None):
+    """One user's submissions in ``[start, end)``; archived months appear as monthly summaries."""
+    submissions = in_range(QuizSubmission.query.filter_by(user_id=user_id), start, end).all()
+    # submissions past the archive horizon only exist as monthly summaries
+    archived = summaries(user_id=user_id, start=start, end=end) if reaches_archive(start) else []
+    labels = quiz_labels([sub.quiz_id for sub in submissions] + [row.quiz_id for row in archived])
+    reports = []
+    for sub in submissions:
+        title, chapter_name, subject_name = labels.get(sub.quiz_id, ("Unknown", "Unknown", "Unknown"))
+        reports.append({
+            "submission_id": sub.id,
+            "quiz_id": sub.quiz_id,
+            "quiz_title": title,
+            "subject_name": subject_name,
+            "chapter_name": chapter_name,
+            "submitted_at": sub.submitted_at.isoformat(),
+            "score": sub.score,
+            "total_questions": sub.total_questions,
+            "archived": False
+        })
+    for row in archived:
+        title, chapter_name, subject_name = labels.get(row.quiz_id, ("Unknown", "Unknown", "Unknown"))
+        report = summary_row(row)
+        del report["user_id"]
+        report.update(quiz_title=title, subject_name=subject_name, chapter_name=chapter_name)
+        reports.append(report)
+    return reports
+
+
+def user_details(start=None, end=None):
+    """Every submission in ``[start, end)`` with the user's per-subject and overall averages."""
+    submissions = in_range(QuizSubmission.query, start, end).all()
+    archived = summaries(start=start, end=end) if reaches_archive(start) else []
+    labels = quiz_labels([sub.quiz_id for sub in submissions] + [row.quiz_id for row in archived])
+    # archived months carry their attempt count so averages stay weighted per submission
+    rows = [(sub.user_id, sub.quiz_id, sub.score, 1, sub.score, sub.total_questions, sub.submitted_at, False)
+            for sub in submissions]
+    rows += [(row.user_id, row.quiz_id, round(row.score_sum / row.count, 2), row.count, row.score_sum,
+              row.total_questions, row.last_submitted_at, True) for row in archived]
+    details = []
+    for user_id, quiz_id, score, count, score_sum, total_questions, submitted_at, is_archived in rows:
+        if quiz_id in labels:
+            title, chapter_name, subject_name = labels[quiz_id]
+            details.append({
+                "user_id": user_id,
+                "quiz_id": quiz_id,
+                "quiz_title": title,
+                "subject_name": subject_name,
+                "chapter_name": chapter_name,
+                "score": score,
+                "count": count,
+                "score_sum": score_sum,
+                "total_questions": total_questions,
+                "submitted_at": submitted_at.isoformat(),
+                "archived": is_archived
+            })
+    users = {user.id: user for user in User.query.filter(User.id.in_({d["user_id"] for d in details}))}
+    grouped = {}
+    for d in details:
+        uid = d["user_id"]
+        if uid not in grouped:
+            user = users.get(uid)
+            if not user:
+                continue
+            grouped[uid] = {
+                "user_name": user.full_name,
+                "email": user.email,
+                "details": []
+            }
+        grouped[uid]["details"].append(d)
+    result = []
+    for uid, data in grouped.items():
+        user_name = data["user_name"]
+        email = data["email"]
+        user_rows = []
+        overall_total = 0
+        overall_count = 0
+        subject_groups = {}
+        for detail in data["details"]:
+            subj = detail["subject_name"]
+            if subj not in subject_groups:
+                subject_groups[subj] = []
+            subject_groups[subj].append(detail)
+            overall_total += detail["score_sum"]
+            overall_count += detail["count"]
+        overall_avg = round(overall_total / overall_count, 2) if overall_count else 0
+        for detail in data["details"]:
+            subj = detail["subject_name"]
+            group = subject_groups[subj]
+            subj_total = sum(item["score_sum"] for item in group)
+            subj_count = sum(item["count"] for item in group)
+            subj_avg = round(subj_total / subj_count, 2) if subj_count else 0
+            row = {
+                "id": uid,
+                "user_name": user_name,
+                "email": email,
+                "quiz_title": detail["quiz_title"],
+                "subject_name": subj,
+                "score": detail["score"],
+                "avg_score_subject": subj_avg,
+                "avg_score_all": overall_avg,
+                "submitted_at": detail["submitted_at"],
+                "archived": detail["archived"]
+            }
+            user_rows.append(row)
+        result.extend(user_rows)
+    return result
+
+
+def quiz_data(start=None, end=None):
+    """Every submission in ``[start, end)`` with its quiz, chapter and subject names."""
+    submissions = in_range(QuizSubmission.query, start, end).all()
+    archived = summaries(start=start, end=end) if reaches_archive(start) else []
+    labels = quiz_labels([sub.quiz_id for sub in submissions] + [row.quiz_id for row in archived])
+    reports = []
+    for sub in submissions:
+        if sub.quiz_id in labels:
+            title, chapter_name, subject_name = labels[sub.quiz_id]
+            reports.append({
+                "submission_id": sub.id,
+                "quiz_id": sub.quiz_id,
+                "user_id": sub.user_id,
+                "quiz_title": title,
+                "subject_name": subject_name,
+                "chapter_name": chapter_name,
+                "score": sub.score,
+                "total_questions": sub.total_questions,
+                "submitted_at": sub.submitted_at.isoformat(),
+                "archived": False
+            })
+    for row in archived:
+        if row.quiz_id in labels:
+            title, chapter_name, subject_name = labels[row.quiz_id]
+            report = summary_row(row)
+            report.update(quiz_title=title, subject_name=subject_name, chapter_name=chapter_name)
+            reports.append(report)
+    return reports
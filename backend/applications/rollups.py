@@ -0,0 +1,147 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import func
+from sqlalchemy.dialects.sqlite import insert
+
+from applications.model import db, Quiz, SubmissionRollup
+
+GRANULARITIES = ("hour", "day")
+BUCKET_FORMATS = {"hour": "%Y-%m-%d %H:00:00", "day": "%Y-%m-%d 00:00:00"}
+HOURLY_RETENTION_DAYS = 35
+
+
+def bucket_start(ts, granularity):
+    if granularity == "hour":
+        return ts.replace(minute=0, second=0, microsecond=0)
+    return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _upsert(granularity, start, quiz_id, count, score_sum, score_sq_sum):
+    stmt = insert(SubmissionRollup).values(
+        granularity=granularity,
+        bucket_start=start,
+        quiz_id=quiz_id,
+        count=count,
+        score_sum=score_sum,
+        score_sq_sum=score_sq_sum,
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["granularity", "bucket_start", "quiz_id"],
+        set_={
+            "count": SubmissionRollup.count + stmt.excluded.count,
+            "score_sum": SubmissionRollup.score_sum + stmt.excluded.score_sum,
+            "score_sq_sum": SubmissionRollup.score_sq_sum + stmt.excluded.score_sq_sum,
+        },
+    )
+    db.session.execute(stmt)
+
+
+def record_submission(submission):
+    """Add one submission to its hourly and daily buckets; runs inside the caller's transaction."""
+    for granularity in GRANULARITIES:
+        _upsert(
+            granularity,
+            bucket_start(submission.submitted_at, granularity),
+            submission.quiz_id,
+            1,
+            submission.score,
+            submission.score * submission.score,
+        )
+
+
+def rebuild_rollups(since=None):
+    """Recompute buckets from hot and archived submissions with one GROUP BY per granularity."""
+    from applications.archive import all_submissions
+    source = all_submissions("id", "quiz_id", "score", "submitted_at")
+    for granularity in GRANULARITIES:
+        bucket = func.strftime(BUCKET_FORMATS[granularity], source.c.submitted_at)
+        query = db.session.query(
+            bucket,
+            source.c.quiz_id,
+            func.count(source.c.id),
+            func.sum(source.c.score),
+            func.sum(source.c.score * source.c.score),
+        )
+        delete = SubmissionRollup.query.filter(SubmissionRollup.granularity == granularity)
+        if since is not None:
+            start = bucket_start(since, granularity)
+            query = query.filter(source.c.submitted_at >= start)
+            delete = delete.filter(SubmissionRollup.bucket_start >= start)
+        delete.delete(synchronize_session=False)
+        rows = query.group_by(bucket, source.c.quiz_id).all()
+        db.session.bulk_insert_mappings(SubmissionRollup, [
+            {
+                "granularity": granularity,
+                "bucket_start": datetime.fromisoformat(start_str),
+                "quiz_id": quiz_id,
+                "count": count,
+                "score_sum": score_sum or 0,
+                "score_sq_sum": score_sq_sum or 0,
+            }
+            for start_str, quiz_id, count, score_sum, score_sq_sum in rows
+        ])
+    db.session.commit()
+
+
+def compact_rollups(hourly_retention_days=HOURLY_RETENTION_DAYS):
+    """Reconcile recent buckets with the source table and drop hourly buckets past retention.
+
+    Daily buckets are kept forever (one row per quiz per day), so charts older than the
+    retention window fall back to daily resolution.
+    """
+    now = datetime.now()
+    rebuild_rollups(since=now - timedelta(days=2))
+    cutoff = bucket_start(now - timedelta(days=hourly_retention_days), "day")
+    dropped = SubmissionRollup.query.filter(
+        SubmissionRollup.granularity == "hour",
+        SubmissionRollup.bucket_start < cutoff,
+    ).delete(synchronize_session=False)
+    db.session.commit()
+    return dropped
+
+
+def submission_counts():
+    return (
+        db.session.query(Quiz.title, func.sum(SubmissionRollup.count))
+        .join(SubmissionRollup, Quiz.id == SubmissionRollup.quiz_id)
+        .filter(SubmissionRollup.granularity == "day")
+        .group_by(Quiz.id)
+        .all()
+    )
+
+
+def quizzes_with_submissions(until):
+    return (
+        db.session.query(SubmissionRollup.quiz_id)
+        .join(Quiz, SubmissionRollup.quiz_id == Quiz.id)
+        .filter(SubmissionRollup.granularity == "day", Quiz.date_of_quiz <= until)
+        .distinct()
+        .count()
+    )
+
+
+def time_series(start, end, granularity, quiz_id=None):
+    query = db.session.query(
+        SubmissionRollup.bucket_start,
+        func.sum(SubmissionRollup.count),
+        func.sum(SubmissionRollup.score_sum),
+        func.sum(SubmissionRollup.score_sq_sum),
+    ).filter(
+        SubmissionRollup.granularity == granularity,
+        SubmissionRollup.bucket_start >= bucket_start(start, granularity),
+        SubmissionRollup.bucket_start < end,
+    )
+    if quiz_id is not None:
+        query = query.filter(SubmissionRollup.quiz_id == quiz_id)
+
+    series = []
+    for start_ts, count, score_sum, score_sq_sum in query.group_by(SubmissionRollup.bucket_start).order_by(SubmissionRollup.bucket_start):
+        mean = score_sum / count if count else 0
+        variance = max(score_sq_sum / count - mean * mean, 0) if count else 0
+        series.append({
+            "bucket_start": start_ts.isoformat(),
+            "count": count,
+            "average_score": round(mean, 2),
+            "std_score": round(variance ** 0.5, 2),
+        })
+    return series
@@ -0,0 +1,111 @@
+"""Full-text search over subjects, chapters, quizzes, questions and users (SQLite FTS5).
+
+Each searchable table gets an external-content FTS5 table ``search_<kind>``
+that stores only the index; column values are read back from the content
+table. AFTER INSERT/UPDATE/DELETE triggers keep the index in step with every
+write, including Core/executemany inserts that bypass ORM events.
+``create_search_index`` is idempotent and backfills indexes it creates.
+"""
+import re
+
+from sqlalchemy import text
+
+# kind -> (content table, indexed columns, bm25 weights, parent column or None)
+INDEXES = {
+    "subject": ("subject", ("name", "description"), (10.0, 1.0), None),
+    "chapter": ("chapter", ("name", "description"), (10.0, 1.0), "subject_id"),
+    "quiz": ("quiz", ("title", "remarks"), (10.0, 1.0), "chapter_id"),
+    "question": ("question", ("title", "question_statement"), (5.0, 1.0), "quiz_id"),
+    "user": ("user", ("full_name", "email"), (10.0, 5.0), None),
+}
+ADMIN_ONLY = {"user"}
+MAX_TERMS = 8
+RANK_WINDOW = 5000
+_TERM = re.compile(r"\w+", re.UNICODE)
+
+
+def _ddl(kind):
+    table, columns, _, _ = INDEXES[kind]
+    fts = f"search_{kind}"
+    cols = ", ".join(columns)
+    new = ", ".join(f"new.{c}" for c in columns)
+    old = ", ".join(f"old.{c}" for c in columns)
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({cols}, content='{table}', content_rowid='id', "
+        f"tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+        f'CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON "{table}" BEGIN '
+        f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new}); END",
+        f'CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON "{table}" BEGIN '
+        f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old}); END",
+        # only re-index when an indexed column changed (counter updates are frequent)
+        f'CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {cols} ON "{table}" BEGIN '
+        f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old}); "
+        f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new}); END",
+    ]
+
+
+def create_search_index(connection, rebuild=False):
+    """Create missing FTS tables and triggers; new (or ``rebuild``) indexes are filled from content."""
+    existing = {row[0] for row in connection.execute(
+        text("SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE 'search_%'"))}
+    for kind in INDEXES:
+        fts = f"search_{kind}"
+        for statement in _ddl(kind):
+            connection.execute(text(statement))
+        if rebuild or fts not in existing:
+            connection.execute(text(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')"))
+
+
+def match_expression(query):
+    """User text -> FTS5 query: every word must match, each as a prefix.
+
+    Words are quoted, so FTS operators typed by the user (NEAR, OR, ``-``,
+    column filters) are searched for literally instead of being interpreted.
+    """
+    terms = _TERM.findall(query.lower())[:MAX_TERMS]
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+def _kind_select(kind, limit):
+    table, columns, weights, parent = INDEXES[kind]
+    fts = f"search_{kind}"
+    parent_col = f't."{parent}"' if parent else "NULL"
+    # bm25 has to score every candidate, so a very common term only ranks the newest
+    # RANK_WINDOW matches; the rowid cutoff walks the doclist backwards and is cheap.
+    cutoff = (f"coalesce((SELECT rowid FROM {fts} WHERE {fts} MATCH :match "
+              f"ORDER BY rowid DESC LIMIT 1 OFFSET :window), 0)")
+    return (
+        f"SELECT * FROM (SELECT '{kind}' AS kind, {fts}.rowid AS id, t.\"{columns[0]}\" AS title, "
+        f"snippet({fts}, -1, '[', ']', '…', 12) AS snippet, {parent_col} AS parent_id, "
+        f"bm25({fts}, {', '.join(str(w) for w in weights)}) AS score "
+        f'FROM {fts} JOIN "{table}" t ON t.id = {fts}.rowid '
+        f"WHERE {fts} MATCH :match AND {fts}.rowid > {cutoff} ORDER BY score LIMIT {int(limit)})"
+    )
+
+
+def search(connection, query, kinds, limit=20, offset=0):
+    """Ranked matches across ``kinds``; returns at most ``limit`` rows after ``offset``.
+
+    Every kind contributes its own best ``offset + limit`` rows (FTS5 ranks
+    within one table), and the merged list is ordered by bm25 score. Terms with
+    more than ``RANK_WINDOW`` matches in one table are ranked among the newest
+    ``RANK_WINDOW`` rows only.
+    """
+    match = match_expression(query)
+    if not match or not kinds:
+        return []
+    per_kind = offset + limit
+    sql = " UNION ALL ".join(_kind_select(kind, per_kind) for kind in kinds)
+    sql += " ORDER BY score LIMIT :limit OFFSET :offset"
+    rows = connection.execute(text(sql), {"match": match, "limit": limit, "offset": offset, "window": RANK_WINDOW - 1})
+    return [
+        {
+            "type": row.kind,
+            "id": row.id,
+            "title": row.title,
+            "snippet": row.snippet,
+            "parent_id": row.parent_id,
+            "score": round(-row.score, 4),
+        }
+        for row in rows
+    ]
@@ -0,0 +1,54 @@
+from flask import request, jsonify, make_response
+from flask_restful import Resource
+from flask_jwt_extended import jwt_required, get_jwt_identity
+import json
+from applications.model import db
+from applications.search import INDEXES, ADMIN_ONLY, search
+from applications.admission import admission
+
+MIN_QUERY_LENGTH = 2
+MAX_PER_PAGE = 50
+# deep pages make every index return offset + per_page rows; nobody pages this far in search results
+MAX_OFFSET = 1000
+
+
+class SearchAPI(Resource):
+    @jwt_required()
+    @admission.limit("browse")
+    def get(self):
+        try:
+            current_user = json.loads(get_jwt_identity() or "{}")
+        except json.JSONDecodeError:
+            return make_response(jsonify({"error": "Invalid JWT token"}), 401)
+
+        query = (request.args.get("q") or "").strip()
+        if len(query) < MIN_QUERY_LENGTH:
+            return make_response(jsonify({"error": f"q must be at least {MIN_QUERY_LENGTH} characters"}), 400)
+        try:
+            page = max(int(request.args.get("page", 1)), 1)
+            per_page = min(max(int(request.args.get("per_page", 20)), 1), MAX_PER_PAGE)
+        except ValueError:
+            return make_response(jsonify({"error": "page and per_page must be integers"}), 400)
+        offset = (page - 1) * per_page
+        if offset > MAX_OFFSET:
+            return make_response(jsonify({"error": "Page is too deep, refine the search instead"}), 400)
+
+        allowed = [kind for kind in INDEXES if current_user.get("role") == "admin" or kind not in ADMIN_ONLY]
+        requested = request.args.get("type")
+        if requested:
+            kinds = [kind for kind in requested.split(",") if kind]
+            unknown = [kind for kind in kinds if kind not in allowed]
+            if unknown:
+                return make_response(jsonify({"error": f"Unknown search type(s): {', '.join(unknown)}"}), 400)
+        else:
+            kinds = allowed
+
+        # one extra row tells whether another page exists without counting every match
+        rows = search(db.session.connection(), query, kinds, limit=per_page + 1, offset=offset)
+        return make_response(jsonify({
+            "q": query,
+            "page": page,
+            "per_page": per_page,
+            "has_more": len(rows) > per_page,
+            "results": rows[:per_page],
+        }), 200)
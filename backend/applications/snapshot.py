@@ -0,0 +1,266 @@
+"""Columnar, memory-mapped snapshot of every submission (hot and archived) for analytics.
+
+Layout under ``SNAPSHOT_DIR``::
+
+    manifest.json            {"generation", "rows", "last_id", "columns": {name: dtype}, ...}
+    <generation>/<column>.bin  raw little-endian arrays, one value per submission, in id order
+
+``refresh_snapshot`` appends rows with ``id > last_id`` to the column files and
+then replaces the manifest atomically, so readers, which map exactly
+``manifest["rows"]`` values, never see a half-written row. When rows were
+deleted under the snapshot (the count up to ``last_id`` no longer matches) it
+rebuilds into a new generation directory and swaps the manifest to it.
+
+Readers ``np.memmap`` the files read-only, so every web worker on the host
+shares one copy through the page cache. ``load_parts`` adds the few rows
+submitted since the last refresh straight from the database, so aggregates are
+exact rather than as old as the snapshot.
+"""
+import fcntl
+import json
+import os
+import shutil
+from datetime import datetime
+
+import numpy as np
+from flask import current_app
+
+from applications.model import db, Quiz, Chapter
+
+COLUMNS = {
+    "id": "<i8",
+    "user_id": "<i4",
+    "quiz_id": "<i4",
+    "score": "<i4",
+    "total_questions": "<i4",
+    "submitted_at": "<i8",  # seconds since the epoch of the stored (naive) timestamp
+}
+EXPORT_CHUNK = 50000
+
+_mapped = {"key": None, "columns": None}
+
+
+def _dir():
+    return current_app.config["SNAPSHOT_DIR"]
+
+
+def read_manifest(directory=None):
+    path = os.path.join(directory or _dir(), "manifest.json")
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _write_manifest(directory, manifest):
+    tmp = os.path.join(directory, "manifest.json.tmp")
+    with open(tmp, "w") as f:
+        json.dump(manifest, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, os.path.join(directory, "manifest.json"))
+
+
+def _source(after_id=None):
+    from applications.archive import all_submissions
+    source = all_submissions(*COLUMNS)
+    query = db.session.query(*(source.c[name] for name in COLUMNS)).order_by(source.c.id)
+    if after_id is not None:
+        query = query.filter(source.c.id > after_id)
+    return query, source
+
+
+def _to_arrays(rows):
+    if not rows:
+        return {name: np.empty(0, dtype=dtype) for name, dtype in COLUMNS.items()}
+    fields = list(zip(*rows))
+    arrays = {}
+    for name, values in zip(COLUMNS, fields):
+        if name == "submitted_at":
+            arrays[name] = np.array(values, dtype="datetime64[s]").astype(COLUMNS[name])
+        else:
+            arrays[name] = np.array(values, dtype=COLUMNS[name])
+    return arrays
+
+
+def _append(generation_dir, after_id):
+    """Append rows after ``after_id`` to the column files; returns ``(rows added, last id)``."""
+    query, _ = _source(after_id)
+    files = {name: open(os.path.join(generation_dir, f"{name}.bin"), "ab") for name in COLUMNS}
+    added, last_id = 0, after_id
+    try:
+        batch = []
+        for row in query.yield_per(EXPORT_CHUNK):
+            batch.append(tuple(row))
+            if len(batch) >= EXPORT_CHUNK:
+                added, last_id = _flush(files, batch, added, last_id)
+                batch = []
+        added, last_id = _flush(files, batch, added, last_id)
+        for f in files.values():
+            f.flush()
+            os.fsync(f.fileno())
+    finally:
+        for f in files.values():
+            f.close()
+    return added, last_id
+
+
+def _flush(files, batch, added, last_id):
+    if not batch:
+        return added, last_id
+    for name, array in _to_arrays(batch).items():
+        files[name].write(array.tobytes())
+    return added + len(batch), batch[-1][0]
+
+
+def _truncate(generation_dir, rows):
+    """Drop anything past ``rows`` left by a refresh that died before writing its manifest."""
+    for name, dtype in COLUMNS.items():
+        path = os.path.join(generation_dir, f"{name}.bin")
+        with open(path, "ab") as f:
+            f.truncate(rows * np.dtype(dtype).itemsize)
+
+
+def _rows_up_to(last_id):
+    _, source = _source()
+    return db.session.query(db.func.count(source.c.id)).filter(source.c.id <= last_id).scalar()
+
+
+def refresh_snapshot(rebuild=False):
+    """Bring the snapshot up to date; returns ``{"rows", "added", "last_id", "rebuilt"}``."""
+    directory = _dir()
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, ".lock"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        manifest = read_manifest(directory)
+        if manifest and manifest.get("columns") != COLUMNS:
+            rebuild = True
+        if manifest and not rebuild and manifest["last_id"] is not None:
+            # rows deleted below the watermark can't be removed from append-only files
+            rebuild = _rows_up_to(manifest["last_id"]) != manifest["rows"]
+
+        if manifest is None or rebuild:
+            generation = (manifest["generation"] + 1) if manifest else 1
+            generation_dir = os.path.join(directory, str(generation))
+            shutil.rmtree(generation_dir, ignore_errors=True)
+            os.makedirs(generation_dir)
+            added, last_id = _append(generation_dir, None)
+            rows, rebuilt = added, True
+        else:
+            generation = manifest["generation"]
+            generation_dir = os.path.join(directory, str(generation))
+            _truncate(generation_dir, manifest["rows"])
+            added, last_id = _append(generation_dir, manifest["last_id"])
+            rows, rebuilt = manifest["rows"] + added, False
+
+        now = datetime.now().isoformat()
+        _write_manifest(directory, {
+            "generation": generation,
+            "rows": rows,
+            "last_id": last_id,
+            "columns": COLUMNS,
+            "created_at": now if rebuilt else manifest["created_at"],
+            "updated_at": now,
+        })
+        if rebuilt:
+            # processes still mapping the old generation keep their pages until they remap
+            for entry in os.listdir(directory):
+                if entry.isdigit() and int(entry) != generation:
+                    shutil.rmtree(os.path.join(directory, entry), ignore_errors=True)
+    return {"rows": rows, "added": added, "last_id": last_id, "rebuilt": rebuilt}
+
+
+def _map(directory, manifest):
+    key = (directory, manifest["generation"], manifest["rows"])
+    if _mapped["key"] != key:
+        generation_dir = os.path.join(directory, str(manifest["generation"]))
+        rows = manifest["rows"]
+        _mapped["columns"] = {
+            name: (np.memmap(os.path.join(generation_dir, f"{name}.bin"), dtype=dtype, mode="r", shape=(rows,))
+                   if rows else np.empty(0, dtype=dtype))
+            for name, dtype in COLUMNS.items()
+        }
+        _mapped["key"] = key
+    return _mapped["columns"]
+
+
+def load_parts():
+    """Every submission as a list of ``{column: array}`` parts: the mapped snapshot, then
+    the rows added since its last refresh (read from the database).
+
+    The snapshot part is never copied; aggregate each part and merge the (small) results.
+    """
+    directory = _dir()
+    manifest = read_manifest(directory)
+    if manifest is None or not manifest["rows"]:
+        query, _ = _source()
+        return [_to_arrays([tuple(row) for row in query])]
+    query, _ = _source(manifest["last_id"])
+    tail = _to_arrays([tuple(row) for row in query])
+    return [_map(directory, manifest), tail]
+
+
+def _quiz_subjects():
+    return dict(db.session.query(Quiz.id, Chapter.subject_id).join(Chapter, Quiz.chapter_id == Chapter.id))
+
+
+GROUPINGS = ("user", "quiz", "subject", "month")
+
+
+def aggregate(by):
+    """Submission count, mean score and mean percentage per user, quiz, subject or month.
+
+    Returns ``[{"key", "count", "average_score", "average_percent"}]`` sorted by key.
+    """
+    if by not in GROUPINGS:
+        raise ValueError(f"by must be one of {', '.join(GROUPINGS)}")
+    if by == "subject":
+        subjects = _quiz_subjects()
+        lookup = np.full(max(subjects, default=0) + 1, -1, dtype=np.int64)
+        lookup[list(subjects)] = list(subjects.values())
+
+    groups = []
+    for columns in load_parts():
+        if not len(columns["id"]):
+            continue
+        if by == "user":
+            keys = columns["user_id"]
+        elif by == "quiz":
+            keys = columns["quiz_id"]
+        elif by == "month":
+            keys = columns["submitted_at"].astype("datetime64[s]").astype("datetime64[M]")
+        else:
+            quiz_ids = columns["quiz_id"]
+            known = quiz_ids < len(lookup)
+            keys = np.where(known, lookup[np.where(known, quiz_ids, 0)], -1)
+        groups.append(_group(keys, columns["score"], columns["total_questions"]))
+    if not groups:
+        return []
+
+    # merge the per-part groups: same keys add up
+    keys = np.concatenate([g[0] for g in groups])
+    unique, inverse = np.unique(keys, return_inverse=True)
+    counts, score_sums, percent_sums = (
+        np.bincount(inverse, weights=np.concatenate([g[i] for g in groups])) for i in (1, 2, 3)
+    )
+
+    result = []
+    for i, key in enumerate(unique):
+        if by == "subject" and key < 0:
+            continue  # quiz deleted since
+        result.append({
+            "key": str(key) if by == "month" else int(key),
+            "count": int(counts[i]),
+            "average_score": round(float(score_sums[i] / counts[i]), 2),
+            "average_percent": round(float(percent_sums[i] / counts[i]), 2),
+        })
+    return result
+
+
+def _group(keys, score, total):
+    """``(keys, counts, score sums, percentage sums)`` per distinct key."""
+    unique, inverse = np.unique(keys, return_inverse=True)
+    percent = np.divide(score, total, out=np.zeros(len(score)), where=total > 0) * 100
+    return (unique, np.bincount(inverse), np.bincount(inverse, weights=score),
+            np.bincount(inverse, weights=percent))
@@ -5,35 +5,26 @@ from flask_jwt_extended import get_jwt_identity, jwt_required
 from applications.model import db, Subject
 import json
 from applications.extensions import cache
+from applications.catalog import subjects_payload, SUBJECTS_TIMEOUT
+from applications.cache_warmer import schedule_cache_warm
+from applications.catalog_delete import delete_or_schedule
+from applications.admission import admission
 
 class SubjectAPI(Resource):
 
     @jwt_required()
+    @admission.limit("browse")
     def get(self):
         current_user = json.loads(get_jwt_identity())
-        if current_user.get('role') == 'admin':
-            subjects = Subject.query.all()
-        else:
+        if current_user.get('role') != 'admin':
             cached_data = cache.get('subjects')
             if cached_data:
                 return make_response(jsonify(cached_data), 200)
-            subjects = Subject.query.all()
-
-        subject_json = [
-            {
-                "id": subject.id,
-                "name": subject.name,
-                "description": subject.description,
-                "chapters": [
-                    {"id": chapter.id, "name": chapter.name, "description": chapter.description, "n_questions": chapter.n_questions,"n_quizzes":chapter.n_quizzes}
-                    for chapter in subject.chapters
-                ],
-            }
-            for subject in subjects
-        ]
+
+        subject_json = subjects_payload()
 
         if current_user.get('role') != 'admin':
-            cache.set('subjects', subject_json, timeout=120) 
+            cache.set('subjects', subject_json, timeout=SUBJECTS_TIMEOUT) 
 
         return make_response(jsonify(subject_json), 200)
     
@@ -60,6 +51,7 @@ class SubjectAPI(Resource):
             db.session.add(subject)
             db.session.commit()
             cache.delete('subjects')
+            schedule_cache_warm()
             return make_response(jsonify({
                 "message": "Subject Created Successfully",
                 "subject": {"id": subject.id, "name": subject.name, "description": subject.description}
@@ -98,6 +90,7 @@ class SubjectAPI(Resource):
         subject.description = description
         db.session.commit()
         cache.delete('subjects')
+        schedule_cache_warm()
         return make_response(jsonify({
             "message": "Subject Updated Successfully",
             "subject": {"id": subject.id, "name": subject.name, "description": subject.description}
@@ -111,11 +104,9 @@ class SubjectAPI(Resource):
 
         subject = Subject.query.get_or_404(subject_id)
         try:
-            for chapter in subject.chapters:
-                db.session.delete(chapter)
-            db.session.delete(subject)
-            db.session.commit()
-            cache.delete('subjects')
+            job = delete_or_schedule("subject", subject.id, current_user.get('id'))
+            if job:
+                return make_response(jsonify({"message": "Subject deletion started", "job": job}), 202)
             return make_response(jsonify({"message": "Subject Deleted Successfully"}), 200)
         except Exception as e:
             db.session.rollback()
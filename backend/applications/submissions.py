@@ -0,0 +1,69 @@
+"""Grading and storing a finished quiz: the one write path for quiz_submissions.
+
+Used by SubmitQuizAPI, by finished attempts and by the sweeper that submits
+attempts whose time ran out, so every submission updates the same rollups,
+leaderboard, item statistics and mastery profile.
+"""
+from datetime import datetime
+
+from flask import current_app
+
+from applications.answer_storage import encode_answers
+from applications.item_analytics import observe_submission
+from applications.leaderboard import leaderboard
+from applications.model import db, QuizSubmission
+from applications.progress import record_progress, invalidate_recommendations
+from applications.rollups import record_submission
+from applications.user_report_cache import bump_user_version
+
+
+def grade_answers(questions, answers):
+    """Score ``answers`` ([{question_id, selected_option}]) against ``{id: Question}``."""
+    score = 0
+    graded = []
+    for answer in answers:
+        question = questions.get(answer.get('question_id'))
+        if not question:
+            continue
+        is_correct = answer.get('selected_option') == (question.correct_option - 1)
+        if is_correct:
+            score += 1
+
+        graded.append({
+            'question_id': question.id,
+            'selected_option': answer.get('selected_option'),
+            'is_correct': is_correct
+        })
+    return score, graded
+
+
+def store_submission(quiz, user_id, answers, submitted_at=None):
+    """Grade and commit one submission; returns ``(submission, score, total)``."""
+    questions = {q.id: q for q in quiz.questions}
+    score, graded = grade_answers(questions, answers)
+
+    packed, bitmap = encode_answers(
+        graded,
+        {q.id: q.answer_slot for q in questions.values() if q.answer_slot is not None}
+    )
+    # dual-write period: keep the JSON copy until ANSWERS_STORE_JSON is switched off
+    store_json = current_app.config.get('ANSWERS_STORE_JSON', True) or packed is None
+    submission = QuizSubmission(
+        user_id=user_id,
+        quiz_id=quiz.id,
+        score=score,
+        total_questions=len(questions),
+        answers=graded if store_json else [],
+        answers_packed=packed,
+        correct_bitmap=bitmap,
+        submitted_at=submitted_at or datetime.now()
+    )
+    db.session.add(submission)
+    record_submission(submission)
+    record_progress(submission, quiz)
+    db.session.commit()
+    invalidate_recommendations(user_id)
+    bump_user_version(user_id)
+    leaderboard.record(quiz.id, user_id, score)
+    observe_submission(quiz.id, graded)
+    return submission, score, len(questions)
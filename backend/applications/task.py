@@ -2,22 +2,36 @@ from datetime import datetime, timedelta, timezone
 import calendar
 import logging
 import os
+from functools import lru_cache
 from jinja2 import Environment, FileSystemLoader
 from flask_mail import Message
 from celery.schedules import crontab
-from applications.worker import celery
+from celery.signals import worker_ready
+from sqlalchemy import func
+from applications.extensions import mail
+from applications.queues import TASK_ROUTES
+from applications.worker import celery, db_batch, get_flask_app
 from applications.model import db, User, Quiz, QuizSubmission
 
 logging.basicConfig(level=logging.INFO)
 
 TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "templates")
-env = Environment(loader=FileSystemLoader(TEMPLATES_DIR))
-reminder_template = env.get_template('daily_reminder.html')
-report_template = env.get_template('monthly_report.html')
+
+
+@lru_cache(maxsize=None)
+def _template_env():
+    return Environment(loader=FileSystemLoader(TEMPLATES_DIR))
+
+
+@lru_cache(maxsize=None)
+def email_template(name):
+    """Parse an email template the first time a task renders it."""
+    return _template_env().get_template(name)
+
 
 @celery.on_after_configure.connect
 def setup_periodic_tasks(sender, **kwargs):
-    from main import app
+    app = get_flask_app()
     with app.app_context():
         active_users = User.query.filter(User.status == "active").all()
         for user in active_users:
@@ -32,95 +46,186 @@ def setup_periodic_tasks(sender, **kwargs):
             send_monthly_report.s(),
             name="monthly_user_activity_report"
         )
+        sender.add_periodic_task(
+            crontab(hour=3, minute=30),
+            compact_submission_rollups.s(),
+            name="compact_submission_rollups"
+        )
+        sender.add_periodic_task(
+            60.0,
+            finalize_expired_attempts.s(),
+            name="finalize_expired_attempts"
+        )
+        sender.add_periodic_task(
+            crontab(hour=4, minute=0),
+            archive_old_submissions.s(),
+            name="archive_old_submissions"
+        )
+        sender.add_periodic_task(
+            float(app.config["CACHE_WARM_INTERVAL"]),
+            warm_caches.s(),
+            name="warm_caches"
+        )
+        sender.add_periodic_task(
+            float(app.config["SNAPSHOT_INTERVAL"]),
+            refresh_submission_snapshot.s(),
+            name="refresh_submission_snapshot"
+        )
+
+
+@worker_ready.connect
+def warm_caches_on_boot(sender=None, **kwargs):
+    # only the worker that will run it, not every per-queue worker
+    if TASK_ROUTES[warm_caches.name]["queue"] in {q.name for q in celery.conf.task_queues}:
+        warm_caches.delay()
 
 
 @celery.task(bind=True, max_retries=3)
 def send_daily_reminder(self, user_id):
-    from main import app  
-    with app.app_context():
-        user = User.query.get(user_id)
-        if not user or user.status != "active":
-            logging.error(f"User with ID {user_id} not found or not active.")
-            return
-        
-        now = datetime.now(timezone.utc)
-        last_24_hours = now - timedelta(days=1)
-        new_quiz_available = Quiz.query.filter(Quiz.created_at >= last_24_hours).first()
-        last_seen = user.last_seen.replace(tzinfo=timezone.utc) if user.last_seen else None
-
-        if (last_seen and (now - last_seen).days >= 1) or new_quiz_available:
-            try:
-                send_email_reminder.apply_async(args=[user.id])
-            except Exception as e:
-                logging.error(f"Failed to send reminder to {user.email}: {e}")
-                raise self.retry(exc=e, countdown=60)
+    user = User.query.get(user_id)
+    if not user or user.status != "active":
+        logging.error(f"User with ID {user_id} not found or not active.")
+        return
+    
+    now = datetime.now(timezone.utc)
+    last_24_hours = now - timedelta(days=1)
+    new_quiz_available = Quiz.query.filter(Quiz.created_at >= last_24_hours).first()
+    last_seen = user.last_seen.replace(tzinfo=timezone.utc) if user.last_seen else None
+
+    if (last_seen and (now - last_seen).days >= 1) or new_quiz_available:
+        try:
+            send_email_reminder.apply_async(args=[user.id])
+        except Exception as e:
+            logging.error(f"Failed to send reminder to {user.email}: {e}")
+            raise self.retry(exc=e, countdown=60)
 
 
 @celery.task(bind=True, max_retries=3)
 def send_email_reminder(self, user_id):
-    from main import app, mail  
-    with app.app_context():
-        user = User.query.get(user_id)
-        if not user or user.status != "active":
-            logging.error(f"User with ID {user_id} not found or not active.")
-            return
-
-        subject = "Reminder: Attempt Your Quiz!"
-        quiz_link = "http://localhost:5173"
-        email_body = reminder_template.render(
-            user_name=user.full_name,
-            quiz_link=quiz_link
-        )
+    user = User.query.get(user_id)
+    if not user or user.status != "active":
+        logging.error(f"User with ID {user_id} not found or not active.")
+        return
+
+    subject = "Reminder: Attempt Your Quiz!"
+    quiz_link = "http://localhost:5173"
+    email_body = email_template('daily_reminder.html').render(
+        user_name=user.full_name,
+        quiz_link=quiz_link
+    )
+
+    msg = Message(
+        subject,
+        recipients=[user.email]
+    )
+    msg.html = email_body
+
+    try:
+        mail.send(msg)
+        logging.info(f"Reminder email sent to {user.email}")
+    except Exception as e:
+        logging.error(f"Failed to send email to {user.email}: {e}")
+        raise self.retry(exc=e, countdown=60)
 
-        msg = Message(
-            subject,
-            recipients=[user.email]
-        )
-        msg.html = email_body
 
+@celery.task(bind=True, max_retries=3)
+def send_monthly_report(self):
+    now = datetime.now(timezone.utc)
+    first_day = now.replace(day=1)
+    last_day = first_day.replace(day=calendar.monthrange(first_day.year, first_day.month)[1])
+    active_users = User.query.filter(User.status == "active")
+
+    for users in db_batch(active_users, size=200):
+        # one aggregate per batch of users instead of loading every submission per user
+        totals = dict(
+            (user_id, (count, score))
+            for user_id, count, score in db.session.query(
+                QuizSubmission.user_id, func.count(QuizSubmission.id), func.sum(QuizSubmission.score)
+            ).filter(
+                QuizSubmission.user_id.in_([user.id for user in users]),
+                QuizSubmission.submitted_at.between(first_day, last_day)
+            ).group_by(QuizSubmission.user_id)
+        )
+        recipient = None
         try:
-            mail.send(msg)
-            logging.info(f"Reminder email sent to {user.email}")
+            # one SMTP session per batch rather than one per message
+            with mail.connect() as connection:
+                for user in users:
+                    recipient = user.email
+                    total_quizzes, total_score = totals.get(user.id, (0, 0))
+                    average_score = total_score / total_quizzes if total_quizzes > 0 else 0
+
+                    report_body = email_template('monthly_report.html').render(
+                        user_name=user.full_name,
+                        total_quizzes=total_quizzes,
+                        average_score=average_score,
+                        quiz_link="http://localhost:5173"
+                    )
+
+                    msg = Message(
+                        subject="Your Monthly Quiz Report",
+                        recipients=[user.email]
+                    )
+                    msg.html = report_body
+
+                    connection.send(msg)
+                    logging.info(f"Monthly report sent to {user.email}")
         except Exception as e:
-            logging.error(f"Failed to send email to {user.email}: {e}")
+            logging.error(f"Failed to send report to {recipient or 'SMTP server'}: {e}")
             raise self.retry(exc=e, countdown=60)
 
 
-@celery.task(bind=True, max_retries=3)
-def send_monthly_report(self):
-    from main import app, mail  
-    with app.app_context():
-        now = datetime.now(timezone.utc)
-        first_day = now.replace(day=1)
-        last_day = first_day.replace(day=calendar.monthrange(first_day.year, first_day.month)[1])
-        active_users = User.query.filter(User.status == "active").all()
+@celery.task
+def rebuild_leaderboards(quiz_id=None):
+    from applications.leaderboard import leaderboard
+    rebuilt = leaderboard.rebuild(quiz_id)
+    logging.info(f"Rebuilt {rebuilt} leaderboard(s) from quiz_submissions")
 
-        for user in active_users:
-            submissions = QuizSubmission.query.filter(
-                QuizSubmission.user_id == user.id,
-                QuizSubmission.submitted_at.between(first_day, last_day)
-            ).all()
-            total_quizzes = len(submissions)
-            total_score = sum(sub.score for sub in submissions)
-            average_score = total_score / total_quizzes if total_quizzes > 0 else 0
-
-            report_body = report_template.render(
-                user_name=user.full_name,
-                total_quizzes=total_quizzes,
-                average_score=average_score,
-                quiz_link="http://localhost:5173"
-            )
 
-            msg = Message(
-                subject="Your Monthly Quiz Report",
-                recipients=[user.email]
-            )
-            msg.html = report_body
+@celery.task
+def compact_submission_rollups():
+    from applications.rollups import compact_rollups
+    dropped = compact_rollups()
+    logging.info(f"Submission rollups compacted, {dropped} expired hourly buckets dropped")
+
+
+@celery.task
+def finalize_expired_attempts():
+    from applications.attempts import attempts
+    finalized = attempts.finalize_expired()
+    if finalized:
+        logging.info(f"Submitted {finalized} quiz attempt(s) whose time ran out")
+
+
+@celery.task
+def archive_old_submissions():
+    from applications.archive import archive_submissions
+    moved = archive_submissions()
+    if moved:
+        logging.info(f"Archived {moved} quiz submission(s) past the archive horizon")
+
+
+@celery.task
+def warm_caches():
+    from applications.cache_warmer import PENDING_KEY, warm_caches as run_warm_up
+    from applications.extensions import redis_store
+    redis_store.delete(PENDING_KEY)
+    return run_warm_up()
+
+
+@celery.task
+def refresh_submission_snapshot():
+    from applications.snapshot import refresh_snapshot
+    return refresh_snapshot()
+
+
+@celery.task
+def build_report(job_id):
+    from applications.report_jobs import run_job
+    run_job(job_id)
 
-            try:
-                mail.send(msg)
-                logging.info(f"Monthly report sent to {user.email}")
-            except Exception as e:
-                logging.error(f"Failed to send report to {user.email}: {e}")
-                raise self.retry(exc=e, countdown=60)
 
+@celery.task
+def delete_catalog_target(job_id):
+    from applications.catalog_delete import run_delete_job
+    run_delete_job(job_id)
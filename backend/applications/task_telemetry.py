@@ -0,0 +1,100 @@
+"""Celery signal handlers: queue latency, runtime, retries, failures and trace propagation.
+
+Publishing stamps every message with ``enqueued_at`` and the ``trace_id`` of the HTTP
+request (or parent task) that sent it. Workers turn those into per-task metrics in
+``shared_metrics`` so they show up on the web process's /api/metrics.
+"""
+import logging
+import time
+from datetime import datetime
+
+from celery import current_task
+from celery.signals import before_task_publish, task_prerun, task_postrun, task_retry, task_failure
+from flask import g, has_request_context
+
+from applications.metrics import metrics, shared_metrics
+
+LATENCY_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 15.0, 30.0, 60.0, 300.0, 900.0, 3600.0)
+RUNTIME_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+_started = {}
+
+
+def current_trace_id():
+    if has_request_context() and "trace_id" in g:
+        return g.trace_id
+    task = current_task
+    if task and task.request and task.request.id:
+        return task.request.get("trace_id")
+    return None
+
+
+@before_task_publish.connect
+def stamp_headers(sender=None, headers=None, **kwargs):
+    if headers is None:
+        return
+    headers.setdefault("enqueued_at", time.time())
+    trace_id = current_trace_id()
+    if trace_id:
+        headers.setdefault("trace_id", trace_id)
+
+
+def _queue_latency(request, now):
+    enqueued_at = request.get("enqueued_at")
+    if enqueued_at is None:
+        return None
+    ready_at = float(enqueued_at)
+    # countdown/eta tasks (including retries) are not "late" before their eta
+    if request.eta:
+        try:
+            eta = request.eta if isinstance(request.eta, datetime) else datetime.fromisoformat(request.eta)
+            ready_at = max(ready_at, eta.timestamp())
+        except (TypeError, ValueError):
+            pass
+    return max(now - ready_at, 0.0)
+
+
+@task_prerun.connect
+def on_task_start(sender=None, task_id=None, task=None, **kwargs):
+    now = time.time()
+    _started[task_id] = time.perf_counter()
+    latency = _queue_latency(task.request, now)
+    if latency is not None:
+        queue = (task.request.delivery_info or {}).get("routing_key") or "unknown"
+        shared_metrics.observe("quiz_celery_task_queue_latency_seconds", {"task": task.name, "queue": queue},
+                               latency, LATENCY_BUCKETS, help_text="Enqueue-to-start delay per task and queue")
+    logging.info(f"Task {task.name}[{task_id}] started trace={task.request.get('trace_id')} "
+                 f"retries={task.request.retries} queue_latency={latency if latency is None else round(latency, 3)}s")
+
+
+@task_postrun.connect
+def on_task_end(sender=None, task_id=None, task=None, state=None, **kwargs):
+    started = _started.pop(task_id, None)
+    if started is None:
+        return
+    runtime = time.perf_counter() - started
+    labels = {"task": task.name, "state": state or "UNKNOWN"}
+    shared_metrics.observe("quiz_celery_task_runtime_seconds", labels, runtime, RUNTIME_BUCKETS,
+                           help_text="Task execution time by final state")
+    shared_metrics.inc("quiz_celery_tasks_total", labels, help_text="Finished task executions by state")
+    # cache lookups and other ``metrics`` calls made inside tasks
+    metrics.flush_if_due()
+
+
+@task_retry.connect
+def on_task_retry(sender=None, request=None, reason=None, **kwargs):
+    # reason is celery's Retry wrapper; report the exception that caused it
+    cause = getattr(reason, "exc", None) or reason
+    shared_metrics.inc("quiz_celery_task_retries_total",
+                       {"task": sender.name, "reason": type(cause).__name__},
+                       help_text="Task retries by reason")
+    logging.warning(f"Task {sender.name}[{request.id}] retry {request.retries + 1} "
+                    f"trace={request.get('trace_id')}: {cause}")
+
+
+@task_failure.connect
+def on_task_failure(sender=None, task_id=None, exception=None, **kwargs):
+    shared_metrics.inc("quiz_celery_task_failures_total",
+                       {"task": sender.name, "reason": type(exception).__name__},
+                       help_text="Task failures by exception type")
+    logging.error(f"Task {sender.name}[{task_id}] failed trace={sender.request.get('trace_id')}: {exception}")
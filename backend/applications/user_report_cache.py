@@ -0,0 +1,98 @@
+"""Per-user cache of report payloads that only change when that user submits.
+
+Every variant of a user's reports (``my-reports`` for each date range, the
+submission history of each quiz) is one field of the Redis hash
+``user_reports:<user_id>``, stored zlib-compressed together with the user's
+submission version at the time it was computed. ``bump_user_version`` (called
+after every committed submission, and when the archiver moves a user's rows)
+increments ``user_version:<user_id>`` and drops the hash.
+
+A lookup is one pipelined round trip (version, field, field count and a TTL
+refresh), so a hit never touches the database. Entries are bounded:
+payloads larger than ``USER_REPORT_CACHE_MAX_BYTES`` compressed are not cached,
+a user's hash is cleared when it reaches ``USER_REPORT_CACHE_MAX_VARIANTS``
+fields, and the hash expires after ``USER_REPORT_CACHE_TTL`` seconds without a
+lookup, which evicts inactive users. Catalog renames don't bump versions, so
+the TTL also bounds how long an old quiz title can show.
+"""
+import json
+import logging
+import zlib
+
+from flask import current_app
+
+from applications.extensions import redis_store
+from applications.metrics import metrics
+
+HASH_PREFIX = "user_reports:"
+VERSION_PREFIX = "user_version:"
+
+
+def _version(raw):
+    return int(raw) if raw else 0
+
+
+def _skip(report, reason):
+    metrics.inc("quiz_user_report_cache_skipped_total", {"report": report, "reason": reason},
+                help_text="User report payloads not cached, by reason")
+
+
+def cached_user_report(user_id, report, params, compute):
+    """``compute()``'s payload for ``user_id``, served from the cache while their version is unchanged.
+
+    ``params`` (JSON-serializable) tells apart variants of the same report.
+    """
+    config = current_app.config
+    hash_key = f"{HASH_PREFIX}{user_id}"
+    field = f"{report}:{json.dumps(params, sort_keys=True, separators=(',', ':'))}"
+    try:
+        pipe = redis_store.pipeline(transaction=False)
+        pipe.get(f"{VERSION_PREFIX}{user_id}")
+        pipe.hget(hash_key, field)
+        pipe.hlen(hash_key)
+        pipe.expire(hash_key, config["USER_REPORT_CACHE_TTL"])
+        raw_version, entry, variants, _ = pipe.execute()
+    except Exception as e:
+        logging.warning(f"User report cache unavailable: {e}")
+        return compute()
+
+    # read before computing, so a submission committed meanwhile leaves a stale-tagged entry
+    version = _version(raw_version)
+    if entry is not None:
+        cached = json.loads(zlib.decompress(entry))
+        if cached["v"] == version:
+            metrics.cache_lookup(f"{HASH_PREFIX}{report}", True)
+            return cached["data"]
+    metrics.cache_lookup(f"{HASH_PREFIX}{report}", False)
+
+    data = compute()
+    encoded = zlib.compress(json.dumps({"v": version, "data": data}).encode())
+    if len(encoded) > config["USER_REPORT_CACHE_MAX_BYTES"]:
+        _skip(report, "oversize")
+        return data
+    try:
+        pipe = redis_store.pipeline(transaction=False)
+        if entry is None and variants >= config["USER_REPORT_CACHE_MAX_VARIANTS"]:
+            metrics.inc("quiz_user_report_cache_evictions_total", {"reason": "variants"},
+                        help_text="Users whose cached reports were cleared to stay within the variant limit")
+            pipe.delete(hash_key)
+        pipe.hset(hash_key, field, encoded)
+        pipe.expire(hash_key, config["USER_REPORT_CACHE_TTL"])
+        pipe.execute()
+    except Exception as e:
+        logging.warning(f"User report not cached: {e}")
+    return data
+
+
+def bump_user_version(*user_ids):
+    """Invalidate every cached report of ``user_ids``; call after their submissions change."""
+    if not user_ids:
+        return
+    try:
+        pipe = redis_store.pipeline(transaction=False)
+        for user_id in user_ids:
+            pipe.incr(f"{VERSION_PREFIX}{user_id}")
+            pipe.delete(f"{HASH_PREFIX}{user_id}")
+        pipe.execute()
+    except Exception as e:
+        logging.error(f"User report cache not invalidated for {len(user_ids)} user(s): {e}")
@@ -1,13 +1,103 @@
 from celery import Celery, Task
-from flask import current_app as app
+from celery.signals import worker_process_init
+from flask import current_app, has_app_context
 
-def celery_init_app():
-    class FlaskTask(Task):
-        def __call__(self, *args: object, **kwargs: object):
-            with app.app_context():
+from applications.queues import celery_settings
+
+
+class FlaskTask(Task):
+    """Runs every task inside the worker's app context and leaves a clean session behind.
+
+    The app is built once per worker process; each call only pushes a context
+    (a few dict operations) and borrows a pooled connection through the
+    scoped session, which is removed afterwards whether the task succeeded,
+    raised or retried. Calls made from inside an existing context (eager
+    tasks, ``task()`` called directly) reuse that context and its session.
+    """
+    abstract = True
+
+    def __call__(self, *args, **kwargs):
+        flask_app = get_flask_app()
+        if has_app_context() and current_app._get_current_object() is flask_app:
+            return self.run(*args, **kwargs)
+        from applications.model import db
+        with flask_app.app_context():
+            try:
                 return self.run(*args, **kwargs)
+            finally:
+                db.session.remove()
 
-    celery_app = Celery()
+
+def celery_init_app():
+    celery_app = Celery(task_cls=FlaskTask)
     return celery_app
 
-celery = celery_init_app()
\ No newline at end of file
+celery = celery_init_app()
+
+
+def init_celery(flask_app):
+    """Point celery at flask_app's broker and remember the app tasks should run under."""
+    celery.conf.update(
+        broker_url=flask_app.config['CELERY_BROKER_URL'],
+        result_backend=flask_app.config['CELERY_RESULT_BACKEND'],
+        timezone='Asia/Kolkata',
+        enable_utc=False,
+        broker_connection_retry_on_startup=True,
+        **celery_settings(flask_app.config.get('CELERY_WORKER_PROFILE'), flask_app.config['MAIL_RATE_LIMIT'])
+    )
+    celery.flask_app = flask_app
+    flask_app.extensions['celery'] = celery
+
+
+def get_flask_app():
+    """App bound by create_app(); a worker-profile app is built on first use otherwise."""
+    flask_app = getattr(celery, 'flask_app', None)
+    if flask_app is None:
+        from applications.factory import create_app
+        flask_app = create_app(profile='worker')
+    return flask_app
+
+
+@worker_process_init.connect
+def reset_connection_pool(**kwargs):
+    """Forked pool children must not share the parent's pooled DB connections."""
+    from applications.model import db
+    with get_flask_app().app_context():
+        db.engine.dispose(close=False)
+
+
+def db_batch(items, size=500):
+    """Yield ``items`` (a list, or a query over one model) in chunks of ``size``.
+
+    The session is committed and cleared after every chunk, so one task can walk
+    thousands of rows with flat memory instead of fanning out one task per row.
+    Queries are paged by primary key, so rows changed by earlier chunks are
+    neither skipped nor repeated.
+    """
+    from sqlalchemy import inspect
+    from applications.model import db
+    if isinstance(items, (list, tuple)):
+        chunks = (items[i:i + size] for i in range(0, len(items), size))
+    else:
+        chunks = _keyset_chunks(items, inspect(items.column_descriptions[0]['entity']).primary_key[0], size)
+    for chunk in chunks:
+        yield chunk
+        db.session.commit()
+        db.session.expunge_all()
+
+
+def _keyset_chunks(query, pk, size):
+    query = query.order_by(None).order_by(pk)
+    last = None
+    while True:
+        page = query if last is None else query.filter(pk > last)
+        chunk = page.limit(size).all()
+        if not chunk:
+            return
+        # read before yielding: the caller's commit expires and detaches these rows
+        last = getattr(chunk[-1], pk.key)
+        yield chunk
+
+
+# signal handlers for queue latency / runtime / retry metrics and trace propagation
+from applications import task_telemetry  # noqa: E402,F401
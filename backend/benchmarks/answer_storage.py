@@ -0,0 +1,115 @@
+"""Compare JSON vs packed answer storage: SQLite file size and bulk decode speed.
+
+    python benchmarks/answer_storage.py --submissions 1000000 --questions 10
+
+Writes two throwaway SQLite files and prints a JSON summary. Reference run at the
+defaults (1M submissions x 10 questions, one core): 684.4 vs 22.2 bytes per
+submission (30.8x smaller), decode 18.7 s vs 0.88 s (21x faster).
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from applications.answer_storage import encode_answers, decode_matrix  # noqa: E402
+
+CHUNK = 20000
+
+
+def generate(n, n_questions, seed):
+    rng = random.Random(seed)
+    slots = {qid: qid - 1 for qid in range(1, n_questions + 1)}
+    key = [rng.randrange(4) for _ in range(n_questions)]
+    for _ in range(n):
+        answers = []
+        for qid in range(1, n_questions + 1):
+            option = rng.randrange(4) if rng.random() < 0.95 else None
+            answers.append({"question_id": qid, "selected_option": option, "is_correct": option == key[qid - 1]})
+        yield answers, slots
+
+
+def build(path, n, n_questions, seed, packed):
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+    if packed:
+        conn.execute("CREATE TABLE s (id INTEGER PRIMARY KEY, answers_packed BLOB, correct_bitmap BLOB)")
+        sql = "INSERT INTO s (answers_packed, correct_bitmap) VALUES (?, ?)"
+    else:
+        conn.execute("CREATE TABLE s (id INTEGER PRIMARY KEY, answers JSON)")
+        sql = "INSERT INTO s (answers) VALUES (?)"
+    batch = []
+    for answers, slots in generate(n, n_questions, seed):
+        batch.append(encode_answers(answers, slots) if packed else (json.dumps(answers),))
+        if len(batch) >= CHUNK:
+            conn.executemany(sql, batch)
+            batch = []
+    conn.executemany(sql, batch)
+    conn.commit()
+    conn.execute("VACUUM")
+    conn.close()
+    return os.path.getsize(path)
+
+
+def decode_json(path, n_questions):
+    conn = sqlite3.connect(path)
+    start = time.perf_counter()
+    rows = conn.execute("SELECT answers FROM s").fetchall()
+    correct = np.zeros((len(rows), n_questions), dtype=np.uint8)
+    selected = np.zeros((len(rows), n_questions), dtype=np.uint8)
+    for i, (raw,) in enumerate(rows):
+        for answer in json.loads(raw):
+            j = answer["question_id"] - 1
+            option = answer["selected_option"]
+            selected[i, j] = 0 if option is None else option + 1
+            correct[i, j] = answer["is_correct"]
+    elapsed = time.perf_counter() - start
+    conn.close()
+    return elapsed, int(correct.sum())
+
+
+def decode_packed(path, n_questions):
+    conn = sqlite3.connect(path)
+    start = time.perf_counter()
+    rows = conn.execute("SELECT answers_packed, correct_bitmap FROM s").fetchall()
+    selected, correct = decode_matrix([r[0] for r in rows], [r[1] for r in rows], n_questions)
+    elapsed = time.perf_counter() - start
+    conn.close()
+    return elapsed, int(correct.sum())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--submissions", type=int, default=1_000_000)
+    parser.add_argument("--questions", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results = {"submissions": args.submissions, "questions": args.questions}
+        for label, packed in (("json", False), ("packed", True)):
+            path = os.path.join(tmp, f"{label}.sqlite3")
+            size = build(path, args.submissions, args.questions, args.seed, packed)
+            decode = decode_packed if packed else decode_json
+            elapsed, checksum = decode(path, args.questions)
+            results[label] = {
+                "db_bytes": size,
+                "bytes_per_submission": round(size / max(args.submissions, 1), 1),
+                "decode_seconds": round(elapsed, 3),
+                "decode_rows_per_second": round(args.submissions / elapsed) if elapsed else None,
+                "correct_checksum": checksum,
+            }
+        results["size_ratio"] = round(results["json"]["db_bytes"] / results["packed"]["db_bytes"], 2)
+        results["decode_speedup"] = round(results["json"]["decode_seconds"] / results["packed"]["decode_seconds"], 2)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
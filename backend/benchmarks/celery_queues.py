@@ -0,0 +1,160 @@
+"""Reminder latency while a large report job runs: one shared queue vs the per-queue topology.
+
+    python benchmarks/celery_queues.py --reports 40 --report-seconds 0.5 --reminders 60
+
+Starts real Celery worker processes against a local Redis (``redis-server`` when on
+PATH, otherwise ``fakeredis.TcpFakeServer``) twice:
+
+* ``shared``: the old setup, every task on the default queue, one worker with
+  the reminders and reports processes combined and Celery's default prefetch;
+* ``split``: ``applications.queues`` routing, one worker per profile.
+
+In each run reminders are sent at a steady rate, first on an idle system, then right
+after a burst of report tasks. The stand-in tasks carry the production task names, so
+they are routed exactly like the real ones, but only sleep: the numbers show queueing
+alone (mail rate limits are off). Prints enqueue-to-start latency percentiles as JSON;
+with fakeredis every latency includes a polling floor of roughly half a second.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from celery import Celery
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, BACKEND_DIR)
+
+from applications.queues import WORKER_PROFILES, celery_settings  # noqa: E402
+
+LATENCY_KEY = "bench:reminder_latency"
+SPLIT_PROFILES = ("reminders", "reports")
+
+bench = Celery("bench", broker=f"redis://127.0.0.1:{os.getenv('BENCH_REDIS_PORT', 6379)}/0")
+if os.getenv("BENCH_MODE") == "shared":
+    bench.conf.update(
+        task_ignore_result=True,
+        worker_concurrency=sum(WORKER_PROFILES[name]["concurrency"] for name in SPLIT_PROFILES),
+    )
+else:
+    bench.conf.update(**celery_settings(os.getenv("BENCH_PROFILE")))
+
+
+def _redis():
+    import redis
+    return redis.Redis(port=int(os.getenv("BENCH_REDIS_PORT", 6379)))
+
+
+@bench.task(name="applications.task.send_email_reminder")
+def send_email_reminder(enqueued_at, seconds):
+    _redis().rpush(LATENCY_KEY, time.time() - enqueued_at)
+    time.sleep(seconds)
+
+
+@bench.task(name="applications.task.send_monthly_report")
+def send_monthly_report(seconds):
+    time.sleep(seconds)
+
+
+def start_workers(mode, port):
+    env = dict(os.environ, BENCH_MODE=mode, BENCH_REDIS_PORT=str(port),
+               PYTHONPATH=os.pathsep.join(filter(None, [os.path.dirname(os.path.abspath(__file__)),
+                                                         BACKEND_DIR, os.environ.get("PYTHONPATH")])))
+    profiles = ("shared",) if mode == "shared" else SPLIT_PROFILES
+    workers = []
+    for profile in profiles:
+        workers.append(subprocess.Popen(
+            [sys.executable, "-m", "celery", "-A", "celery_queues", "worker", "--loglevel=warning",
+             "-n", f"{profile}@bench", "--without-gossip", "--without-mingle", "--without-heartbeat"],
+            env=dict(env, BENCH_PROFILE=profile if mode == "split" else ""),
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        ))
+    return workers
+
+
+def stop_workers(workers):
+    for worker in workers:
+        worker.terminate()
+    for worker in workers:
+        try:
+            worker.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            worker.kill()
+
+
+def collect(client, expected, timeout):
+    deadline = time.time() + timeout
+    while client.llen(LATENCY_KEY) < expected and time.time() < deadline:
+        time.sleep(0.05)
+    values = [float(v) for v in client.lrange(LATENCY_KEY, 0, -1)]
+    client.delete(LATENCY_KEY)
+    return values
+
+
+def summarize(latencies, expected):
+    if not latencies:
+        return {"n": 0, "expected": expected}
+    ordered = sorted(latencies)
+    return {
+        "n": len(ordered),
+        "expected": expected,
+        "p50_ms": round(statistics.median(ordered) * 1000, 1),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 1),
+        "max_ms": round(ordered[-1] * 1000, 1),
+    }
+
+
+def send_reminders(args, options):
+    for _ in range(args.reminders):
+        send_email_reminder.apply_async((time.time(), args.mail_seconds), **options)
+        time.sleep(1 / args.reminder_rate)
+
+
+def run(mode, port, args):
+    client = _redis()
+    client.flushall()
+    workers = start_workers(mode, port)
+    # this process is configured with the production routes; the shared worker only reads "celery"
+    options = {"queue": "celery"} if mode == "shared" else {}
+    try:
+        send_email_reminder.apply_async((time.time(), 0), **options)
+        if not collect(client, 1, timeout=60):
+            sys.exit(f"{mode} workers did not start")
+        send_reminders(args, options)
+        idle = collect(client, args.reminders, timeout=60)
+
+        for _ in range(args.reports):
+            send_monthly_report.apply_async((args.report_seconds,), **options)
+        send_reminders(args, options)
+        busy = collect(client, args.reminders, timeout=60 + args.reports * args.report_seconds)
+    finally:
+        stop_workers(workers)
+        client.flushall()
+    return {"idle": summarize(idle, args.reminders), "during_reports": summarize(busy, args.reminders)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--reports", type=int, default=40, help="report tasks in the burst")
+    parser.add_argument("--report-seconds", type=float, default=0.5, help="run time of one report task")
+    parser.add_argument("--reminders", type=int, default=60, help="reminders sent per phase")
+    parser.add_argument("--reminder-rate", type=float, default=20.0, help="reminders sent per second")
+    parser.add_argument("--mail-seconds", type=float, default=0.02, help="run time of one reminder")
+    args = parser.parse_args()
+
+    from loadtest import start_redis
+    port, stop_redis = start_redis()
+    os.environ["BENCH_REDIS_PORT"] = str(port)
+    bench.conf.broker_url = f"redis://127.0.0.1:{port}/0"
+    try:
+        results = {mode: run(mode, port, args) for mode in ("shared", "split")}
+    finally:
+        stop_redis()
+    print(json.dumps({"args": vars(args), "reminder_latency": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Cold-start import time of the web and worker entry points, checked against a budget.
+
+    python benchmarks/import_time.py                     # both profiles, default budgets
+    python benchmarks/import_time.py --web-budget-ms 900 --repeat 7
+
+Each profile is imported in a fresh interpreter under ``python -X importtime`` with a
+throwaway SQLite database, so nothing is cached between runs. The median cumulative
+import time is compared with the budget, the packages with the most import self time
+are listed, and the worker is also checked for modules that belong only to the web
+process. Exits 1 when a budget is exceeded or a web-only module leaks into the worker.
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+ENTRY_POINTS = {"web": "main", "worker": "celery_app"}
+WEB_ONLY = ("flask_restful", "flask_jwt_extended", "flask_cors", "applications.profiler",
+            "applications.quiz_api", "applications.report_api", "applications.login_api")
+
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( +)(\S+)")
+
+
+def import_once(module, env):
+    """Cumulative microseconds for ``module`` and the self time of every import under it."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    rows = [(m.group(4), int(m.group(1)), int(m.group(2)), len(m.group(3)))
+            for m in map(_LINE.match, proc.stderr.splitlines()) if m]
+    end = next(i for i, row in enumerate(rows) if row[0] == module)
+    # children are printed before their parent, indented deeper
+    start = end
+    while start > 0 and rows[start - 1][3] > rows[end][3]:
+        start -= 1
+    return rows[end][2], [(name, self_us) for name, self_us, _, _ in rows[start:end + 1]]
+
+
+def measure(profile, repeat, top, env):
+    module = ENTRY_POINTS[profile]
+    totals, by_package, modules = [], {}, set()
+    for _ in range(repeat):
+        total, subtree = import_once(module, env)
+        totals.append(total)
+        packages = {}
+        for name, self_us in subtree:
+            modules.add(name)
+            package = name.split(".")[0]
+            packages[package] = packages.get(package, 0) + self_us
+        for package, us in packages.items():
+            by_package.setdefault(package, []).append(us)
+    ranked = sorted(((statistics.median(v), k) for k, v in by_package.items()), reverse=True)[:top]
+    return {
+        "module": module,
+        "median_ms": round(statistics.median(totals) / 1000, 1),
+        "min_ms": round(min(totals) / 1000, 1),
+        "max_ms": round(max(totals) / 1000, 1),
+        "heaviest_packages": [[name, round(us / 1000, 1)] for us, name in ranked],
+        "modules": len(modules),
+        "web_only_loaded": sorted(m for m in modules if m in WEB_ONLY) if profile == "worker" else [],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time budget check for the web and worker processes")
+    parser.add_argument("--profile", choices=sorted(ENTRY_POINTS), action="append",
+                        help="profile to measure (repeatable); defaults to all")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=8, help="packages to report, by total import self time")
+    parser.add_argument("--web-budget-ms", type=float, default=float(os.getenv("WEB_IMPORT_BUDGET_MS", 1500)))
+    parser.add_argument("--worker-budget-ms", type=float, default=float(os.getenv("WORKER_IMPORT_BUDGET_MS", 1200)))
+    args = parser.parse_args()
+
+    budgets = {"web": args.web_budget_ms, "worker": args.worker_budget_ms}
+    failed = False
+    result = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'import.sqlite3')}")
+        for profile in args.profile or sorted(ENTRY_POINTS):
+            stats = measure(profile, args.repeat, args.top, env)
+            stats["budget_ms"] = budgets[profile]
+            stats["within_budget"] = stats["median_ms"] <= budgets[profile] and not stats["web_only_loaded"]
+            failed |= not stats["within_budget"]
+            result[profile] = stats
+    print(json.dumps(result, indent=2, sort_keys=True))
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,350 @@
+"""End-to-end load test: boot main.py on a temp SQLite DB + local Redis, drive mixed traffic.
+
+    python benchmarks/loadtest.py --clients 50 --duration 60 --output results/run.json
+    python benchmarks/loadtest.py --compare results/before.json results/after.json
+
+Redis comes from a throwaway ``redis-server`` when one is on PATH, otherwise from
+``fakeredis.TcpFakeServer`` (pip install fakeredis). The app is served by a threaded
+WSGI server on an ephemeral port and every client speaks real HTTP to it.
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+PASSWORD = "loadtest-password"
+
+# (route label, weight) for student clients; admins use ADMIN_MIX
+STUDENT_MIX = [
+    ("POST /api/login", 2),
+    ("GET /api/subject", 15),
+    ("GET /api/chapter", 12),
+    ("GET /api/quiz", 12),
+    ("GET /api/question", 20),
+    ("POST /api/submit-quiz", 10),
+    ("GET /api/submit-quiz", 5),
+    ("GET /api/quiz/<id>/leaderboard", 6),
+    ("GET /api/my-reports", 6),
+]
+ADMIN_MIX = [
+    ("GET /api/admin-stats", 10),
+    ("GET /api/submission-counts", 10),
+    ("GET /api/quiz-completion", 10),
+    ("GET /api/admin-user-details", 3),
+    ("GET /api/admin-quiz-data", 3),
+    ("GET /api/users", 4),
+]
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_redis():
+    """Return (port, stop_fn) for a local Redis stand-in."""
+    port = _free_port()
+    if shutil.which("redis-server"):
+        proc = subprocess.Popen(
+            ["redis-server", "--port", str(port), "--save", "", "--appendonly", "no"],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        for _ in range(50):
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+                break
+            except OSError:
+                time.sleep(0.1)
+        return port, proc.terminate
+    try:
+        from fakeredis import TcpFakeServer
+    except ImportError:
+        sys.exit("Need either redis-server on PATH or `pip install fakeredis` for the Redis stand-in")
+    server = TcpFakeServer(("127.0.0.1", port), server_type="redis")
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return port, server.shutdown
+
+
+def boot_app(db_path, redis_port):
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ["REDIS_IP"] = "127.0.0.1"
+    os.environ["REDIS_PORT"] = str(redis_port)
+    sys.path.insert(0, BACKEND_DIR)
+    import main as app_module
+    from applications.factory import init_db
+    init_db(app_module.app)
+    return app_module
+
+
+def seed(app_module, args):
+    from flask_bcrypt import generate_password_hash
+    from applications.model import db, User, Subject, Chapter, Quiz, Question
+
+    rng = random.Random(args.seed)
+    with app_module.app.app_context():
+        password_hash = generate_password_hash(PASSWORD, args.bcrypt_rounds).decode()
+        users = [
+            User(email=f"load{i}@example.com", full_name=f"Load User {i}", password=password_hash, status="active")
+            for i in range(args.users)
+        ]
+        db.session.add_all(users)
+        app_module.add_admin()
+
+        quiz_ids = []
+        for s in range(args.subjects):
+            subject = Subject(name=f"Subject {s}", description="load test subject")
+            db.session.add(subject)
+            db.session.flush()
+            for c in range(args.chapters):
+                chapter = Chapter(name=f"Chapter {s}.{c}", description="load test chapter", subject_id=subject.id)
+                db.session.add(chapter)
+                db.session.flush()
+                for _ in range(args.quizzes):
+                    quiz = Quiz(
+                        title=f"Quiz {s}.{c}.{len(quiz_ids)}", chapter_id=chapter.id,
+                        date_of_quiz=date.today() - timedelta(days=7), last_date=date.today() + timedelta(days=7),
+                        time_duration="00:30", num_questions=args.questions,
+                    )
+                    db.session.add(quiz)
+                    db.session.flush()
+                    quiz_ids.append(quiz.id)
+                    for q_no in range(1, args.questions + 1):
+                        db.session.add(Question(
+                            quiz_id=quiz.id, q_no=q_no, title=f"Q{q_no}", question_statement="Pick one",
+                            option1="a", option2="b", option3="c", option4="d",
+                            correct_option=rng.randint(1, 4), answer_slot=q_no - 1,
+                        ))
+                chapter.n_quizzes = args.quizzes
+                chapter.n_questions = args.quizzes * args.questions
+        db.session.commit()
+
+        questions = defaultdict(list)
+        for qid, quiz_id in db.session.query(Question.id, Question.quiz_id):
+            questions[quiz_id].append(qid)
+        subject_ids = [s.id for s in Subject.query.all()]
+        chapter_ids = [c.id for c in Chapter.query.all()]
+    return {
+        "emails": [f"load{i}@example.com" for i in range(args.users)],
+        "quiz_ids": quiz_ids,
+        "questions": dict(questions),
+        "subject_ids": subject_ids,
+        "chapter_ids": chapter_ids,
+    }
+
+
+class Client:
+    def __init__(self, port, data, rng, stats, admin):
+        self.port = port
+        self.data = data
+        self.rng = rng
+        self.stats = stats
+        self.admin = admin
+        self.token = None
+        self.conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+
+    def request(self, label, method, path, body=None):
+        headers = {"Content-Type": "application/json"}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        payload = json.dumps(body) if body is not None else None
+        start = time.perf_counter()
+        try:
+            self.conn.request(method, path, body=payload, headers=headers)
+            response = self.conn.getresponse()
+            raw = response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            self.conn.close()
+            self.conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=60)
+            raw, status = b"", 599
+        self.stats.record(label, time.perf_counter() - start, status)
+        try:
+            return status, json.loads(raw) if raw else None
+        except ValueError:
+            return status, None
+
+    def login(self):
+        email = "quizapp.mad2@gmail.com" if self.admin else self.rng.choice(self.data["emails"])
+        password = "admin" if self.admin else PASSWORD
+        status, body = self.request("POST /api/login", "POST", "/api/login", {"email": email, "password": password})
+        if status == 200 and body:
+            self.token = body.get("token")
+
+    def step(self):
+        mix = ADMIN_MIX if self.admin else STUDENT_MIX
+        label = self.rng.choices([m[0] for m in mix], weights=[m[1] for m in mix])[0]
+        quiz_id = self.rng.choice(self.data["quiz_ids"])
+        if label == "POST /api/login":
+            return self.login()
+        if label == "POST /api/submit-quiz":
+            answers = [{"question_id": q, "selected_option": self.rng.randrange(4)} for q in self.data["questions"][quiz_id]]
+            return self.request(label, "POST", "/api/submit-quiz", {"quizId": quiz_id, "answers": answers})
+        paths = {
+            "GET /api/chapter": f"/api/chapter?subject_id={self.rng.choice(self.data['subject_ids'])}",
+            "GET /api/quiz": f"/api/quiz?chapter_id={self.rng.choice(self.data['chapter_ids'])}",
+            "GET /api/question": f"/api/question?quiz_id={quiz_id}",
+            "GET /api/submit-quiz": f"/api/submit-quiz?quiz_id={quiz_id}",
+            "GET /api/quiz/<id>/leaderboard": f"/api/quiz/{quiz_id}/leaderboard",
+        }
+        method, path = label.split(" ", 1)
+        return self.request(label, method, paths.get(label, path))
+
+
+class Stats:
+    def __init__(self, measure_from):
+        self.measure_from = measure_from
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def record(self, label, seconds, status):
+        if time.monotonic() < self.measure_from:
+            return
+        with self.lock:
+            self.latencies[label].append(seconds)
+            if status >= 400:
+                self.errors[label] += 1
+
+    def summary(self, elapsed):
+        routes = {}
+        total = 0
+        for label in sorted(self.latencies):
+            values = sorted(self.latencies[label])
+            total += len(values)
+            routes[label] = {
+                "count": len(values),
+                "errors": self.errors[label],
+                "throughput_rps": round(len(values) / elapsed, 2),
+                "mean_ms": round(1000 * sum(values) / len(values), 2),
+                "p50_ms": _percentile(values, 50),
+                "p95_ms": _percentile(values, 95),
+                "p99_ms": _percentile(values, 99),
+                "max_ms": round(1000 * values[-1], 2),
+            }
+        return total, routes
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values) + 0.5) - 1))
+    return round(1000 * sorted_values[index], 2)
+
+
+def run(args):
+    tmp = tempfile.mkdtemp(prefix="quiz-loadtest-")
+    redis_port, stop_redis = start_redis()
+    try:
+        app_module = boot_app(os.path.join(tmp, "loadtest.sqlite3"), redis_port)
+        data = seed(app_module, args)
+
+        from werkzeug.serving import make_server, WSGIRequestHandler
+        WSGIRequestHandler.protocol_version = "HTTP/1.1"
+        port = _free_port()
+        server = make_server("127.0.0.1", port, app_module.app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        stats = Stats(measure_from=float("inf"))
+        started = threading.Event()
+
+        def client_loop(index):
+            rng = random.Random(args.seed * 1000 + index)
+            client = Client(port, data, rng, stats, admin=index < args.admins)
+            client.login()
+            started.wait()
+            while time.monotonic() < deadline:
+                client.step()
+                if args.think_ms:
+                    time.sleep(rng.uniform(0, 2 * args.think_ms) / 1000)
+
+        threads = [threading.Thread(target=client_loop, args=(i,), daemon=True) for i in range(args.clients)]
+        for t in threads:
+            t.start()
+        deadline = time.monotonic() + args.warmup + args.duration
+        stats.measure_from = time.monotonic() + args.warmup
+        started.set()
+        for t in threads:
+            t.join()
+        server.shutdown()
+
+        total, routes = stats.summary(args.duration)
+        return {
+            "config": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+            "duration_s": args.duration,
+            "total_requests": total,
+            "throughput_rps": round(total / args.duration, 2),
+            "routes": routes,
+        }
+    finally:
+        stop_redis()
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def compare(before_path, after_path, threshold):
+    with open(before_path) as f:
+        before = json.load(f)
+    with open(after_path) as f:
+        after = json.load(f)
+    regressions = 0
+    print(f"{'route':40} {'p50':>18} {'p95':>18} {'p99':>18}")
+    for route in sorted(set(before["routes"]) | set(after["routes"])):
+        b, a = before["routes"].get(route), after["routes"].get(route)
+        if not b or not a:
+            print(f"{route:40} {'only in ' + ('after' if a else 'before'):>18}")
+            continue
+        cells = []
+        for key in ("p50_ms", "p95_ms", "p99_ms"):
+            change = (a[key] - b[key]) / b[key] if b[key] else 0.0
+            flag = " !" if key == "p95_ms" and change > threshold else ""
+            regressions += bool(flag)
+            cells.append(f"{b[key]:.1f}->{a[key]:.1f}{flag}")
+        print(f"{route:40} " + " ".join(f"{c:>18}" for c in cells))
+    print(f"throughput: {before['throughput_rps']} -> {after['throughput_rps']} req/s")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mixed-traffic load test for the quiz backend")
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--admins", type=int, default=2, help="how many of the clients act as admins")
+    parser.add_argument("--duration", type=float, default=30, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=5, help="unmeasured seconds before measuring")
+    parser.add_argument("--think-ms", type=float, default=0, help="mean pause between a client's requests")
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--subjects", type=int, default=5)
+    parser.add_argument("--chapters", type=int, default=4, help="chapters per subject")
+    parser.add_argument("--quizzes", type=int, default=5, help="quizzes per chapter")
+    parser.add_argument("--questions", type=int, default=10, help="questions per quiz")
+    parser.add_argument("--bcrypt-rounds", type=int, default=12)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="write the JSON result here as well as stdout")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="diff two result files")
+    parser.add_argument("--threshold", type=float, default=0.10, help="p95 increase flagged as regression")
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(1 if compare(*args.compare, args.threshold) else 0)
+
+    result = run(args)
+    text = json.dumps(result, indent=2, sort_keys=True)
+    print(text)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
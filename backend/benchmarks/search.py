@@ -0,0 +1,153 @@
+"""Full-text search at scale: index build time, index size and query latency vs LIKE.
+
+    python benchmarks/search.py --questions 1000000 --repeat 20
+
+Builds a throwaway SQLite database with the searchable tables, fills it, creates the
+FTS5 indexes with ``create_search_index`` (the same code ``init_db`` runs), then times
+the ranked search the API uses against a ``LIKE '%term%'`` scan. Also reports the
+per-row cost of keeping the index in sync through the triggers. Prints a JSON summary.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+from sqlalchemy import create_engine, text
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from applications.search import INDEXES, create_search_index, search  # noqa: E402
+
+CHUNK = 20000
+WORDS = ("heat", "entropy", "energy", "force", "mass", "velocity", "acceleration", "vector", "matrix",
+         "integral", "derivative", "protein", "enzyme", "cell", "atom", "molecule", "reaction", "equilibrium",
+         "pressure", "volume", "current", "voltage", "resistance", "wave", "frequency", "photon", "electron",
+         "orbit", "gravity", "momentum", "torque", "friction", "density", "circuit", "magnet", "field")
+QUERIES = {
+    "common_word": "energy",
+    "prefix": "equil",
+    "two_words": "heat engine",
+    "synced_rows": "zymurgy edited",
+}
+SCHEMA = (
+    "CREATE TABLE subject (id INTEGER PRIMARY KEY, name TEXT, description TEXT)",
+    "CREATE TABLE chapter (id INTEGER PRIMARY KEY, name TEXT, description TEXT, subject_id INTEGER)",
+    "CREATE TABLE quiz (id INTEGER PRIMARY KEY, title TEXT, remarks TEXT, chapter_id INTEGER)",
+    "CREATE TABLE question (id INTEGER PRIMARY KEY, title TEXT, question_statement TEXT, quiz_id INTEGER)",
+    'CREATE TABLE "user" (id INTEGER PRIMARY KEY, full_name TEXT, email TEXT)',
+)
+
+
+def sentence(rng, n):
+    return " ".join(rng.choice(WORDS) for _ in range(n))
+
+
+def populate(connection, n_questions, seed):
+    rng = random.Random(seed)
+    n_quizzes = max(n_questions // 20, 1)
+    n_chapters = max(n_quizzes // 10, 1)
+    n_subjects = max(n_chapters // 10, 1)
+    tables = {
+        "subject": ((i, f"Subject {i} {sentence(rng, 2)}", sentence(rng, 12)) for i in range(1, n_subjects + 1)),
+        "chapter": ((i, f"Chapter {i} {sentence(rng, 2)}", sentence(rng, 12), rng.randint(1, n_subjects))
+                    for i in range(1, n_chapters + 1)),
+        "quiz": ((i, f"Quiz {i} {sentence(rng, 3)}", sentence(rng, 8), rng.randint(1, n_chapters))
+                 for i in range(1, n_quizzes + 1)),
+        "question": ((i, sentence(rng, 4), sentence(rng, 20), rng.randint(1, n_quizzes))
+                     for i in range(1, n_questions + 1)),
+        "user": ((i, f"User {i} {rng.choice(WORDS)}", f"user{i}@example.com") for i in range(1, n_quizzes + 1)),
+    }
+    raw = connection.connection.driver_connection
+    for table, rows in tables.items():
+        width = {"subject": 3, "chapter": 4, "quiz": 4, "question": 4, "user": 3}[table]
+        sql = f'INSERT INTO "{table}" VALUES ({", ".join("?" * width)})'
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= CHUNK:
+                raw.executemany(sql, batch)
+                batch = []
+        raw.executemany(sql, batch)
+
+
+def latencies(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        "p50_ms": round(statistics.median(samples), 2),
+        "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 2),
+    }
+
+
+def like_scan(connection, query):
+    terms = query.split()
+    where = " AND ".join(f"(title LIKE :t{i} OR question_statement LIKE :t{i})" for i in range(len(terms)))
+    params = {f"t{i}": f"%{term}%" for i, term in enumerate(terms)}
+    return connection.execute(text(f"SELECT id FROM question WHERE {where} LIMIT 21"), params).fetchall()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--questions", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "search.sqlite3")
+        engine = create_engine(f"sqlite:///{path}")
+        results = {"questions": args.questions}
+        with engine.begin() as connection:
+            for statement in SCHEMA:
+                connection.execute(text(statement))
+            populate(connection, args.questions, args.seed)
+        size_before = os.path.getsize(path)
+
+        start = time.perf_counter()
+        with engine.begin() as connection:
+            create_search_index(connection)
+        results["index_build_seconds"] = round(time.perf_counter() - start, 2)
+        with engine.begin() as connection:
+            connection.execute(text("VACUUM"))
+        results["db_bytes_without_index"] = size_before
+        results["db_bytes_with_index"] = os.path.getsize(path)
+
+        # incremental sync: 1000 single-row inserts and title updates through the triggers
+        with engine.begin() as connection:
+            last_id = connection.execute(text("SELECT MAX(id) FROM question")).scalar()
+            start = time.perf_counter()
+            for i in range(1000):
+                connection.execute(text("INSERT INTO question (title, question_statement, quiz_id) VALUES (:t, :s, 1)"),
+                                   {"t": f"zymurgy {i}", "s": "new question body"})
+            results["trigger_insert_us_per_row"] = round((time.perf_counter() - start) * 1000, 1)
+            start = time.perf_counter()
+            connection.execute(text("UPDATE question SET title = title || ' edited' WHERE id > :last"), {"last": last_id})
+            results["trigger_update_us_per_row"] = round((time.perf_counter() - start) * 1000, 1)
+
+        kinds = [kind for kind in INDEXES if kind != "user"]
+        results["queries"] = {}
+        with engine.connect() as connection:
+            for label, query in QUERIES.items():
+                first = search(connection, query, kinds, limit=21)
+                results["queries"][label] = {
+                    "q": query,
+                    "first_page_hits": len(first),
+                    "fts": latencies(lambda: search(connection, query, kinds, limit=21), args.repeat),
+                    "fts_page_10": latencies(lambda: search(connection, query, kinds, limit=21, offset=200),
+                                             args.repeat),
+                    # unranked and questions only, so this is a lower bound for LIKE
+                    "like_questions_only": latencies(lambda: like_scan(connection, query), args.repeat),
+                }
+        engine.dispose()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+"""Celery entry point.
+
+Development, one worker for every queue plus the scheduler::
+
+    celery -A celery_app worker -B --loglevel=info
+
+Production, one worker per queue (``CELERY_WORKER_PROFILE`` picks the queue,
+concurrency and prefetch from ``applications.worker.WORKER_PROFILES``) and a
+single beat::
+
+    CELERY_WORKER_PROFILE=reminders celery -A celery_app worker -n reminders@%h
+    CELERY_WORKER_PROFILE=reports celery -A celery_app worker -n reports@%h
+    CELERY_WORKER_PROFILE=ingestion celery -A celery_app worker -n ingestion@%h
+    CELERY_WORKER_PROFILE=maintenance celery -A celery_app worker -n maintenance@%h
+    celery -A celery_app beat
+
+Builds the worker-profile app, which leaves out the API modules, request hooks
+and JWT/CORS setup the web process needs.
+"""
+from applications.factory import create_app
+from applications.worker import celery  # noqa: F401
+
+app = create_app(profile="worker")
+
+# registers the tasks and the periodic schedule
+import applications.task  # noqa: E402,F401
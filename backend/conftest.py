@@ -0,0 +1,91 @@
+"""pytest fixtures: apps on a throwaway SQLite file with an in-process cache and leaderboard.
+
+Install ``requirements-test.txt`` first. Redis-backed code (attempts, admission,
+leaderboards, metrics, report versions) runs against fakeredis with lupa for the
+Lua scripts; without them those tests fail with an ImportError instead of skipping.
+"""
+import json
+from datetime import date
+
+import pytest
+from flask_jwt_extended import create_access_token
+
+from applications.extensions import redis_store
+from applications.factory import create_app, init_db
+from applications.metrics import metrics
+from applications.model import db, User, Subject, Chapter, Quiz, Question
+
+_fake_redis = None
+
+
+def _redis():
+    # one client for the whole session: registered Lua scripts stay bound to it
+    global _fake_redis
+    if _fake_redis is None:
+        import fakeredis
+        import lupa  # noqa: F401  fakeredis runs EVAL through it
+        _fake_redis = fakeredis.FakeRedis()
+    _fake_redis.flushall()
+    return _fake_redis
+
+
+def _make_app(tmp_path, profile):
+    client = _redis()
+    app = create_app({
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'test.sqlite3'}",
+        "CACHE_TYPE": "SimpleCache",
+        "LEADERBOARD_BACKEND": "memory",
+    }, profile=profile)
+    redis_store.client = client
+    with metrics.lock:
+        # requests in earlier tests staged metrics that would be flushed into this test's Redis
+        metrics.counters, metrics.histograms, metrics.help = {}, {}, {}
+    init_db(app)
+    return app
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = _make_app(tmp_path, "worker")
+    with app.app_context():
+        yield app
+
+
+@pytest.fixture
+def web_app(tmp_path):
+    app = _make_app(tmp_path, "web")
+    with app.app_context():
+        yield app
+
+
+def make_student(email="student@example.com"):
+    user = User(email=email, full_name="Student", password="x", status="active")
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def make_quiz(time_duration="00:10", n_questions=3, correct_option=2):
+    """A quiz open today whose questions all have ``correct_option`` (1-based) and an answer slot."""
+    subject = Subject(name=f"Subject {Subject.query.count()}", description="d")
+    db.session.add(subject)
+    db.session.flush()
+    chapter = Chapter(name=f"Chapter {subject.id}", description="d", subject_id=subject.id)
+    db.session.add(chapter)
+    db.session.flush()
+    quiz = Quiz(title="Quiz", chapter_id=chapter.id, date_of_quiz=date.today(), last_date=date.today(),
+                time_duration=time_duration)
+    db.session.add(quiz)
+    db.session.flush()
+    for i in range(n_questions):
+        db.session.add(Question(quiz_id=quiz.id, q_no=i + 1, title=f"Q{i + 1}", question_statement="s",
+                                option1="a", option2="b", option3="c", option4="d",
+                                correct_option=correct_option, answer_slot=i))
+    db.session.commit()
+    return quiz
+
+
+def auth_headers(user_id, role="user"):
+    token = create_access_token(identity=json.dumps({"id": user_id, "role": role}))
+    return {"Authorization": f"Bearer {token}"}
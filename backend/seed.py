@@ -0,0 +1,210 @@
+"""Deterministic bulk seeder for profiling-sized datasets.
+
+    python seed.py --database sqlite:////tmp/big.sqlite3                # full scale
+    python seed.py --database sqlite:////tmp/small.sqlite3 --scale 0.01 # 1% of it
+
+Everything is drawn from one seeded RNG, so the same arguments always produce the
+same rows. Rows are written with chunked executemany Core inserts, one transaction
+per table, straight into an empty database (ids are assigned here, not by SQLite).
+Quiz popularity and user activity follow Zipf-like distributions (--quiz-skew,
+--user-skew) so there are hot quizzes and power users. Every submission falls inside
+its quiz's open window (``date_of_quiz`` to ``last_date``). Afterwards the derived
+data is rebuilt like after an upgrade: rollups, mastery profiles, the columnar
+snapshot and (when Redis is reachable) the leaderboards.
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import date, datetime, time as dtime, timedelta
+
+import numpy as np
+
+CHUNK = 50_000
+QUIZ_OPEN_DAYS = 30
+
+
+def zipf_weights(n, skew, rng):
+    """Zipf probabilities over n items, shuffled so the hot ids are spread out."""
+    if skew <= 0:
+        return np.full(n, 1.0 / n)
+    weights = 1.0 / np.arange(1, n + 1) ** skew
+    rng.shuffle(weights)
+    return weights / weights.sum()
+
+
+def insert_chunks(conn, table, rows_iter, label):
+    start, total = time.perf_counter(), 0
+    for rows in rows_iter:
+        if rows:
+            conn.execute(table.insert(), rows)
+            total += len(rows)
+    print(f"  {label}: {total:,} rows in {time.perf_counter() - start:.1f}s", flush=True)
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database", help="SQLAlchemy URL; defaults to the app's DATABASE_URL")
+    parser.add_argument("--seed", type=int, default=2024)
+    parser.add_argument("--scale", type=float, default=1.0, help="multiplier for every count below")
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--subjects", type=int, default=100)
+    parser.add_argument("--chapters", type=int, default=1_000)
+    parser.add_argument("--quizzes", type=int, default=20_000)
+    parser.add_argument("--questions-per-quiz", type=int, default=10)
+    parser.add_argument("--submissions", type=int, default=1_000_000)
+    parser.add_argument("--quiz-skew", type=float, default=1.1, help="Zipf exponent for quiz popularity (0 = uniform)")
+    parser.add_argument("--user-skew", type=float, default=0.9, help="Zipf exponent for user activity (0 = uniform)")
+    parser.add_argument("--days", type=int, default=365, help="quizzes open within this many days before --end-date")
+    parser.add_argument("--end-date", default="2026-01-01", help="last day of generated activity (fixed for reproducibility)")
+    parser.add_argument("--password", default="password", help="shared password for all seeded users")
+    parser.add_argument("--bcrypt-rounds", type=int, default=4)
+    parser.add_argument("--no-json-answers", action="store_true", help="write only the packed answer columns")
+    args = parser.parse_args()
+
+    if args.database:
+        os.environ["DATABASE_URL"] = args.database
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from flask_bcrypt import generate_password_hash
+    from applications.factory import create_app, init_db
+    from applications.model import db, User, Subject, Chapter, Quiz, Question, QuizSubmission
+    from applications.leaderboard import leaderboard
+    from applications.progress import rebuild_progress
+    from applications.rollups import rebuild_rollups
+    from applications.snapshot import refresh_snapshot
+
+    scaled = lambda n: max(1, int(n * args.scale))
+    n_users, n_subjects = scaled(args.users), scaled(args.subjects)
+    n_chapters, n_quizzes = max(scaled(args.chapters), n_subjects), max(scaled(args.quizzes), scaled(args.chapters))
+    n_submissions, q = scaled(args.submissions), args.questions_per_quiz
+    end = datetime.combine(date.fromisoformat(args.end_date), dtime(23, 59))
+    rng = np.random.default_rng(args.seed)
+
+    app = create_app(profile="worker")
+    init_db(app)
+    with app.app_context():
+        if User.query.first() or Quiz.query.first():
+            sys.exit("Refusing to seed a non-empty database; point --database at a fresh file")
+        print(f"Seeding {n_users:,} users, {n_subjects:,} subjects, {n_chapters:,} chapters, "
+              f"{n_quizzes:,} quizzes x {q} questions, {n_submissions:,} submissions", flush=True)
+        started = time.perf_counter()
+        password_hash = generate_password_hash(args.password, args.bcrypt_rounds).decode()
+
+        chapter_subject = rng.integers(0, n_subjects, n_chapters)
+        chapter_subject[:n_subjects] = np.arange(n_subjects)  # every subject gets a chapter
+        quiz_chapter = rng.integers(0, n_chapters, n_quizzes)
+        quiz_chapter[:n_chapters] = np.arange(n_chapters)
+        open_days_ago = rng.integers(0, args.days, n_quizzes)
+        quiz_open = np.array([end.date() - timedelta(days=int(d)) for d in open_days_ago])
+        answer_key = rng.integers(0, 4, (n_quizzes, q), dtype=np.uint8)
+        ability = rng.beta(4, 2, n_users)
+
+        with db.engine.begin() as conn:
+            conn.exec_driver_sql("PRAGMA synchronous=OFF")
+
+            def users():
+                statuses = np.where(rng.random(n_users) < 0.95, "active", "pending")
+                reminders = rng.integers(6, 23, n_users)
+                for lo in range(0, n_users, CHUNK):
+                    yield [{
+                        "id": i + 1, "email": f"user{i}@seed.example", "password": password_hash,
+                        "full_name": f"Seed User {i}", "qualification": "B.Sc", "dob": date(2000, 1, 1),
+                        "status": str(statuses[i]), "last_seen": end - timedelta(hours=int(i % 720)),
+                        "reminder_time": dtime(int(reminders[i]), 0),
+                    } for i in range(lo, min(lo + CHUNK, n_users))]
+            insert_chunks(conn, User.__table__, users(), "users")
+
+            insert_chunks(conn, Subject.__table__, [[
+                {"id": i + 1, "name": f"Subject {i}", "description": f"Seeded subject {i}"}
+                for i in range(n_subjects)
+            ]], "subjects")
+
+            quizzes_per_chapter = np.bincount(quiz_chapter, minlength=n_chapters)
+            insert_chunks(conn, Chapter.__table__, [[
+                {"id": i + 1, "name": f"Chapter {i}", "description": f"Seeded chapter {i}",
+                 "subject_id": int(chapter_subject[i]) + 1,
+                 "n_quizzes": int(quizzes_per_chapter[i]), "n_questions": int(quizzes_per_chapter[i]) * q}
+                for i in range(n_chapters)
+            ]], "chapters")
+
+            insert_chunks(conn, Quiz.__table__, [[
+                {"id": i + 1, "title": f"Quiz {i}", "chapter_id": int(quiz_chapter[i]) + 1,
+                 "date_of_quiz": quiz_open[i], "last_date": quiz_open[i] + timedelta(days=QUIZ_OPEN_DAYS),
+                 "time_duration": "00:30", "remarks": None, "num_questions": q,
+                 "created_at": datetime.combine(quiz_open[i], dtime(9, 0))}
+                for i in range(lo, min(lo + CHUNK, n_quizzes))
+            ] for lo in range(0, n_quizzes, CHUNK)], "quizzes")
+
+            # question ids are quiz_index * q + slot + 1, which lets submissions compute them
+            insert_chunks(conn, Question.__table__, ([
+                {"id": i * q + s + 1, "quiz_id": i + 1, "q_no": s + 1, "title": f"Question {s + 1}",
+                 "question_statement": f"Seeded question {s + 1} of quiz {i}",
+                 "option1": "Option A", "option2": "Option B", "option3": "Option C", "option4": "Option D",
+                 "correct_option": int(answer_key[i, s]) + 1, "answer_slot": s}
+                for i in range(lo, min(lo + CHUNK // q, n_quizzes)) for s in range(q)
+            ] for lo in range(0, n_quizzes, CHUNK // q)), "questions")
+
+            quiz_p = zipf_weights(n_quizzes, args.quiz_skew, rng)
+            user_p = zipf_weights(n_users, args.user_skew, rng)
+            # a quiz takes submissions from midnight of date_of_quiz to the end of last_date, or until `end`
+            day_start = datetime.combine(end.date(), dtime(0, 0))
+            opens_before_end = open_days_ago * 86400 + int((end - day_start).total_seconds())
+            window = np.minimum(opens_before_end, (QUIZ_OPEN_DAYS + 1) * 86400 - 1)
+            all_quizzes = rng.choice(n_quizzes, n_submissions, p=quiz_p)
+            all_users = rng.choice(n_users, n_submissions, p=user_p)
+            before_end = opens_before_end[all_quizzes] - (rng.random(n_submissions) * window[all_quizzes]).astype(np.int64)
+            # ids follow time order, like real traffic
+            order = np.argsort(-before_end, kind="stable")
+            all_quizzes, all_users, before_end = all_quizzes[order], all_users[order], before_end[order]
+
+            def submissions():
+                for lo in range(0, n_submissions, CHUNK):
+                    n = min(CHUNK, n_submissions - lo)
+                    quiz_idx = all_quizzes[lo:lo + n]
+                    user_idx = all_users[lo:lo + n]
+                    key = answer_key[quiz_idx]
+                    correct = rng.random((n, q)) < ability[user_idx][:, None]
+                    wrong = (key + rng.integers(1, 4, (n, q), dtype=np.uint8)) % 4
+                    selected = np.where(correct, key, wrong).astype(np.uint8) + 1
+                    skipped = rng.random((n, q)) < 0.03
+                    selected[skipped] = 0
+                    correct &= ~skipped
+                    scores = correct.sum(axis=1)
+                    bitmaps = np.packbits(correct, axis=1)
+                    rows = []
+                    for r in range(n):
+                        base = int(quiz_idx[r]) * q + 1
+                        sel = selected[r]
+                        answers = [] if args.no_json_answers else [
+                            {"question_id": base + s, "selected_option": int(sel[s]) - 1 if sel[s] else None,
+                             "is_correct": bool(correct[r, s])}
+                            for s in range(q)
+                        ]
+                        rows.append({
+                            "id": lo + r + 1, "quiz_id": int(quiz_idx[r]) + 1, "user_id": int(user_idx[r]) + 1,
+                            "score": int(scores[r]), "total_questions": q,
+                            "submitted_at": end - timedelta(seconds=int(before_end[lo + r])),
+                            "answers": answers, "answers_packed": sel.tobytes(),
+                            "correct_bitmap": bitmaps[r].tobytes(),
+                        })
+                    yield rows
+            insert_chunks(conn, QuizSubmission.__table__, submissions(), "submissions")
+
+        for label, rebuild in (("rollups", rebuild_rollups), ("mastery profiles", rebuild_progress),
+                               ("snapshot", lambda: refresh_snapshot(rebuild=True))):
+            step_start = time.perf_counter()
+            rebuild()
+            print(f"  {label} rebuilt in {time.perf_counter() - step_start:.1f}s", flush=True)
+        step_start = time.perf_counter()
+        try:
+            boards = leaderboard.rebuild()
+            print(f"  {boards:,} leaderboards rebuilt in {time.perf_counter() - step_start:.1f}s")
+        except Exception as e:
+            # leaderboards live in Redis, not in the seeded file; the rebuild_leaderboards task fills them later
+            print(f"  leaderboards not rebuilt (Redis unavailable: {e})")
+        print(f"Done in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
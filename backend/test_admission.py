@@ -0,0 +1,25 @@
+"""Token-bucket admission control (applications.admission)."""
+from applications.admission import admission
+from applications.config import admission_bucket
+from conftest import make_student, auth_headers
+
+
+def test_bucket_limits_come_from_the_environment(monkeypatch):
+    monkeypatch.setenv("ADMISSION_BROWSE_IP_RATE", "7")
+    monkeypatch.setenv("ADMISSION_BROWSE_IP_BURST", "900")
+    assert admission_bucket("BROWSE_IP", 50, 400) == (7.0, 900.0)
+    assert admission_bucket("BROWSE_USER", 5, 30) == (5.0, 30.0)
+
+
+def test_students_behind_one_address_share_the_ip_bucket(web_app, monkeypatch):
+    policies = dict(admission.policies)
+    policies["browse"] = {**policies["browse"], "user": (1, 100), "ip": (0.001, 4)}
+    monkeypatch.setattr(admission, "policies", policies)
+    client = web_app.test_client()
+    students = [make_student(f"s{i}@example.com") for i in range(3)]
+
+    codes = [client.get("/api/subject", headers=auth_headers(s.id)).status_code for s in students for _ in range(2)]
+    assert codes == [200, 200, 200, 200, 429, 429]
+
+    response = client.get("/api/subject", headers=auth_headers(students[0].id))
+    assert response.status_code == 429 and int(response.headers["Retry-After"]) >= 1
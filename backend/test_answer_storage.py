@@ -0,0 +1,70 @@
+"""Round trips through the packed answer columns (applications.answer_storage)."""
+import numpy as np
+
+from applications.answer_storage import encode_answers, decode_answers, decode_matrix
+
+# question_id -> answer_slot; slot 9 leaves a gap and needs a second bitmap byte
+SLOTS = {101: 0, 102: 1, 103: 2, 104: 9}
+SLOT_QUESTIONS = {slot: qid for qid, slot in SLOTS.items()}
+
+
+def answer(question_id, option, correct):
+    return {"question_id": question_id, "selected_option": option, "is_correct": correct}
+
+
+def test_round_trip_returns_every_slot_in_order():
+    answers = [answer(104, 3, True), answer(101, 2, True), answer(102, 0, False)]
+    packed, bitmap = encode_answers(answers, SLOTS)
+
+    assert len(packed) == 10 and len(bitmap) == 2
+    assert decode_answers(packed, bitmap, SLOT_QUESTIONS) == [
+        answer(101, 2, True),
+        answer(102, 0, False),
+        answer(103, None, False),  # never answered
+        answer(104, 3, True),
+    ]
+
+
+def test_skipped_and_out_of_range_options_decode_as_none():
+    answers = [answer(101, None, False), answer(102, 7, False), answer(103, "2", False)]
+    packed, bitmap = encode_answers(answers, SLOTS)
+
+    decoded = decode_answers(packed, bitmap, SLOT_QUESTIONS)
+    assert [a["selected_option"] for a in decoded] == [None, None, None, None]
+    assert not any(a["is_correct"] for a in decoded)
+
+
+def test_answers_without_a_slot_are_dropped():
+    packed, bitmap = encode_answers([answer(999, 1, True), answer(101, 1, True)], SLOTS)
+
+    decoded = decode_answers(packed, bitmap, SLOT_QUESTIONS)
+    assert 999 not in [a["question_id"] for a in decoded]
+    assert decoded[0] == answer(101, 1, True)
+
+
+def test_questions_added_after_the_submission_are_left_out():
+    packed, bitmap = encode_answers([answer(101, 0, True)], {101: 0, 102: 1})
+
+    decoded = decode_answers(packed, bitmap, {0: 101, 1: 102, 2: 105})
+    assert [a["question_id"] for a in decoded] == [101, 102]
+
+
+def test_quiz_without_slots_has_nothing_to_pack():
+    assert encode_answers([answer(101, 0, True)], {}) == (None, None)
+
+
+def test_decode_matrix_matches_decode_answers_and_pads_short_rows():
+    rows = [
+        encode_answers([answer(101, 1, True), answer(102, 3, False)], {101: 0, 102: 1}),
+        encode_answers([answer(101, 0, False), answer(103, 2, True)], {101: 0, 102: 1, 103: 2}),
+    ]
+    selected, correct = decode_matrix([p for p, _ in rows], [b for _, b in rows], 4)
+
+    np.testing.assert_array_equal(selected, [[2, 4, 0, 0], [1, 0, 3, 0]])
+    np.testing.assert_array_equal(correct, [[1, 0, 0, 0], [0, 0, 1, 0]])
+    for (packed, bitmap), sel_row, cor_row in zip(rows, selected, correct):
+        for decoded in decode_answers(packed, bitmap, {0: 101, 1: 102, 2: 103}):
+            slot = decoded["question_id"] - 101
+            option = decoded["selected_option"]
+            assert (0 if option is None else option + 1) == sel_row[slot]
+            assert decoded["is_correct"] == bool(cor_row[slot])
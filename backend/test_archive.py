@@ -0,0 +1,86 @@
+"""Moving old submissions to the archive (applications.archive) keeps every row exactly once."""
+from datetime import datetime, timedelta
+
+from sqlalchemy import func
+
+from applications.archive import archive_submissions, all_submissions
+from applications.leaderboard import leaderboard
+from applications.model import db, QuizSubmission, ArchivedSubmission, SubmissionSummary
+from applications.submissions import store_submission
+from conftest import make_quiz, make_student
+
+NOW = datetime(2026, 6, 15, 12, 0)
+CUTOFF = datetime(2026, 4, 1)
+
+
+def submit_history(quiz, users):
+    """Twelve submissions per user, one every ten days back from NOW, with varying scores."""
+    for n, user in enumerate(users):
+        for i in range(12):
+            answers = [{"question_id": q.id, "selected_option": 1 if (i + n + slot) % 3 else 0}
+                       for slot, q in enumerate(quiz.questions)]
+            store_submission(quiz, user.id, answers, submitted_at=NOW - timedelta(days=10 * i, hours=n))
+
+
+def snapshot():
+    rows = db.session.query(QuizSubmission.id, QuizSubmission.user_id, QuizSubmission.score,
+                            QuizSubmission.submitted_at).all()
+    return sorted(tuple(r) for r in rows)
+
+
+def test_archive_moves_each_old_row_exactly_once(app):
+    quiz = make_quiz(n_questions=4)
+    users = [make_student(f"s{i}@example.com") for i in range(3)]
+    submit_history(quiz, users)
+    before = snapshot()
+    old = [r for r in before if r[3] < CUTOFF]
+    assert old and len(old) < len(before)
+
+    assert archive_submissions(cutoff=CUTOFF, chunk=5) == len(old)
+
+    hot_ids = {i for i, in db.session.query(QuizSubmission.id)}
+    archived = db.session.query(ArchivedSubmission.id, ArchivedSubmission.user_id, ArchivedSubmission.score,
+                                ArchivedSubmission.submitted_at).all()
+    archived_ids = {r.id for r in archived}
+    assert not hot_ids & archived_ids
+    assert sorted(tuple(r) for r in archived) == old
+    assert sorted(hot_ids | archived_ids) == [r[0] for r in before]
+
+    union = all_submissions("id")
+    assert db.session.query(func.count()).select_from(union).scalar() == len(before)
+
+    # a second run finds nothing left to move
+    assert archive_submissions(cutoff=CUTOFF, chunk=5) == 0
+
+
+def test_summaries_account_for_every_archived_row(app):
+    quiz = make_quiz(n_questions=4)
+    users = [make_student(f"s{i}@example.com") for i in range(3)]
+    submit_history(quiz, users)
+    old = [r for r in snapshot() if r[3] < CUTOFF]
+
+    archive_submissions(cutoff=CUTOFF, chunk=4)
+
+    count, score_sum = db.session.query(func.sum(SubmissionSummary.count),
+                                        func.sum(SubmissionSummary.score_sum)).one()
+    assert (count, score_sum) == (len(old), sum(r[2] for r in old))
+    for summary in SubmissionSummary.query.all():
+        month = [r for r in old if r[1] == summary.user_id
+                 and (r[3].year, r[3].month) == (summary.period_start.year, summary.period_start.month)]
+        assert summary.count == len(month)
+        assert summary.best_score == max(r[2] for r in month)
+
+
+def test_leaderboard_rebuild_after_archiving_keeps_best_scores(app):
+    quiz = make_quiz(n_questions=4)
+    users = [make_student(f"s{i}@example.com") for i in range(3)]
+    submit_history(quiz, users)
+    # archiving commits and clears the session chunk by chunk, so keep plain ids
+    quiz_id, user_ids = quiz.id, [u.id for u in users]
+    best = {user_id: max(r[2] for r in snapshot() if r[1] == user_id) for user_id in user_ids}
+
+    archive_submissions(cutoff=CUTOFF)
+    leaderboard.clear(quiz_id)
+    assert leaderboard.rebuild() == 1
+
+    assert {user_id: leaderboard.standing(quiz_id, user_id)["score"] for user_id in user_ids} == best
@@ -0,0 +1,156 @@
+"""Server-side attempt deadlines (applications.attempts) and the timed submit path."""
+import time
+from datetime import datetime
+
+import pytest
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from applications.attempts import attempts, DEADLINES_KEY
+from applications.extensions import redis_store
+from applications.model import db, QuizSubmission
+from conftest import make_quiz, make_student, auth_headers
+
+
+def test_saves_are_accepted_until_deadline_plus_grace(app):
+    quiz, user = make_quiz("00:10"), make_student()
+    q1, q2 = (q.id for q in quiz.questions[:2])
+    t0 = time.time()
+
+    state = attempts.start(quiz, user.id, now=t0)
+    deadline = state["deadline"]
+    assert deadline == pytest.approx(t0 + 600)
+
+    assert attempts.save(quiz.id, user.id, {q1: 0}, now=deadline - 1) == 1
+    assert attempts.save(quiz.id, user.id, {q1: 1}, now=deadline + attempts.grace) == 2
+    assert attempts.save(quiz.id, user.id, {q2: 1}, now=deadline + attempts.grace + 1) == -2
+    assert attempts.get(quiz.id, user.id)["answers"] == {q1: 1}
+    assert not attempts.expired(state, now=deadline + attempts.grace)
+    assert attempts.expired(state, now=deadline + attempts.grace + 1)
+
+
+def test_starting_again_resumes_with_the_original_deadline(app):
+    quiz, user = make_quiz("00:10"), make_student()
+    t0 = time.time()
+
+    first = attempts.start(quiz, user.id, now=t0)
+    again = attempts.start(quiz, user.id, now=t0 + 300)
+    assert again["deadline"] == first["deadline"]
+    assert again["started_at"] == first["started_at"]
+
+
+def test_finish_after_the_deadline_grades_saved_answers_at_the_deadline(app):
+    quiz, user = make_quiz("00:10", correct_option=2), make_student()
+    q1, q2, _ = (q.id for q in quiz.questions)
+    t0 = time.time() - 3600
+
+    state = attempts.start(quiz, user.id, now=t0)
+    attempts.save(quiz.id, user.id, {q1: 1, q2: 0}, now=t0 + 10)
+    attempts.save(quiz.id, user.id, {q2: 1}, now=time.time())  # too late, dropped
+
+    submission, score, total = attempts.finish(quiz.id, user.id)
+    assert (score, total) == (1, 3)
+    cutoff = datetime.fromtimestamp(state["deadline"] + attempts.grace)
+    assert abs((submission.submitted_at - cutoff).total_seconds()) < 1
+    assert attempts.get(quiz.id, user.id) is None
+    assert attempts.finish(quiz.id, user.id) is None
+
+
+def test_sweeper_submits_only_expired_attempts(app):
+    quiz = make_quiz("00:10")
+    late, active = make_student("late@example.com"), make_student("active@example.com")
+    attempts.start(quiz, late.id, now=time.time() - 3600)
+    attempts.start(quiz, active.id)
+
+    assert attempts.finalize_expired() == 1
+    assert [s.user_id for s in QuizSubmission.query.all()] == [late.id]
+    assert redis_store.zrange(DEADLINES_KEY, 0, -1) == [f"{quiz.id}:{active.id}".encode()]
+    assert attempts.get(quiz.id, active.id) is not None
+
+
+def test_sweeper_keeps_attempts_another_finisher_has_claimed(app):
+    quiz, user = make_quiz("00:10"), make_student()
+    attempts.start(quiz, user.id, now=time.time() - 3600)
+    redis_store.hset(f"attempt:quiz:{quiz.id}:{user.id}", "finishing", 1)
+
+    assert attempts.finalize_expired() == 0
+    assert redis_store.zcard(DEADLINES_KEY) == 1
+
+    # the other finisher failed and released its claim: the next sweep submits it
+    redis_store.hdel(f"attempt:quiz:{quiz.id}:{user.id}", "finishing")
+    assert attempts.finalize_expired() == 1
+    assert redis_store.zcard(DEADLINES_KEY) == 0
+    assert QuizSubmission.query.count() == 1
+
+
+@pytest.mark.parametrize("option", ["1", 4, -1, 1.0, True])
+def test_save_rejects_malformed_options(app, option):
+    quiz, user = make_quiz("00:10"), make_student()
+    attempts.start(quiz, user.id)
+    with pytest.raises(ValueError):
+        attempts.save(quiz.id, user.id, {quiz.questions[0].id: option})
+
+
+def test_timed_quiz_submission_needs_a_started_attempt(web_app):
+    quiz, user = make_quiz("00:10", correct_option=2), make_student()
+    q1 = quiz.questions[0].id
+    client, headers = web_app.test_client(), auth_headers(user.id)
+    body = {"quizId": quiz.id, "answers": [{"question_id": q1, "selected_option": 1}]}
+
+    response = client.post("/api/submit-quiz", json=body, headers=headers)
+    assert response.status_code == 409
+    assert QuizSubmission.query.count() == 0
+
+    bad = {"quizId": quiz.id, "answers": [{"question_id": q1, "selected_option": "b"}]}
+    assert client.post("/api/submit-quiz", json=bad, headers=headers).status_code == 400
+
+    assert client.post(f"/api/quiz/{quiz.id}/attempt", headers=headers).status_code == 200
+    response = client.post("/api/submit-quiz", json=body, headers=headers)
+    assert response.status_code == 200
+    assert response.get_json()["score"] == 1
+
+
+def test_untimed_quiz_is_submitted_directly(web_app):
+    quiz, user = make_quiz("00:00", correct_option=2), make_student()
+    body = {"quizId": quiz.id, "answers": [{"question_id": quiz.questions[0].id, "selected_option": 1}]}
+
+    response = web_app.test_client().post("/api/submit-quiz", json=body, headers=auth_headers(user.id))
+    assert response.status_code == 200
+    assert response.get_json()["score"] == 1
+
+
+def test_untimed_quiz_has_no_attempts(web_app):
+    quiz, user = make_quiz("00:00"), make_student()
+
+    response = web_app.test_client().post(f"/api/quiz/{quiz.id}/attempt", headers=auth_headers(user.id))
+    assert response.status_code == 400
+    with pytest.raises(ValueError):
+        attempts.start(quiz, user.id)
+    assert redis_store.zcard(DEADLINES_KEY) == 0
+
+
+def test_untimed_submission_discards_a_leftover_attempt(web_app):
+    quiz, user = make_quiz("00:10", correct_option=2), make_student()
+    attempts.start(quiz, user.id, now=time.time() - 3600)
+    quiz.time_duration = "00:00"  # the time limit was removed while the attempt was open
+    db.session.commit()
+    body = {"quizId": quiz.id, "answers": [{"question_id": quiz.questions[0].id, "selected_option": 1}]}
+
+    response = web_app.test_client().post("/api/submit-quiz", json=body, headers=auth_headers(user.id))
+    assert response.status_code == 200
+    assert attempts.finalize_expired() == 0
+    assert [s.score for s in QuizSubmission.query.all()] == [1]
+
+
+def test_attempt_endpoints_answer_503_when_redis_fails(web_app, monkeypatch):
+    quiz, user = make_quiz("00:10"), make_student()
+    client, headers = web_app.test_client(), auth_headers(user.id)
+    client.post(f"/api/quiz/{quiz.id}/attempt", headers=headers)
+
+    def down(*args, **kwargs):
+        raise RedisConnectionError("Redis is down")
+    monkeypatch.setattr(attempts, "save", down)
+    monkeypatch.setattr(attempts, "finish", down)
+
+    body = {"answers": {str(quiz.questions[0].id): 1}}
+    assert client.patch(f"/api/quiz/{quiz.id}/attempt", json=body, headers=headers).status_code == 503
+    assert client.post(f"/api/quiz/{quiz.id}/attempt/finish", json=body, headers=headers).status_code == 503
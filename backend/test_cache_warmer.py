@@ -0,0 +1,30 @@
+"""The cache warmer writes each key with the timeout its endpoint uses (applications.cache_warmer)."""
+from applications.cache_warmer import warm_caches
+from applications.catalog import SUBJECTS_TIMEOUT, CHAPTERS_TIMEOUT, QUESTIONS_TIMEOUT
+from applications.extensions import cache
+from applications.quiz_bundle import bundle_key, BUNDLE_TIMEOUT
+from conftest import make_quiz
+
+
+def test_warmed_keys_keep_their_endpoint_timeouts(app, monkeypatch):
+    quiz = make_quiz()
+    written = {}
+    set_many = cache.set_many
+
+    def recording_set_many(mapping, timeout=None):
+        written.update(dict.fromkeys(mapping, timeout))
+        return set_many(mapping, timeout=timeout)
+
+    monkeypatch.setattr(cache, "set_many", recording_set_many)
+    report = warm_caches()
+
+    subject_id = quiz.chapter.subject_id
+    assert written == {
+        "subjects": SUBJECTS_TIMEOUT,
+        "chapters": CHAPTERS_TIMEOUT,
+        f"chapters_{subject_id}": CHAPTERS_TIMEOUT,
+        f"questions_{quiz.id}": QUESTIONS_TIMEOUT,
+        bundle_key(quiz.id): BUNDLE_TIMEOUT,
+    }
+    assert report["keys"] == report["warmed"] == 5
+    assert cache.get(f"questions_{quiz.id}") is not None
@@ -0,0 +1,59 @@
+"""Quiz leaderboards (applications.leaderboard) on the in-process backend."""
+import pytest
+
+from applications.leaderboard import leaderboard, MemoryLeaderboard, RedisLeaderboard
+from applications.model import db, QuizSubmission
+from applications.submissions import store_submission
+from conftest import make_quiz, make_student
+
+
+def submit(quiz, user, n_correct):
+    answers = [{"question_id": q.id, "selected_option": 1 if i < n_correct else 0}
+               for i, q in enumerate(quiz.questions)]
+    store_submission(quiz, user.id, answers)
+
+
+def test_lower_resubmission_keeps_the_best_score_and_ties_share_a_rank(app):
+    quiz = make_quiz(n_questions=4, correct_option=2)
+    a, b, c = (make_student(f"{name}@example.com") for name in "abc")
+    submit(quiz, a, 3)
+    submit(quiz, a, 1)
+    submit(quiz, b, 3)
+    submit(quiz, c, 4)
+
+    assert leaderboard.standing(quiz.id, a.id)["score"] == 3
+    assert [(row["rank"], row["score"]) for row in leaderboard.top(quiz.id, 3)] == [(1, 4), (2, 3), (2, 3)]
+
+
+def test_full_rebuild_clears_boards_of_quizzes_without_submissions(app):
+    kept, emptied = make_quiz(), make_quiz()
+    user = make_student()
+    submit(kept, user, 2)
+    submit(emptied, user, 3)
+    QuizSubmission.query.filter_by(quiz_id=emptied.id).delete()
+    db.session.commit()
+
+    assert leaderboard.rebuild() == 1
+    assert leaderboard.standing(kept.id, user.id)["score"] == 2
+    assert leaderboard.standing(emptied.id, user.id) is None
+
+
+@pytest.mark.parametrize("backend", [MemoryLeaderboard, RedisLeaderboard])
+def test_ties_rank_by_user_id_on_both_backends(app, monkeypatch, backend):
+    monkeypatch.setattr(leaderboard, "backend", backend())
+    for user_id, score in [(10, 3), (9, 3), (2, 3), (100, 5), (11, 1)]:
+        leaderboard.record(7, user_id, score)
+
+    assert leaderboard.top(7, 10) == [
+        {"rank": 1, "user_id": 100, "score": 5},
+        {"rank": 2, "user_id": 2, "score": 3},
+        {"rank": 2, "user_id": 9, "score": 3},
+        {"rank": 2, "user_id": 10, "score": 3},
+        {"rank": 5, "user_id": 11, "score": 1},
+    ]
+    assert [row["user_id"] for row in leaderboard.around(7, 9, 1)] == [2, 9, 10]
+    assert leaderboard.standing(7, 10) == {"rank": 2, "score": 3, "percentile": 80.0}
+
+    leaderboard.record(7, 10, 2)  # lower re-submission
+    leaderboard.record(7, 11, 4)
+    assert [(r["user_id"], r["score"]) for r in leaderboard.top(7, 3)] == [(100, 5), (11, 4), (2, 3)]
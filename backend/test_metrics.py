@@ -0,0 +1,40 @@
+"""Metrics shared across processes through Redis (applications.metrics)."""
+from applications.metrics import Metrics, LATENCY_BUCKETS, metrics
+from conftest import auth_headers
+
+
+def test_every_process_adds_to_the_same_series(app):
+    labels = {"method": "GET", "route": "/api/subject", "status": 200}
+    workers = [Metrics(), Metrics()]
+    for n, worker in enumerate(workers, start=1):
+        worker.inc("quiz_http_requests_total", labels, n)
+        worker.observe("quiz_http_request_duration_seconds", {"route": "/api/subject"}, 0.02 * n, LATENCY_BUCKETS)
+        worker.flush()
+
+    lines = metrics.render().splitlines()
+    assert 'quiz_http_requests_total{method="GET",route="/api/subject",status="200"} 3' in lines
+    assert 'quiz_http_request_duration_seconds_count{route="/api/subject"} 2' in lines
+    assert 'quiz_http_request_duration_seconds_bucket{route="/api/subject",le="0.025"} 1' in lines
+    assert 'quiz_http_request_duration_seconds_bucket{route="/api/subject",le="0.05"} 2' in lines
+
+
+def test_label_values_are_escaped(app):
+    worker = Metrics()
+    worker.inc("quiz_test_total", {"value": 'say "hi"\\now\n'})
+    worker.flush()
+
+    assert 'quiz_test_total{value="say \\"hi\\"\\\\now\\n"} 1' in metrics.render().splitlines()
+
+
+def test_metrics_endpoint_is_closed_without_a_token_or_admin(web_app):
+    client = web_app.test_client()
+    assert client.get("/api/metrics").status_code == 403
+    assert client.get("/api/metrics", headers={"X-Metrics-Token": ""}).status_code == 403
+    assert client.get("/api/metrics", headers=auth_headers(1)).status_code == 403
+    assert client.get("/api/metrics", headers=auth_headers(1, role="admin")).status_code == 200
+
+    web_app.config["METRICS_TOKEN"] = "scrape-secret"
+    assert client.get("/api/metrics", headers={"X-Metrics-Token": "wrong"}).status_code == 403
+    response = client.get("/api/metrics", headers={"X-Metrics-Token": "scrape-secret"})
+    assert response.status_code == 200
+    assert response.headers["Content-Type"].startswith("text/plain")